@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+"""
+Benchmark concurrent SQLite writes with and without the tuning profile
+
+Simulates gunicorn workers booking shipments while others poll: each writer
+process inserts rows in short transactions and each reader runs aggregate
+queries, against a scratch database file.
+"""
+import multiprocessing
+import os
+import sqlite3
+import tempfile
+import time
+
+from courier.database import apply_sqlite_pragmas
+from main import app
+
+WRITERS = 4
+READERS = 2
+WRITES_PER_WORKER = 300
+
+
+def connect(db_path, tuned):
+    # Default python sqlite3 timeout is 5s; keep it for the untuned baseline
+    conn = sqlite3.connect(db_path, timeout=5)
+    if tuned:
+        apply_sqlite_pragmas(conn, app.config)
+    return conn
+
+
+def writer(db_path, tuned, results):
+    conn = connect(db_path, tuned)
+    locked = 0
+    for i in range(WRITES_PER_WORKER):
+        try:
+            with conn:
+                conn.execute(
+                    "INSERT INTO shipment (tracking_id, final_price, status) VALUES (?, ?, 'booked')",
+                    (f'{os.getpid()}-{i}', 10.0)
+                )
+        except sqlite3.OperationalError:
+            locked += 1
+    conn.close()
+    results.put(locked)
+
+
+def reader(db_path, tuned, stop):
+    conn = connect(db_path, tuned)
+    while not stop.is_set():
+        try:
+            conn.execute("SELECT COUNT(*), SUM(final_price) FROM shipment WHERE status = 'booked'").fetchone()
+        except sqlite3.OperationalError:
+            pass
+    conn.close()
+
+
+def run(tuned):
+    db_dir = tempfile.mkdtemp()
+    db_path = os.path.join(db_dir, 'bench.db')
+
+    conn = connect(db_path, tuned)
+    conn.execute("CREATE TABLE shipment (id INTEGER PRIMARY KEY, tracking_id TEXT UNIQUE, final_price REAL, status TEXT)")
+    conn.commit()
+    conn.close()
+
+    results = multiprocessing.Queue()
+    stop = multiprocessing.Event()
+    readers = [multiprocessing.Process(target=reader, args=(db_path, tuned, stop)) for _ in range(READERS)]
+    writers = [multiprocessing.Process(target=writer, args=(db_path, tuned, results)) for _ in range(WRITERS)]
+
+    for process in readers:
+        process.start()
+
+    start = time.perf_counter()
+    for process in writers:
+        process.start()
+    for process in writers:
+        process.join()
+    elapsed = time.perf_counter() - start
+
+    stop.set()
+    for process in readers:
+        process.join()
+
+    locked = sum(results.get() for _ in writers)
+    committed = WRITERS * WRITES_PER_WORKER - locked
+    return committed / elapsed, locked, elapsed
+
+
+if __name__ == '__main__':
+    print(f"{WRITERS} writers x {WRITES_PER_WORKER} inserts, {READERS} polling readers")
+    for label, tuned in (('default', False), ('tuned', True)):
+        throughput, locked, elapsed = run(tuned)
+        print(f"  {label:8s} {throughput:8.0f} commits/s  {elapsed:6.2f}s  'database is locked' errors: {locked}")
@@ -0,0 +1,76 @@
+"""
+PICS Courier application package
+"""
+import importlib
+import os
+
+from flask import Flask, current_app
+
+from .assets import asset_manifest, register_asset_commands
+from .barcodes import barcode_cache, barcode_images
+from .blueprints import BLUEPRINTS
+from .compression import response_compressor
+from .config import configure_app
+from .currency import exchange_rates
+from .database import init_engine_events, server_engine_options
+from .extensions import db, login_manager
+from .jobs import register_job_commands
+from .migrations import register_commands
+from .pricing import rate_cards
+from .rollups import report_summaries
+from .serializers import FastJSONProvider
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def _skip_unregistered_blueprint(error, endpoint, values):
+    # Shared templates link across blueprints; links into a blueprint this
+    # process did not register render as '#' instead of failing the page
+    name = endpoint.split('.', 1)[0]
+    if name in BLUEPRINTS and name not in current_app.blueprints:
+        return '#'
+    raise error
+
+def create_app(blueprints=None):
+    """Build the Flask app.
+
+    ``blueprints`` (or the COURIER_BLUEPRINTS setting) limits which route
+    modules are imported and registered; by default all of them are. No
+    schema checks run here, see ``flask --app main migrate-db``.
+    """
+    app = Flask(__name__, root_path=PROJECT_ROOT)
+    app.json = FastJSONProvider(app)
+    configure_app(app)
+
+    if not app.config['SQLALCHEMY_DATABASE_URI'].startswith('sqlite'):
+        app.config['SQLALCHEMY_ENGINE_OPTIONS'] = server_engine_options(app.config)
+
+    db.init_app(app)
+    login_manager.init_app(app)
+    rate_cards.init_app(app)
+    exchange_rates.init_app(app)
+    barcode_cache.init_app(app)
+    barcode_images.init_app(app)
+    report_summaries.init_app(app)
+    response_compressor.init_app(app)
+    asset_manifest.init_app(app)
+
+    with app.app_context():
+        init_engine_events(db.engine, app.config)
+
+    # Create upload directory if it doesn't exist
+    if not os.path.exists(app.config['UPLOAD_FOLDER']):
+        os.makedirs(app.config['UPLOAD_FOLDER'])
+
+    for name in blueprints or app.config['COURIER_BLUEPRINTS'] or BLUEPRINTS:
+        module = importlib.import_module(f'.blueprints.{name}', __name__)
+        app.register_blueprint(module.bp)
+    app.url_build_error_handlers.append(_skip_unregistered_blueprint)
+
+    if app.config['PRELOAD_PDF_STACK']:
+        from .blueprints.pdf import preload_pdf_stack
+        preload_pdf_stack()
+
+    register_commands(app)
+    register_job_commands(app)
+    register_asset_commands(app)
+    return app
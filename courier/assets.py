@@ -0,0 +1,145 @@
+"""
+Self-hosted CSS/JS: the build-assets command and content-hashed asset URLs
+"""
+import hashlib
+import json
+import os
+import re
+import shlex
+import subprocess
+import tempfile
+import urllib.parse
+import urllib.request
+
+import click
+from flask import abort, send_from_directory, url_for
+
+# Pinned third-party files; also what pages load from the CDNs until assets are built
+VENDOR_ASSETS = {
+    'fontawesome.css': 'https://cdnjs.cloudflare.com/ajax/libs/font-awesome/6.0.0/css/all.min.css',
+    'bootstrap.css': 'https://cdn.jsdelivr.net/npm/bootstrap@5.3.0/dist/css/bootstrap.min.css',
+    'bootstrap.js': 'https://cdn.jsdelivr.net/npm/bootstrap@5.3.0/dist/js/bootstrap.bundle.min.js'
+}
+
+MANIFEST_NAME = 'manifest.json'
+
+_CSS_URL = re.compile(r'url\((["\']?)([^)"\']+)\1\)')
+_SOURCE_MAP = re.compile(rb'/[/*]# sourceMappingURL=[^\n]*')
+
+def _hashed_name(name, data):
+    stem, extension = os.path.splitext(name)
+    return f'{stem}.{hashlib.sha256(data).hexdigest()[:12]}{extension}'
+
+def _write_hashed(folder, name, data):
+    filename = _hashed_name(name, data)
+    with open(os.path.join(folder, filename), 'wb') as f:
+        f.write(data)
+    return filename
+
+def _fetch(url):
+    with urllib.request.urlopen(url, timeout=60) as response:
+        return response.read()
+
+def _vendor_css(folder, url, data):
+    """Self-host the fonts/images a vendor stylesheet points at and rewrite its url()s"""
+    fetched = {}
+
+    def rewrite(match):
+        reference = match.group(2)
+        if reference.startswith(('data:', '#')):
+            return match.group(0)
+        source = urllib.parse.urljoin(url, reference.split('?')[0].split('#')[0])
+        if source not in fetched:
+            fetched[source] = _write_hashed(folder, os.path.basename(source), _fetch(source))
+        return f'url({fetched[source]})'
+
+    css = _CSS_URL.sub(rewrite, data.decode('utf-8'))
+    return css.encode('utf-8'), len(fetched)
+
+def build_assets(folder, tailwind_cli, root_path):
+    """Compile the purged Tailwind bundle, download the vendor files and write the manifest.
+
+    Files are named by content hash, so earlier builds can stay in ``folder``
+    for pages rendered before a deploy; the manifest is replaced last.
+    """
+    os.makedirs(folder, exist_ok=True)
+    manifest = {}
+
+    with tempfile.TemporaryDirectory() as tmp:
+        output = os.path.join(tmp, 'app.css')
+        command = shlex.split(tailwind_cli) + ['-c', 'tailwind.config.js', '-i', os.path.join('assets', 'app.css'),
+                                               '-o', output, '--minify']
+        print(f'Compiling Tailwind CSS: {" ".join(command)}')
+        subprocess.run(command, cwd=root_path, check=True)
+        with open(output, 'rb') as f:
+            manifest['app.css'] = _write_hashed(folder, 'app.css', f.read())
+
+    for name, url in VENDOR_ASSETS.items():
+        print(f'Downloading {url}')
+        # Source maps are not shipped; drop the comments pointing at them
+        data = _SOURCE_MAP.sub(b'', _fetch(url))
+        if name.endswith('.css'):
+            data, fonts = _vendor_css(folder, url, data)
+            if fonts:
+                print(f'  {fonts} fonts/images self-hosted')
+        manifest[name] = _write_hashed(folder, name, data)
+
+    manifest_path = os.path.join(folder, MANIFEST_NAME)
+    with open(manifest_path + '.tmp', 'w') as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+    os.replace(manifest_path + '.tmp', manifest_path)
+    return manifest
+
+class AssetManifest:
+    """Maps asset names to their content-hashed files and serves them with far-future caching.
+
+    Without a built manifest pages keep loading Tailwind and the vendor files
+    from the CDNs, so a fresh checkout works before ``build-assets`` has run.
+    """
+
+    def __init__(self):
+        self.app = None
+        self.files = {}
+
+    def init_app(self, app):
+        self.app = app
+        self.files = self.load()
+        if not self.files:
+            print('Note: static assets are not built; pages load CSS/JS from CDNs (run flask --app main build-assets)')
+        app.add_url_rule('/assets/<path:filename>', 'asset', self.send)
+        app.add_template_global(self.url, 'asset_url')
+
+    def load(self):
+        try:
+            with open(os.path.join(self.app.config['ASSET_FOLDER'], MANIFEST_NAME)) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def url(self, name):
+        """URL of the built ``name``, its CDN copy if assets are not built, or None"""
+        filename = self.files.get(name)
+        if filename is None:
+            return VENDOR_ASSETS.get(name)
+        return url_for('asset', filename=filename)
+
+    def send(self, filename):
+        if filename == MANIFEST_NAME:
+            abort(404)
+        response = send_from_directory(self.app.config['ASSET_FOLDER'], filename, max_age=self.app.config['ASSET_MAX_AGE'])
+        # A changed file gets a new name, so browsers never need to revalidate
+        response.cache_control.public = True
+        response.cache_control.immutable = True
+        return response
+
+asset_manifest = AssetManifest()
+
+def register_asset_commands(app):
+    @app.cli.command('build-assets')
+    @click.option('--tailwind-cli', default=None, help='Tailwind CLI command (default: TAILWIND_CLI).')
+    def build_assets_command(tailwind_cli):
+        """Build the self-hosted CSS/JS bundle into ASSET_FOLDER."""
+        manifest = build_assets(app.config['ASSET_FOLDER'], tailwind_cli or app.config['TAILWIND_CLI'], app.root_path)
+        for name, filename in sorted(manifest.items()):
+            print(f'{name} -> {filename}')
+        print('Assets built; restart the web workers to serve them.')
@@ -0,0 +1,424 @@
+"""
+Shipment barcodes: generation, decoding, lookups and Code128 images/PDF drawings
+"""
+import base64
+import hashlib
+import io
+import json
+import os
+import random
+import re
+import threading
+import time
+from collections import OrderedDict, namedtuple
+from datetime import datetime
+
+from .extensions import db
+from .models import Country, Shipment
+
+def generate_barcode_number(shipment_data=None):
+    """Generate a comprehensive barcode that encodes shipment information"""
+    # Create a unique barcode that includes shipment information
+    timestamp = datetime.now().strftime('%Y%m%d%H%M%S')
+    random_component = str(random.randint(1000, 9999))
+
+    # Create barcode data structure
+    barcode_info = {
+        'version': '1.0',
+        'timestamp': timestamp,
+        'random': random_component,
+        'shipment_id': '',  # Will be filled when shipment is created
+        'sender_phone': shipment_data.get('sender_phone', '')[:10] if shipment_data else '',
+        'receiver_phone': shipment_data.get('receiver_phone', '')[:10] if shipment_data else '',
+        'weight': str(shipment_data.get('weight', ''))[:5] if shipment_data else '',
+        'destination': shipment_data.get('destination_code', '')[:3] if shipment_data else '',
+        'type': 'PICS'  # PICS Courier
+    }
+
+    # Convert to JSON and encode
+    json_data = json.dumps(barcode_info, separators=(',', ':'))
+    encoded_data = base64.b64encode(json_data.encode('utf-8')).decode('utf-8')
+
+    # Create readable barcode (remove special characters for barcode compatibility)
+    clean_encoded = encoded_data.replace('/', '_').replace('+', '-').replace('=', '')
+
+    # Create final barcode format: PICS + timestamp + encoded data (truncated)
+    barcode = f"PICS{timestamp}{clean_encoded[:20]}{random_component}"
+
+    # Ensure uniqueness by checking database
+    max_attempts = 10
+    attempts = 0
+
+    while Shipment.query.filter_by(barcode=barcode).count() > 0 and attempts < max_attempts:
+        # Regenerate with new random component if barcode exists
+        random_component = str(random.randint(1000, 9999))
+        barcode_info['random'] = random_component
+        json_data = json.dumps(barcode_info, separators=(',', ':'))
+        encoded_data = base64.b64encode(json_data.encode('utf-8')).decode('utf-8')
+        clean_encoded = encoded_data.replace('/', '_').replace('+', '-').replace('=', '')
+        barcode = f"PICS{timestamp}{clean_encoded[:20]}{random_component}"
+        attempts += 1
+
+    if attempts >= max_attempts:
+        # Fallback to simple unique barcode if we can't generate a unique encoded one
+        fallback_timestamp = datetime.now().strftime('%H%M%S%f')[:10]
+        barcode = f"PICS{fallback_timestamp}{random.randint(1000, 9999)}"
+
+        # Final uniqueness check
+        while Shipment.query.filter_by(barcode=barcode).count() > 0:
+            barcode = f"PICS{fallback_timestamp}{random.randint(1000, 9999)}"
+
+    return barcode
+
+# What a barcode lookup remembers about its shipment
+ShipmentRef = namedtuple('ShipmentRef', 'id tracking_id status')
+
+_MISSING = object()
+
+class _LRU:
+    """Bounded mapping that evicts the least recently used key, with hit/miss counters"""
+
+    def __init__(self):
+        self.maxsize = 0
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+
+    def get(self, key, default=None, now=None):
+        """Cached value for ``key``; entries past their expiry time count as misses"""
+        entry = self._entries.get(key)
+        if entry is None or (entry[1] is not None and now is not None and now >= entry[1]):
+            self.misses += 1
+            return default
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry[0]
+
+    def put(self, key, value, expires=None):
+        if self.maxsize <= 0:
+            return
+        self._entries[key] = (value, expires)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+    def keys(self):
+        return list(self._entries)
+
+    def pop(self, key):
+        return self._entries.pop(key, None)
+
+    def clear(self):
+        self._entries.clear()
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            'size': len(self._entries),
+            'maxsize': self.maxsize,
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': round(self.hits / lookups, 3) if lookups else None
+        }
+
+class BarcodeCache:
+    """Per-worker LRU caches for scanned labels.
+
+    ``decoded`` holds decode_barcode results, which depend only on the
+    barcode text. ``shipments`` maps barcode to a ShipmentRef; entries are
+    dropped when change_shipment_status or cleanup touches the shipment, and
+    ignored after BARCODE_CACHE_SECONDS so changes made through other
+    workers are picked up.
+    """
+
+    def __init__(self):
+        self.app = None
+        self.decoded = _LRU()
+        self.shipments = _LRU()
+        self._barcodes_by_id = {}
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        self.app = app
+        self.decoded.maxsize = self.shipments.maxsize = app.config['BARCODE_CACHE_SIZE']
+
+    def decode(self, barcode):
+        with self._lock:
+            info = self.decoded.get(barcode, _MISSING)
+        if info is _MISSING:
+            info = _decode_barcode(barcode)
+            with self._lock:
+                self.decoded.put(barcode, info)
+        return info
+
+    def lookup(self, barcode):
+        """ShipmentRef for ``barcode``, or None when no shipment has it"""
+        now = time.monotonic()
+        with self._lock:
+            ref = self.shipments.get(barcode, now=now)
+        if ref is not None:
+            return ref
+
+        row = db.session.query(Shipment.id, Shipment.tracking_id, Shipment.status).filter(
+            Shipment.barcode == barcode
+        ).first()
+        if row is None:
+            return None
+
+        ref = ShipmentRef(*row)
+        with self._lock:
+            self.shipments.put(barcode, ref, now + self.app.config['BARCODE_CACHE_SECONDS'])
+            self._barcodes_by_id[ref.id] = barcode
+            if len(self._barcodes_by_id) > 2 * self.shipments.maxsize:
+                # Drop reverse entries for barcodes the LRU has already evicted
+                cached = set(self.shipments.keys())
+                self._barcodes_by_id = {id_: code for id_, code in self._barcodes_by_id.items() if code in cached}
+        return ref
+
+    def invalidate(self, shipment_ids):
+        """Forget cached lookups for these shipments (after a status change or delete)"""
+        with self._lock:
+            for shipment_id in shipment_ids:
+                barcode = self._barcodes_by_id.pop(shipment_id, None)
+                if barcode is not None:
+                    self.shipments.pop(barcode)
+
+    def clear(self):
+        with self._lock:
+            self.decoded.clear()
+            self.shipments.clear()
+            self._barcodes_by_id = {}
+
+    def stats(self):
+        with self._lock:
+            return {'decoded': self.decoded.stats(), 'shipments': self.shipments.stats()}
+
+barcode_cache = BarcodeCache()
+
+def decode_barcode(barcode):
+    """Decode barcode to extract shipment information (cached per worker)"""
+    if barcode_cache.app is None:
+        return _decode_barcode(barcode)
+    return barcode_cache.decode(barcode)
+
+def lookup_shipment_by_barcode(barcode):
+    """ShipmentRef (id, tracking_id, status) for a scanned barcode, or None"""
+    return barcode_cache.lookup(barcode)
+
+# PICS + timestamp + first 20 characters of the encoded payload + random digits,
+# or the short fallback form PICS + 10 time digits + random digits
+_BARCODE_LAYOUT = re.compile(r'PICS(?P<timestamp>\d{14})[A-Za-z0-9_-]{20}(?P<random>\d{4})')
+_FALLBACK_LAYOUT = re.compile(r'PICS\d{10}(?P<random>\d{4})')
+
+def _decode_barcode(barcode):
+    # Labels carry only a prefix of the encoded payload, which does not
+    # decode on its own; return the fields the layout carries in the clear
+    match = _BARCODE_LAYOUT.fullmatch(barcode)
+    if match:
+        return {'version': '1.0', 'timestamp': match['timestamp'], 'random': match['random'], 'type': 'PICS'}
+    match = _FALLBACK_LAYOUT.fullmatch(barcode)
+    if match:
+        return {'random': match['random'], 'type': 'PICS'}
+
+    try:
+        if not barcode.startswith('PICS'):
+            return None
+
+        # Extract encoded part (after PICS and before final random digits)
+        encoded_part = barcode[4:-4]  # Remove PICS prefix and last 4 random digits
+
+        # Restore base64 characters
+        encoded_part = encoded_part.replace('_', '/').replace('-', '+')
+        # Add padding if needed
+        missing_padding = len(encoded_part) % 4
+        if missing_padding:
+            encoded_part += '=' * (4 - missing_padding)
+
+        # Decode
+        json_data = base64.b64decode(encoded_part).decode('utf-8')
+        barcode_info = json.loads(json_data)
+
+        return barcode_info
+
+    except Exception as e:
+        print(f"Error decoding barcode {barcode}: {e}")
+        return None
+
+def find_shipments_by_barcode(barcodes, branch_id=None):
+    """Resolve many barcodes with one indexed IN query.
+
+    Returns {barcode: row} for the barcodes that match, where each row has
+    id, barcode, tracking_id, status and destination. With ``branch_id``
+    only that branch's shipments match.
+    """
+    query = db.session.query(
+        Shipment.id, Shipment.barcode, Shipment.tracking_id, Shipment.status,
+        Country.name.label('destination')
+    ).join(Country).filter(Shipment.barcode.in_(set(barcodes)))
+
+    if branch_id is not None:
+        query = query.filter(Shipment.client_id == branch_id)
+
+    return {row.barcode: row for row in query}
+
+def generate_barcode_with_shipment_data(shipment):
+    """Generate barcode using actual shipment data"""
+    shipment_data = {
+        'sender_phone': shipment.sender_phone,
+        'receiver_phone': shipment.receiver_phone,
+        'weight': str(shipment.chargeable_weight),
+        'destination_code': shipment.destination_country.code if shipment.destination_country else '',
+    }
+
+    # Generate barcode with shipment data
+    barcode = generate_barcode_number(shipment_data)
+
+    # Update shipment with the new barcode
+    shipment.barcode = barcode
+
+    return barcode
+
+# Bumped whenever the rendering below changes, so ETags and files on disk change with it
+BARCODE_RENDER_VERSION = 1
+BARCODE_IMAGE_FORMATS = {'png': 'image/png', 'svg': 'image/svg+xml'}
+BARCODE_QUIET_MODULES = 10
+BARCODE_MODULE_PX = 2  # PNG/SVG pixels per module
+BARCODE_BAR_HEIGHT_PX = 60
+BARCODE_TEXT_HEIGHT_PX = 16
+BARCODE_MODULE_PT = 0.75  # PDF points per module
+BARCODE_BAR_HEIGHT_PT = 36
+
+def code128_bars(value):
+    """Code128 bars for ``value`` as (start, width) in modules, plus the total width with quiet zones"""
+    from reportlab.graphics.barcode.code128 import Code128
+
+    symbol = Code128(value)
+    symbol.validate()
+    symbol.encode()
+
+    # ReportLab spells each symbol as bar (upper case) and space (lower case) widths
+    bars = []
+    x = BARCODE_QUIET_MODULES
+    for width_code in symbol.decompose():
+        if width_code.isupper():
+            width = ord(width_code) - ord('A') + 1
+            bars.append((x, width))
+            x += width
+        elif width_code.islower():
+            x += ord(width_code) - ord('a') + 1
+    return bars, x + BARCODE_QUIET_MODULES
+
+def render_barcode_svg(value):
+    bars, modules = code128_bars(value)
+    width = modules * BARCODE_MODULE_PX
+    height = BARCODE_BAR_HEIGHT_PX + BARCODE_TEXT_HEIGHT_PX
+    path = ''.join(f'M{x * BARCODE_MODULE_PX} 0h{w * BARCODE_MODULE_PX}v{BARCODE_BAR_HEIGHT_PX}h-{w * BARCODE_MODULE_PX}z'
+                   for x, w in bars)
+    text = value.replace('&', '&amp;').replace('<', '&lt;').replace('>', '&gt;')
+    return (
+        f'<svg xmlns="http://www.w3.org/2000/svg" width="{width}" height="{height}" '
+        f'viewBox="0 0 {width} {height}" shape-rendering="crispEdges">'
+        f'<rect width="{width}" height="{height}" fill="#fff"/>'
+        f'<path d="{path}" fill="#000"/>'
+        f'<text x="{width / 2:g}" y="{height - 3}" font-family="monospace" font-size="12" text-anchor="middle">{text}</text>'
+        f'</svg>'
+    ).encode('utf-8')
+
+def render_barcode_png(value):
+    from PIL import Image, ImageDraw, ImageFont
+
+    bars, modules = code128_bars(value)
+    image = Image.new('1', (modules * BARCODE_MODULE_PX, BARCODE_BAR_HEIGHT_PX + BARCODE_TEXT_HEIGHT_PX), 1)
+    draw = ImageDraw.Draw(image)
+    for x, w in bars:
+        draw.rectangle([x * BARCODE_MODULE_PX, 0, (x + w) * BARCODE_MODULE_PX - 1, BARCODE_BAR_HEIGHT_PX - 1], fill=0)
+    draw.text((image.width / 2, BARCODE_BAR_HEIGHT_PX + 2), value, fill=0, font=ImageFont.load_default(), anchor='ma')
+
+    output = io.BytesIO()
+    image.save(output, 'PNG', optimize=True)
+    return output.getvalue()
+
+def build_barcode_drawing(value):
+    """ReportLab Drawing (a platypus Flowable) of the Code128 barcode for ``value``"""
+    from reportlab.graphics.shapes import Drawing, Rect, String
+
+    bars, modules = code128_bars(value)
+    text_height = 10
+    drawing = Drawing(modules * BARCODE_MODULE_PT, BARCODE_BAR_HEIGHT_PT + text_height)
+    for x, w in bars:
+        drawing.add(Rect(x * BARCODE_MODULE_PT, text_height, w * BARCODE_MODULE_PT, BARCODE_BAR_HEIGHT_PT,
+                         fillColor='black', strokeColor=None))
+    drawing.add(String(drawing.width / 2, 1, value, fontName='Courier', fontSize=8, textAnchor='middle'))
+    return drawing
+
+class BarcodeImageCache:
+    """Rendered barcode images and PDF drawings, each built once per barcode.
+
+    PNG/SVG bytes are kept in an in-memory LRU per worker and in
+    BARCODE_IMAGE_FOLDER, shared by all workers and kept across restarts;
+    files are named by the image's ETag. ReportLab drawings are kept in
+    memory only and reused by every PDF that prints the same label.
+    """
+
+    def __init__(self):
+        self.app = None
+        self.images = _LRU()
+        self.drawings = _LRU()
+        self.disk_hits = 0
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        self.app = app
+        self.images.maxsize = self.drawings.maxsize = app.config['BARCODE_IMAGE_CACHE_SIZE']
+
+    @staticmethod
+    def etag(value, fmt):
+        return hashlib.sha1(f'{BARCODE_RENDER_VERSION}:{fmt}:{value}'.encode('utf-8')).hexdigest()
+
+    def image(self, value, fmt):
+        """(bytes, etag) of the ``fmt`` image of ``value``"""
+        etag = self.etag(value, fmt)
+        with self._lock:
+            data = self.images.get(etag)
+        if data is not None:
+            return data, etag
+
+        path = os.path.join(self.app.config['BARCODE_IMAGE_FOLDER'], etag[:2], f'{etag}.{fmt}')
+        if os.path.exists(path):
+            with open(path, 'rb') as f:
+                data = f.read()
+            with self._lock:
+                self.disk_hits += 1
+        else:
+            data = render_barcode_svg(value) if fmt == 'svg' else render_barcode_png(value)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            # Written under a temporary name so other workers never read a partial file
+            temp_path = f'{path}.{os.getpid()}.tmp'
+            with open(temp_path, 'wb') as f:
+                f.write(data)
+            os.replace(temp_path, path)
+
+        with self._lock:
+            self.images.put(etag, data)
+        return data, etag
+
+    def drawing(self, value):
+        with self._lock:
+            drawing = self.drawings.get(value)
+        if drawing is None:
+            drawing = build_barcode_drawing(value)
+            with self._lock:
+                self.drawings.put(value, drawing)
+        return drawing
+
+    def stats(self):
+        with self._lock:
+            return {'images': {**self.images.stats(), 'disk_hits': self.disk_hits}, 'drawings': self.drawings.stats()}
+
+barcode_images = BarcodeImageCache()
+
+def create_barcode_drawing(barcode_data):
+    """Create a barcode drawing for PDF reports (cached per worker)"""
+    if barcode_images.app is None:
+        return build_barcode_drawing(barcode_data)
+    return barcode_images.drawing(barcode_data)
@@ -0,0 +1,4 @@
+"""
+Route blueprints; create_app() imports only the ones it registers
+"""
+BLUEPRINTS = ['auth', 'booking', 'pdf', 'parcels', 'barcode', 'reports', 'admin', 'jobs']
@@ -0,0 +1,331 @@
+"""
+Admin panel, pricing and exchange-rate uploads, shipment exports and maintenance
+"""
+import io
+import os
+from datetime import datetime
+
+from flask import Blueprint, current_app, flash, jsonify, redirect, render_template, request, url_for
+from flask_login import current_user, login_required
+from werkzeug.utils import secure_filename
+
+from ..barcodes import barcode_cache, barcode_images
+from ..compression import response_compressor
+from ..currency import current_exchange_rates, load_exchange_rates_csv
+from ..database import pool_metrics
+from ..exports import COLUMNAR_FORMATS
+from ..extensions import db
+from ..forms import ExchangeRateUploadForm, PricingUploadForm
+from ..jobs import enqueue_job, job_accepted
+from ..models import Branch, Country, PricingTier, RateCard, Shipment
+from ..pricing import rate_cards
+from ..shipments import CHANGE_FEED_MAX_PAGE, shipment_changes
+
+bp = Blueprint('admin', __name__)
+
+@bp.route('/admin')
+@login_required
+def admin():
+    if not current_user.is_admin:
+        flash('Access denied. Admin privileges required.', 'error')
+        return redirect(url_for('booking.dashboard'))
+
+    # Get statistics
+    total_shipments = Shipment.query.count()
+    total_branches = Branch.query.filter_by(is_admin=False).count()
+    active_countries = Country.query.filter_by(is_active=True).count()
+    total_revenue = db.session.query(db.func.sum(Shipment.final_price)).scalar() or 0
+
+    return render_template('admin.html',
+                         total_shipments=total_shipments,
+                         total_branches=total_branches,
+                         active_countries=active_countries,
+                         total_revenue=total_revenue)
+
+@bp.route('/admin/upload-pricing', methods=['GET', 'POST'])
+@login_required
+def upload_pricing():
+    if not current_user.is_admin:
+        flash('Access denied. Admin privileges required.', 'error')
+        return redirect(url_for('booking.dashboard'))
+
+    form = PricingUploadForm()
+    if form.validate_on_submit():
+        file = form.pricing_file.data
+        filename = secure_filename(file.filename)
+
+        if filename.endswith('.csv'):
+            # Staged as a new draft rate card by a background job; the live card is untouched
+            try:
+                csv_text = file.read().decode('utf-8-sig')
+            except UnicodeDecodeError:
+                flash('Pricing file must be UTF-8 encoded CSV.', 'error')
+            else:
+                job = enqueue_job('import_rate_card', {'filename': filename, 'csv_text': csv_text}, created_by=current_user.id)
+                flash(f'Pricing file queued for import (job #{job.id}). Publish the staged rate card once it is ready.', 'success')
+                return job_accepted(job)
+        else:
+            flash('Please upload a CSV file.', 'error')
+
+    active_index = rate_cards.current()
+    active_rate_card_id = active_index.rate_card_id if active_index else None
+    pricing_tiers = PricingTier.query.filter_by(rate_card_id=active_rate_card_id).all() if active_rate_card_id else []
+    all_rate_cards = RateCard.query.filter(RateCard.status != 'retired').order_by(RateCard.id.desc()).all()
+    pricing_table_bytes = active_index.table_bytes if active_index else 0
+    return render_template('upload_pricing.html', form=form, pricing_tiers=pricing_tiers,
+                         rate_cards=all_rate_cards, active_rate_card_id=active_rate_card_id,
+                         pricing_table_bytes=pricing_table_bytes,
+                         rates_form=ExchangeRateUploadForm(), exchange_rate_rows=current_exchange_rates())
+
+@bp.route('/admin/exchange-rates/upload', methods=['POST'])
+@login_required
+def upload_exchange_rates():
+    if not current_user.is_admin:
+        flash('Access denied. Admin privileges required.', 'error')
+        return redirect(url_for('booking.dashboard'))
+
+    form = ExchangeRateUploadForm()
+    if form.validate_on_submit():
+        file = form.rates_file.data
+        filename = secure_filename(file.filename)
+
+        if filename.endswith('.csv'):
+            try:
+                csvfile = io.StringIO(file.read().decode('utf-8-sig'))
+                loaded_count, error_count = load_exchange_rates_csv(csvfile)
+                flash(f'Exchange rates uploaded successfully! {loaded_count} rates loaded, {error_count} errors.', 'success')
+            except Exception as e:
+                db.session.rollback()
+                flash(f'Error processing file: {str(e)}', 'error')
+        else:
+            flash('Please upload a CSV file.', 'error')
+    else:
+        flash('Please choose an exchange rates CSV file.', 'error')
+
+    return redirect(url_for('admin.upload_pricing'))
+
+@bp.route('/admin/rate-cards/<int:rate_card_id>/publish', methods=['POST'])
+@login_required
+def publish_rate_card(rate_card_id):
+    if not current_user.is_admin:
+        flash('Access denied. Admin privileges required.', 'error')
+        return redirect(url_for('booking.dashboard'))
+
+    rate_card = RateCard.query.get_or_404(rate_card_id)
+    effective_from_str = request.form.get('effective_from', '')
+
+    try:
+        effective_from = datetime.strptime(effective_from_str, '%Y-%m-%dT%H:%M') if effective_from_str else datetime.utcnow()
+    except ValueError:
+        flash('Invalid effective-from date.', 'error')
+        return redirect(url_for('admin.upload_pricing'))
+
+    rate_card.status = 'published'
+    rate_card.effective_from = effective_from
+    rate_card.published_at = datetime.utcnow()
+    db.session.commit()
+
+    # Swap this worker's pointer now; other workers pick it up on their next refresh
+    rate_cards.refresh()
+
+    flash(f'Rate card #{rate_card.id} published, effective from {effective_from.strftime("%Y-%m-%d %H:%M")} UTC.', 'success')
+    return redirect(url_for('admin.upload_pricing'))
+
+@bp.route('/admin/rate-cards/<int:rate_card_id>/retire', methods=['POST'])
+@login_required
+def retire_rate_card(rate_card_id):
+    if not current_user.is_admin:
+        flash('Access denied. Admin privileges required.', 'error')
+        return redirect(url_for('booking.dashboard'))
+
+    rate_card = RateCard.query.get_or_404(rate_card_id)
+    rate_card.status = 'retired'
+    db.session.commit()
+    rate_cards.refresh()
+
+    flash(f'Rate card #{rate_card.id} retired.', 'success')
+    return redirect(url_for('admin.upload_pricing'))
+
+@bp.route('/admin/shipments')
+@login_required
+def admin_shipments():
+    if not current_user.is_admin:
+        flash('Access denied. Admin privileges required.', 'error')
+        return redirect(url_for('booking.dashboard'))
+
+    # Get filter parameters
+    status_filter = request.args.get('status', '')
+    country_filter = request.args.get('country', '')
+    search_query = request.args.get('search', '')
+    page = request.args.get('page', 1, type=int)
+    per_page = 20
+
+    # Build query
+    query = Shipment.query.join(Branch).join(Country)
+
+    if status_filter:
+        query = query.filter(Shipment.status == status_filter)
+
+    if country_filter:
+        query = query.filter(Shipment.destination_country_id == country_filter)
+
+    if search_query:
+        query = query.filter(
+            db.or_(
+                Shipment.tracking_id.ilike(f'%{search_query}%'),
+                Branch.name.ilike(f'%{search_query}%'),
+                Branch.email.ilike(f'%{search_query}%'),
+                Shipment.sender_name.ilike(f'%{search_query}%'),
+                Shipment.receiver_name.ilike(f'%{search_query}%')
+            )
+        )
+
+    # Get pagination
+    shipments_paginated = query.order_by(Shipment.created_at.desc()).paginate(
+        page=page, per_page=per_page, error_out=False
+    )
+
+    # Get filter options
+    countries = Country.query.filter_by(is_active=True).all()
+    statuses = ['booked', 'in_transit', 'delivered', 'cancelled']
+
+    # Calculate summary statistics
+    total_shipments = query.count()
+    total_revenue = query.with_entities(db.func.sum(Shipment.final_price)).scalar() or 0
+    total_weight = query.with_entities(db.func.sum(Shipment.chargeable_weight)).scalar() or 0
+
+    return render_template('admin_shipments.html',
+                         shipments=shipments_paginated.items,
+                         pagination=shipments_paginated,
+                         countries=countries,
+                         statuses=statuses,
+                         status_filter=status_filter,
+                         country_filter=country_filter,
+                         search_query=search_query,
+                         total_shipments=total_shipments,
+                         total_revenue=total_revenue,
+                         total_weight=total_weight)
+
+@bp.route('/admin/shipments/export')
+@login_required
+def export_all_shipments():
+    if not current_user.is_admin:
+        flash('Access denied. Admin privileges required.', 'error')
+        return redirect(url_for('booking.dashboard'))
+
+    # ?format=parquet|npz gives a typed columnar file; add ?since=last for only the shipments booked since the previous one
+    export_format = request.args.get('format', 'csv')
+    if export_format == 'csv':
+        job = enqueue_job('export_all_shipments', created_by=current_user.id)
+    elif export_format in COLUMNAR_FORMATS:
+        job = enqueue_job('export_shipments_columnar', {
+            'format': export_format,
+            'incremental': request.args.get('since') == 'last'
+        }, created_by=current_user.id)
+    else:
+        flash('Unknown export format.', 'error')
+        return redirect(url_for('admin.admin_shipments'))
+    return job_accepted(job)
+
+def _deleted_shipment_change(row):
+    return {
+        'change_seq': row.change_seq,
+        'id': row.id,
+        'tracking_id': row.tracking_id,
+        'branch_id': row.client_id,
+        'updated_at': row.updated_at.isoformat() if row.updated_at else None,
+        'deleted': True
+    }
+
+@bp.route('/api/shipments/changes')
+@login_required
+def shipment_changes_api():
+    """Change feed for downstream syncs: shipments booked, changed or deleted since a (since, after_id) position.
+
+    Start from since=0 and follow ``next`` until ``has_more`` is false;
+    keep the last ``next`` for the following sync. Shipments removed by the
+    duplicate cleanup appear once more with ``deleted`` true and only their
+    id, tracking ID and branch.
+    """
+    if not current_user.is_admin:
+        return jsonify({'error': 'Access denied. Admin privileges required.'}), 403
+
+    since = request.args.get('since', 0, type=int)
+    after_id = request.args.get('after_id', 0, type=int)
+    limit = request.args.get('limit', 500, type=int)
+    if limit < 1:
+        return jsonify({'error': 'limit must be a positive integer.'}), 400
+
+    rows = shipment_changes(since, after_id, limit)
+    if rows:
+        since, after_id = rows[-1].change_seq, rows[-1].id
+
+    return jsonify({
+        'changes': [_deleted_shipment_change(row) if row.deleted else {
+            'change_seq': row.change_seq,
+            'id': row.id,
+            'tracking_id': row.tracking_id,
+            'barcode': row.barcode,
+            'branch_id': row.client_id,
+            'destination_country_id': row.destination_country_id,
+            'document_type': row.document_type,
+            'weight_type': row.weight_type,
+            'chargeable_weight': row.chargeable_weight,
+            'final_price': row.final_price,
+            'final_price_pkr': row.final_price_pkr,
+            'status': row.status,
+            'created_at': row.created_at.isoformat() if row.created_at else None,
+            'updated_at': row.updated_at.isoformat() if row.updated_at else None,
+            'deleted': False
+        } for row in rows],
+        'next': {'since': since, 'after_id': after_id},
+        'next_url': url_for('admin.shipment_changes_api', since=since, after_id=after_id, limit=limit),
+        'has_more': len(rows) == min(limit, CHANGE_FEED_MAX_PAGE)
+    })
+
+@bp.route('/admin/metrics/db-pool')
+@login_required
+def db_pool_metrics():
+    """Connection pool usage for the worker that serves this request"""
+    if not current_user.is_admin:
+        return jsonify({'error': 'Access denied. Admin privileges required.'}), 403
+
+    pool = db.engine.pool
+    return jsonify({
+        'pid': os.getpid(),
+        'pool': pool.__class__.__name__,
+        'status': pool.status(),
+        'pool_size': pool.size() if hasattr(pool, 'size') else None,
+        'max_overflow': current_app.config['DB_MAX_OVERFLOW'],
+        'metrics': pool_metrics.snapshot()
+    })
+
+@bp.route('/admin/metrics/barcode-cache')
+@login_required
+def barcode_cache_metrics():
+    """Barcode lookup and image cache hits and misses for the worker that serves this request"""
+    if not current_user.is_admin:
+        return jsonify({'error': 'Access denied. Admin privileges required.'}), 403
+
+    return jsonify({'pid': os.getpid(), **barcode_cache.stats(), **barcode_images.stats()})
+
+@bp.route('/admin/metrics/compression')
+@login_required
+def compression_metrics():
+    """Responses compressed, bytes and estimated transfer time saved, for the worker that serves this request"""
+    if not current_user.is_admin:
+        return jsonify({'error': 'Access denied. Admin privileges required.'}), 403
+
+    return jsonify({'pid': os.getpid(), **response_compressor.stats()})
+
+@bp.route('/admin/cleanup-duplicates')
+@login_required
+def cleanup_duplicates():
+    if not current_user.is_admin:
+        flash('Access denied. Admin privileges required.', 'error')
+        return redirect(url_for('booking.dashboard'))
+
+    # ?dry_run=1 only reports what would be deleted
+    dry_run = request.args.get('dry_run') == '1'
+    job = enqueue_job('cleanup_duplicates', {'dry_run': dry_run}, created_by=current_user.id, unique=True)
+    return job_accepted(job)
@@ -0,0 +1,64 @@
+"""
+Landing page, login, registration and logout
+"""
+from flask import Blueprint, flash, redirect, render_template, url_for
+from flask_login import current_user, login_required, login_user, logout_user
+
+from ..extensions import db
+from ..forms import BranchRegistrationForm, LoginForm
+from ..models import Branch
+
+bp = Blueprint('auth', __name__)
+
+@bp.route('/')
+def index():
+    return render_template('index.html')
+
+@bp.route('/login', methods=['GET', 'POST'])
+def login():
+    if current_user.is_authenticated:
+        return redirect(url_for('booking.dashboard'))
+
+    form = LoginForm()
+    if form.validate_on_submit():
+        branch = Branch.query.filter_by(email=form.email.data).first()
+        if branch and branch.check_password(form.password.data):
+            login_user(branch)
+            flash('Logged in successfully!', 'success')
+            return redirect(url_for('booking.dashboard'))
+        flash('Invalid email or password.', 'error')
+
+    return render_template('login.html', form=form)
+
+@bp.route('/register', methods=['GET', 'POST'])
+def register():
+    if current_user.is_authenticated:
+        return redirect(url_for('booking.dashboard'))
+
+    form = BranchRegistrationForm()
+    if form.validate_on_submit():
+        branch = Branch(
+            name=form.name.data,
+            email=form.email.data,
+            phone=form.phone.data,
+            branch_code=form.branch_code.data,
+            address=form.address.data,
+            postal_code=form.postal_code.data,
+            is_admin=False,
+            is_active=True
+        )
+        branch.set_password(form.password.data)
+        db.session.add(branch)
+        db.session.commit()
+
+        flash('Branch registration successful! Please log in.', 'success')
+        return redirect(url_for('auth.login'))
+
+    return render_template('register.html', form=form)
+
+@bp.route('/logout')
+@login_required
+def logout():
+    logout_user()
+    flash('Logged out successfully!', 'success')
+    return redirect(url_for('auth.index'))
@@ -0,0 +1,164 @@
+"""
+Barcode decode, validation, info pages and label images
+"""
+from flask import Blueprint, abort, flash, jsonify, make_response, redirect, render_template, request, url_for
+from flask_login import current_user, login_required
+
+from ..barcodes import (BARCODE_IMAGE_FORMATS, barcode_images, decode_barcode, find_shipments_by_barcode,
+                        lookup_shipment_by_barcode)
+from ..extensions import db
+from ..listings import scanned_shipment_query
+from ..models import Shipment
+from ..serializers import ScannedShipment
+from ..shipments import SHIPMENT_STATUSES, bulk_change_shipment_status
+
+bp = Blueprint('barcode', __name__)
+
+# Barcodes accepted per scan request; resolved with a single IN query
+MAX_SCAN_BATCH = 500
+
+@bp.route('/api/barcode/decode/<barcode>')
+@login_required
+def decode_barcode_api(barcode):
+    """Decode barcode and return shipment information"""
+    barcode_info = decode_barcode(barcode)
+
+    if not barcode_info:
+        return jsonify({'error': 'Invalid barcode format'}), 400
+
+    # Find shipment by barcode; repeat scans skip the barcode index lookup
+    ref = lookup_shipment_by_barcode(barcode)
+    shipment = scanned_shipment_query(ref.id).first() if ref else None
+
+    if not shipment:
+        return jsonify({
+            'error': 'Shipment not found',
+            'barcode_info': barcode_info
+        }), 404
+
+    # Return comprehensive information
+    return jsonify({
+        'success': True,
+        'barcode_info': barcode_info,
+        'shipment': ScannedShipment(shipment).to_json()
+    })
+
+@bp.route('/barcode-info/<barcode>')
+@login_required
+def barcode_info_page(barcode):
+    """Display barcode information page"""
+    barcode_info = decode_barcode(barcode)
+    ref = lookup_shipment_by_barcode(barcode)
+    shipment = db.session.get(Shipment, ref.id) if ref else None
+
+    if not shipment:
+        flash('Shipment not found for this barcode.', 'error')
+        return redirect(url_for('booking.dashboard'))
+
+    return render_template('barcode_info.html',
+                         barcode=barcode,
+                         barcode_info=barcode_info,
+                         shipment=shipment)
+
+@bp.route('/api/barcode/validate/<barcode>')
+@login_required
+def validate_barcode_api(barcode):
+    """Validate barcode and return basic information"""
+    barcode_info = decode_barcode(barcode)
+
+    if not barcode_info:
+        return jsonify({
+            'valid': False,
+            'error': 'Invalid barcode format'
+        })
+
+    # Answered from the lookup cache on repeat scans
+    ref = lookup_shipment_by_barcode(barcode)
+
+    return jsonify({
+        'valid': True,
+        'barcode_info': barcode_info,
+        'shipment_exists': ref is not None,
+        'tracking_id': ref.tracking_id if ref else None,
+        'status': ref.status if ref else None
+    })
+
+@bp.route('/shipment/<int:shipment_id>/barcode.<fmt>')
+@login_required
+def shipment_barcode_image(shipment_id, fmt):
+    """Code128 PNG/SVG of a shipment's barcode, rendered once and revalidated by ETag"""
+    if fmt not in BARCODE_IMAGE_FORMATS:
+        abort(404)
+
+    shipment = db.session.query(Shipment.barcode, Shipment.client_id).filter(Shipment.id == shipment_id).first()
+    if not shipment or not shipment.barcode:
+        abort(404)
+    if shipment.client_id != current_user.id and not current_user.is_admin:
+        abort(404)
+
+    # The ETag only depends on the barcode text, so a revalidation costs one indexed read;
+    # compressed SVGs carry it as a weak ETag, hence the weak comparison
+    etag = barcode_images.etag(shipment.barcode, fmt)
+    if request.if_none_match.contains_weak(etag):
+        response = make_response('', 304)
+    else:
+        data, etag = barcode_images.image(shipment.barcode, fmt)
+        response = make_response(data)
+        response.mimetype = BARCODE_IMAGE_FORMATS[fmt]
+
+    response.set_etag(etag)
+    response.cache_control.private = True
+    response.cache_control.max_age = 86400
+    return response
+
+@bp.route('/api/barcode/scan', methods=['POST'])
+@login_required
+def scan_barcodes_api():
+    """Resolve a batch of scanned barcodes, optionally moving every parcel found to a new status"""
+    data = request.get_json(silent=True) or {}
+    barcodes = data.get('barcodes')
+    if not isinstance(barcodes, list) or not barcodes:
+        return jsonify({'error': 'A non-empty list of barcodes is required.'}), 400
+    if len(barcodes) > MAX_SCAN_BATCH:
+        return jsonify({'error': f'At most {MAX_SCAN_BATCH} barcodes per scan request.'}), 400
+
+    new_status = data.get('status')
+    if new_status and new_status not in SHIPMENT_STATUSES:
+        return jsonify({'error': 'Invalid status.'}), 400
+
+    barcodes = [str(barcode).strip() for barcode in barcodes]
+
+    # Branches only resolve (and move) their own parcels
+    branch_id = None if current_user.is_admin else current_user.id
+    found = find_shipments_by_barcode(barcodes, branch_id)
+
+    updated_count = 0
+    if new_status and found:
+        chunks = bulk_change_shipment_status([row.id for row in found.values()], new_status,
+                                             changed_by=current_user.id, branch_id=branch_id)
+        updated_count = sum(chunk['updated'] for chunk in chunks)
+        if 'error' in chunks[-1]:
+            return jsonify({'error': f"Failed to update parcels: {chunks[-1]['error']}", 'updated_count': updated_count}), 500
+
+    results = []
+    for barcode in barcodes:
+        row = found.get(barcode)
+        if row is None:
+            results.append({'barcode': barcode, 'found': False})
+            continue
+        results.append({
+            'barcode': barcode,
+            'found': True,
+            'shipment_id': row.id,
+            'tracking_id': row.tracking_id,
+            'destination': row.destination,
+            'status': new_status or row.status
+        })
+
+    return jsonify({
+        'success': True,
+        'scanned': len(barcodes),
+        'found': sum(1 for result in results if result['found']),
+        'updated_count': updated_count,
+        'results': results
+    })
@@ -0,0 +1,365 @@
+"""
+Branch dashboard, shipment booking, quotes, slips and search
+"""
+import hashlib
+from datetime import datetime
+
+from flask import Blueprint, current_app, flash, jsonify, redirect, render_template, request, url_for
+from flask_login import current_user, login_required
+
+from ..barcodes import generate_barcode_with_shipment_data
+from ..currency import convert_to_pkr
+from ..extensions import db
+from ..forms import ShipmentForm
+from ..jobs import enqueue_job
+from ..listings import shipment_listing_query
+from ..models import Branch, Country, DailyRecord, MonthlyRecord, Shipment, ShipmentEvent
+from ..pricing import calculate_pricing, rate_card_snapshot
+from ..records import generate_shipment_analytics
+from ..shipments import generate_tracking_id, get_branch_stats, record_booking_stats
+
+bp = Blueprint('booking', __name__)
+
+def _quoted_from_stale_rate_card(form, pricing_data):
+    """True when the page quoted from a rate card that is no longer in effect.
+
+    The form is pointed at the current card, so the re-rendered page can be
+    submitted once the new price has been seen.
+    """
+    quoted = form.rate_card_version.data
+    current = str(pricing_data['rate_card_id'])
+    if not quoted or quoted == current:
+        return False
+    form.rate_card_version.data = current
+    return True
+
+@bp.route('/dashboard')
+@login_required
+def dashboard():
+    shipments = Shipment.query.filter_by(client_id=current_user.id).order_by(Shipment.created_at.desc()).limit(10).all()
+
+    # Branch totals come from its counters row rather than a scan of its history
+    branch_stats = get_branch_stats(current_user.id)
+    total_shipments = branch_stats.total_shipments
+    total_revenue = branch_stats.total_revenue
+
+    # Today's stats
+    today = datetime.now().date()
+    today_stats = DailyRecord.query.filter_by(date=today).first()
+
+    # Current month's stats
+    current_month = datetime.now().month
+    current_year = datetime.now().year
+    month_stats = MonthlyRecord.query.filter_by(year=current_year, month=current_month).first()
+
+    return render_template('dashboard.html',
+                         shipments=shipments,
+                         total_shipments=total_shipments,
+                         total_revenue=total_revenue,
+                         today_stats=today_stats,
+                         month_stats=month_stats)
+
+@bp.route('/book-shipment', methods=['GET', 'POST'])
+@login_required
+def book_shipment():
+    form = ShipmentForm()
+    countries = Country.query.filter_by(is_active=True).all()
+    form.destination_country.choices = [(str(c.id), f"{c.name} ({c.currency})") for c in countries]
+
+    if form.validate_on_submit():
+        # Calculate pricing
+        pricing_data = calculate_pricing(
+            form.destination_country.data,
+            form.length.data,
+            form.width.data,
+            form.height.data,
+            form.actual_weight.data,
+            form.weight_type.data
+        )
+
+        if 'error' in pricing_data:
+            flash(pricing_data['error'], 'error')
+            return render_template('book_shipment.html', form=form)
+
+        if _quoted_from_stale_rate_card(form, pricing_data):
+            flash('Rates changed while you were booking. The price shown now uses the current rate card; please check it and submit again.', 'error')
+            return render_template('book_shipment.html', form=form)
+
+        # Generate tracking ID and barcode
+        tracking_id = generate_tracking_id()
+
+        # Calculate PKR price
+        try:
+            final_price_pkr = convert_to_pkr(pricing_data['final_price'], pricing_data['currency'])
+        except ValueError as e:
+            flash(str(e), 'error')
+            return render_template('book_shipment.html', form=form)
+
+        # Create shipment first (without barcode)
+        shipment = Shipment(
+            tracking_id=tracking_id,
+            barcode='',  # Set before the booking is committed
+            client_id=current_user.id,
+            sender_name=form.sender_name.data,
+            sender_phone=form.sender_phone.data,
+            sender_cnic=form.sender_cnic.data,
+            sender_address=form.sender_address.data,
+            sender_postal_code=form.sender_postal_code.data,
+            receiver_name=form.receiver_name.data,
+            receiver_phone=form.receiver_phone.data,
+            receiver_cnic=form.receiver_cnic.data,
+            receiver_address=form.receiver_address.data,
+            receiver_postal_code=form.receiver_postal_code.data,
+            destination_country_id=form.destination_country.data,
+            length=form.length.data,
+            width=form.width.data,
+            height=form.height.data,
+            actual_weight=form.actual_weight.data,
+            weight_type=form.weight_type.data,
+            document_type=form.document_type.data,
+            volumetric_weight=pricing_data['volumetric_weight'],
+            chargeable_weight=pricing_data['chargeable_weight'],
+            base_price=pricing_data['base_price'],
+            gst_amount=pricing_data['gst_amount'],
+            final_price=pricing_data['final_price'],
+            final_price_pkr=final_price_pkr,
+            undertaking_accepted=form.undertaking_accepted.data,
+            undertaking_text=form.undertaking_text.data or None
+        )
+
+        db.session.add(shipment)
+        db.session.add(ShipmentEvent(shipment=shipment, to_status='booked', changed_by=current_user.id))
+        record_booking_stats(shipment)
+
+        # Generate comprehensive barcode with shipment data; committed with the
+        # booking so the change feed never sees the shipment without it
+        barcode = generate_barcode_with_shipment_data(shipment)
+        db.session.commit()
+
+        # Generate analytics for the shipment
+        generate_shipment_analytics(shipment.id)
+
+        # Daily and monthly records are refreshed by a background job;
+        # bookings made while one is already queued share it
+        enqueue_job('refresh_report_records', unique=True)
+
+        flash(f'Shipment booked successfully! Tracking ID: {tracking_id}', 'success')
+        return redirect(url_for('booking.shipment_slip', shipment_id=shipment.id))
+
+    return render_template('book_shipment.html', form=form)
+
+@bp.route('/api/calculate-pricing', methods=['POST'])
+@login_required
+def api_calculate_pricing():
+    data = request.get_json()
+    result = calculate_pricing(
+        data['country_id'],
+        data['length'],
+        data['width'],
+        data['height'],
+        data['weight'],
+        data['weight_type']
+    )
+    return jsonify(result)
+
+@bp.route('/api/rate-card')
+@login_required
+def api_rate_card():
+    """Rate card snapshot for quoting in the browser; revalidated with its ETag"""
+    snapshot = rate_card_snapshot()
+    if snapshot is None:
+        return jsonify({'error': 'No published rate card is in effect.'}), 404
+
+    body = current_app.json.dumps(snapshot)
+    response = current_app.response_class(body, mimetype='application/json')
+    response.set_etag(hashlib.sha1(body.encode('utf-8')).hexdigest())
+    response.cache_control.private = True
+    response.cache_control.no_cache = True
+    return response.make_conditional(request)
+
+@bp.route('/shipment/<int:shipment_id>/receipt')
+@login_required
+def shipment_receipt(shipment_id):
+    shipment = Shipment.query.get_or_404(shipment_id)
+    if shipment.client_id != current_user.id and not current_user.is_admin:
+        flash('Access denied.', 'error')
+        return redirect(url_for('booking.dashboard'))
+
+    return render_template('receipt.html', shipment=shipment)
+
+@bp.route('/shipment/<int:shipment_id>/slip')
+@login_required
+def shipment_slip(shipment_id):
+    shipment = Shipment.query.get_or_404(shipment_id)
+    if shipment.client_id != current_user.id and not current_user.is_admin:
+        flash('Access denied.', 'error')
+        return redirect(url_for('booking.dashboard'))
+
+    return render_template('shipment_slip.html', shipment=shipment)
+
+@bp.route('/search-shipments', methods=['GET', 'POST'])
+@login_required
+def search_shipments():
+    """Search shipments with filters and status update functionality"""
+    search_query = request.args.get('search', '')
+    status_filter = request.args.get('status', '')
+    country_filter = request.args.get('country', '')
+    page = request.args.get('page', 1, type=int)
+    per_page = 20
+
+    # Build query based on user role
+    query = shipment_listing_query()
+    if not current_user.is_admin:
+        query = query.filter(Shipment.client_id == current_user.id)
+
+    # Apply filters
+    if search_query:
+        query = query.filter(
+            db.or_(
+                Shipment.tracking_id.ilike(f'%{search_query}%'),
+                Branch.name.ilike(f'%{search_query}%'),
+                Shipment.sender_name.ilike(f'%{search_query}%'),
+                Shipment.receiver_name.ilike(f'%{search_query}%')
+            )
+        )
+
+    if status_filter:
+        query = query.filter(Shipment.status == status_filter)
+
+    if country_filter:
+        query = query.filter(Shipment.destination_country_id == country_filter)
+
+    # Get pagination
+    shipments_paginated = query.order_by(Shipment.created_at.desc()).paginate(
+        page=page, per_page=per_page, error_out=False
+    )
+
+    # Get filter options
+    countries = Country.query.filter_by(is_active=True).all()
+    statuses = ['booked', 'in_transit', 'out_for_delivery', 'delivered', 'cancelled']
+
+    # Calculate summary statistics
+    total_shipments = query.count()
+    total_revenue = query.with_entities(db.func.sum(Shipment.final_price)).scalar() or 0
+    total_weight = query.with_entities(db.func.sum(Shipment.chargeable_weight)).scalar() or 0
+
+    return render_template('search_shipments.html',
+                         shipments=shipments_paginated.items,
+                         pagination=shipments_paginated,
+                         countries=countries,
+                         statuses=statuses,
+                         search_query=search_query,
+                         status_filter=status_filter,
+                         country_filter=country_filter,
+                         total_shipments=total_shipments,
+                         total_revenue=total_revenue,
+                         total_weight=total_weight)
+
+@bp.route('/shipment/<int:shipment_id>/book-similar', methods=['GET', 'POST'])
+@login_required
+def book_similar_shipment(shipment_id):
+    """Book a new shipment with same sender information"""
+    # Get the original shipment to copy sender info
+    original_shipment = Shipment.query.get_or_404(shipment_id)
+
+    # Check if user owns the shipment or is admin
+    if original_shipment.client_id != current_user.id and not current_user.is_admin:
+        flash('Access denied.', 'error')
+        return redirect(url_for('booking.dashboard'))
+
+    form = ShipmentForm()
+    countries = Country.query.filter_by(is_active=True).all()
+    form.destination_country.choices = [(str(c.id), f"{c.name} ({c.currency})") for c in countries]
+
+    if request.method == 'GET':
+        # Pre-fill form with sender information from original shipment
+        form.sender_name.data = original_shipment.sender_name
+        form.sender_phone.data = original_shipment.sender_phone
+        form.sender_cnic.data = original_shipment.sender_cnic
+        form.sender_address.data = original_shipment.sender_address
+        form.sender_postal_code.data = original_shipment.sender_postal_code
+
+        # Set default destination to same as original shipment
+        form.destination_country.data = str(original_shipment.destination_country_id)
+
+    if form.validate_on_submit():
+        # Calculate pricing
+        pricing_data = calculate_pricing(
+            form.destination_country.data,
+            form.length.data,
+            form.width.data,
+            form.height.data,
+            form.actual_weight.data,
+            form.weight_type.data
+        )
+
+        if 'error' in pricing_data:
+            flash(pricing_data['error'], 'error')
+            return render_template('book_shipment.html', form=form)
+
+        if _quoted_from_stale_rate_card(form, pricing_data):
+            flash('Rates changed while you were booking. The price shown now uses the current rate card; please check it and submit again.', 'error')
+            return render_template('book_shipment.html', form=form)
+
+        # Generate tracking ID and barcode
+        tracking_id = generate_tracking_id()
+
+        # Calculate PKR price
+        try:
+            final_price_pkr = convert_to_pkr(pricing_data['final_price'], pricing_data['currency'])
+        except ValueError as e:
+            flash(str(e), 'error')
+            return render_template('book_shipment.html', form=form)
+
+        # Create new shipment with same sender info but new receiver/package info
+        shipment = Shipment(
+            tracking_id=tracking_id,
+            barcode='',  # Set before the booking is committed
+            client_id=current_user.id,
+            sender_name=form.sender_name.data,
+            sender_phone=form.sender_phone.data,
+            sender_cnic=form.sender_cnic.data,
+            sender_address=form.sender_address.data,
+            sender_postal_code=form.sender_postal_code.data,
+            receiver_name=form.receiver_name.data,
+            receiver_phone=form.receiver_phone.data,
+            receiver_cnic=form.receiver_cnic.data,
+            receiver_address=form.receiver_address.data,
+            receiver_postal_code=form.receiver_postal_code.data,
+            destination_country_id=form.destination_country.data,
+            length=form.length.data,
+            width=form.width.data,
+            height=form.height.data,
+            actual_weight=form.actual_weight.data,
+            weight_type=form.weight_type.data,
+            document_type=form.document_type.data,
+            volumetric_weight=pricing_data['volumetric_weight'],
+            chargeable_weight=pricing_data['chargeable_weight'],
+            base_price=pricing_data['base_price'],
+            gst_amount=pricing_data['gst_amount'],
+            final_price=pricing_data['final_price'],
+            final_price_pkr=final_price_pkr,
+            undertaking_accepted=form.undertaking_accepted.data,
+            undertaking_text=form.undertaking_text.data or None
+        )
+
+        db.session.add(shipment)
+        db.session.add(ShipmentEvent(shipment=shipment, to_status='booked', changed_by=current_user.id))
+        record_booking_stats(shipment)
+
+        # Generate comprehensive barcode with shipment data; committed with the
+        # booking so the change feed never sees the shipment without it
+        barcode = generate_barcode_with_shipment_data(shipment)
+        db.session.commit()
+
+        # Generate analytics for the shipment
+        generate_shipment_analytics(shipment.id)
+
+        # Daily and monthly records are refreshed by a background job;
+        # bookings made while one is already queued share it
+        enqueue_job('refresh_report_records', unique=True)
+
+        flash(f'Shipment booked successfully! Tracking ID: {tracking_id}', 'success')
+        return redirect(url_for('booking.shipment_slip', shipment_id=shipment.id))
+
+    return render_template('book_shipment.html', form=form, prefilled_sender=True)
@@ -0,0 +1,65 @@
+"""
+Background job progress page, status polling and result downloads
+"""
+import os
+
+from flask import Blueprint, abort, flash, jsonify, redirect, render_template, send_file, url_for
+from flask_login import current_user, login_required
+
+from ..extensions import db
+from ..jobs import result_path
+from ..models import Job
+
+bp = Blueprint('jobs', __name__)
+
+def _get_own_job_or_404(job_id):
+    job = Job.query.get_or_404(job_id)
+    if job.created_by != current_user.id and not current_user.is_admin:
+        abort(404)
+    return job
+
+@bp.route('/jobs/<int:job_id>')
+@login_required
+def job_page(job_id):
+    job = _get_own_job_or_404(job_id)
+    return render_template('job_status.html', job=job)
+
+@bp.route('/api/jobs/<int:job_id>')
+@login_required
+def job_status_api(job_id):
+    """Polled by the progress page; reads a handful of columns from one row"""
+    job = db.session.query(
+        Job.id, Job.kind, Job.status, Job.progress, Job.total, Job.message,
+        Job.error, Job.attempts, Job.created_by, Job.result_file
+    ).filter(Job.id == job_id).first()
+
+    if not job or (job.created_by != current_user.id and not current_user.is_admin):
+        return jsonify({'error': 'Job not found.'}), 404
+
+    return jsonify({
+        'id': job.id,
+        'kind': job.kind,
+        'status': job.status,
+        'progress': job.progress or 0,
+        'total': job.total,
+        'percent': round(100 * (job.progress or 0) / job.total) if job.total else None,
+        'message': job.message,
+        'error': job.error,
+        'attempts': job.attempts,
+        'download_url': url_for('jobs.download_job_result', job_id=job.id) if job.status == 'done' and job.result_file else None
+    })
+
+@bp.route('/jobs/<int:job_id>/download')
+@login_required
+def download_job_result(job_id):
+    job = _get_own_job_or_404(job_id)
+    if job.status != 'done' or not job.result_file or not os.path.exists(result_path(job)):
+        flash('This job has no result file to download.', 'error')
+        return redirect(url_for('jobs.job_page', job_id=job.id))
+
+    return send_file(
+        result_path(job),
+        as_attachment=True,
+        download_name=job.result_name,
+        mimetype=job.result_mimetype
+    )
@@ -0,0 +1,295 @@
+"""
+Parcel management pages, status updates, bulk actions and exports
+"""
+from flask import Blueprint, flash, jsonify, redirect, render_template, request, url_for
+from flask_login import current_user, login_required
+
+from ..exports import apply_parcel_filters
+from ..extensions import db
+from ..jobs import enqueue_job, job_accepted
+from ..listings import parcel_rows_query, shipment_listing_query
+from ..models import Country, Shipment
+from ..serializers import ParcelRow
+from ..shipments import SHIPMENT_STATUSES, bulk_change_shipment_status, change_shipment_status, get_branch_stats
+
+bp = Blueprint('parcels', __name__)
+
+# Three pages per parcel; larger prints should be split
+MAX_SLIPS_PER_JOB = 500
+
+@bp.route('/shipment/<int:shipment_id>/update-status', methods=['POST'])
+@login_required
+def update_shipment_status(shipment_id):
+    """Update shipment status"""
+    shipment = Shipment.query.get_or_404(shipment_id)
+
+    # Check if user owns the shipment or is admin
+    if shipment.client_id != current_user.id and not current_user.is_admin:
+        return jsonify({'error': 'Access denied.'}), 403
+
+    new_status = request.json.get('status')
+    if not new_status:
+        return jsonify({'error': 'Status is required.'}), 400
+
+    if new_status not in SHIPMENT_STATUSES:
+        return jsonify({'error': 'Invalid status.'}), 400
+
+    try:
+        # Status, history event and delivery analytics in one transaction
+        change_shipment_status([shipment.id], new_status, changed_by=current_user.id)
+        db.session.commit()
+
+        return jsonify({
+            'success': True,
+            'message': f'Shipment status updated to {new_status.title()}',
+            'new_status': new_status
+        })
+
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': f'Failed to update status: {str(e)}'}), 500
+
+@bp.route('/parcel-management')
+@login_required
+def parcel_management():
+    """Enhanced parcel management for branch users"""
+    # Get filter parameters
+    search_query = request.args.get('search', '')
+    status_filter = request.args.get('status', '')
+    country_filter = request.args.get('country', '')
+    page = request.args.get('page', 1, type=int)
+    per_page = 20
+
+    # Build query for current user's shipments
+    query = shipment_listing_query().filter(Shipment.client_id == current_user.id)
+
+    # Apply filters
+    if search_query:
+        query = query.filter(
+            db.or_(
+                Shipment.tracking_id.ilike(f'%{search_query}%'),
+                Shipment.sender_name.ilike(f'%{search_query}%'),
+                Shipment.receiver_name.ilike(f'%{search_query}%'),
+                Shipment.sender_phone.ilike(f'%{search_query}%')
+            )
+        )
+
+    if status_filter:
+        query = query.filter(Shipment.status == status_filter)
+
+    if country_filter:
+        query = query.filter(Shipment.destination_country_id == country_filter)
+
+    # Get pagination
+    shipments_paginated = query.order_by(Shipment.created_at.desc()).paginate(
+        page=page, per_page=per_page, error_out=False
+    )
+
+    # Get filter options
+    countries = Country.query.filter_by(is_active=True).all()
+    statuses = SHIPMENT_STATUSES
+
+    # Summary statistics and status breakdown, from the branch's counters row
+    branch_stats = get_branch_stats(current_user.id)
+    total_shipments = branch_stats.total_shipments
+    total_revenue = branch_stats.total_revenue
+    total_weight = branch_stats.total_weight
+    status_counts = branch_stats.status_counts(statuses)
+
+    return render_template('parcel_management.html',
+                         shipments=shipments_paginated.items,
+                         pagination=shipments_paginated,
+                         countries=countries,
+                         statuses=statuses,
+                         search_query=search_query,
+                         status_filter=status_filter,
+                         country_filter=country_filter,
+                         total_shipments=total_shipments,
+                         total_revenue=total_revenue,
+                         total_weight=total_weight,
+                         status_counts=status_counts)
+
+@bp.route('/admin/parcel-management')
+@login_required
+def admin_parcel_management():
+    if not current_user.is_admin:
+        flash('Access denied. Admin privileges required.', 'error')
+        return redirect(url_for('booking.dashboard'))
+
+    # Get filter parameters
+    search_query = request.args.get('search', '')
+    status_filter = request.args.get('status', '')
+    country_filter = request.args.get('country', '')
+    date_from = request.args.get('date_from', '')
+    date_to = request.args.get('date_to', '')
+    page = request.args.get('page', 1, type=int)
+    per_page = request.args.get('per_page', 50, type=int)
+
+    # Build query: flat rows of the listed columns only
+    query = apply_parcel_filters(parcel_rows_query(), search_query, status_filter, country_filter, date_from, date_to)
+
+    # Get pagination
+    shipments_paginated = query.order_by(Shipment.created_at.desc()).paginate(
+        page=page, per_page=per_page, error_out=False
+    )
+
+    # Format data for template
+    parcels = ParcelRow.from_rows(shipments_paginated.items)
+
+    # Calculate statistics
+    total_parcels = query.count()
+    in_transit_count = query.filter(Shipment.status == 'in_transit').count()
+    delivered_count = query.filter(Shipment.status == 'delivered').count()
+    total_weight = query.with_entities(db.func.sum(Shipment.chargeable_weight)).scalar() or 0
+
+    # Get countries for filter dropdown
+    countries = Country.query.filter_by(is_active=True).all()
+
+    return render_template('admin_parcel_management.html',
+                         parcels=parcels,
+                         pagination=shipments_paginated,
+                         countries=countries,
+                         search_query=search_query,
+                         status_filter=status_filter,
+                         country_filter=country_filter,
+                         date_from=date_from,
+                         date_to=date_to,
+                         total_parcels=total_parcels,
+                         in_transit_count=in_transit_count,
+                         delivered_count=delivered_count,
+                         total_weight=total_weight)
+
+@bp.route('/api/parcels/filter')
+@login_required
+def api_filter_parcels():
+    if not current_user.is_admin:
+        return jsonify({'error': 'Access denied. Admin privileges required.'}), 403
+
+    # Get filter parameters
+    search_query = request.args.get('search', '')
+    status_filter = request.args.get('status', '')
+    country_filter = request.args.get('country', '')
+    date_from = request.args.get('date_from', '')
+    date_to = request.args.get('date_to', '')
+    page = request.args.get('page', 1, type=int)
+    per_page = request.args.get('per_page', 50, type=int)
+
+    # Build query: flat rows of the listed columns only
+    query = apply_parcel_filters(parcel_rows_query(), search_query, status_filter, country_filter, date_from, date_to)
+
+    # Get pagination
+    shipments_paginated = query.order_by(Shipment.created_at.desc()).paginate(
+        page=page, per_page=per_page, error_out=False
+    )
+
+    # Format data for API response
+    parcels = [parcel.to_json() for parcel in ParcelRow.from_rows(shipments_paginated.items)]
+
+    # Calculate statistics
+    total_parcels = query.count()
+    in_transit_count = query.filter(Shipment.status == 'in_transit').count()
+    delivered_count = query.filter(Shipment.status == 'delivered').count()
+    total_weight = float(query.with_entities(db.func.sum(Shipment.chargeable_weight)).scalar() or 0)
+
+    return jsonify({
+        'parcels': parcels,
+        'pagination': {
+            'page': page,
+            'per_page': per_page,
+            'total': total_parcels,
+            'pages': shipments_paginated.pages,
+            'has_next': shipments_paginated.has_next,
+            'has_prev': shipments_paginated.has_prev
+        },
+        'statistics': {
+            'total_parcels': total_parcels,
+            'in_transit_count': in_transit_count,
+            'delivered_count': delivered_count,
+            'total_weight': round(total_weight, 2)
+        }
+    })
+
+@bp.route('/api/parcels/bulk-update', methods=['POST'])
+@login_required
+def bulk_update_parcels():
+    data = request.get_json()
+    if not data or 'parcel_ids' not in data or 'action' not in data:
+        return jsonify({'error': 'Invalid data provided.'}), 400
+
+    try:
+        parcel_ids = [int(parcel_id) for parcel_id in data['parcel_ids']]
+    except (TypeError, ValueError):
+        return jsonify({'error': 'Invalid data provided.'}), 400
+    action = data['action']
+
+    # Validate action
+    valid_actions = ['mark_in_transit', 'mark_out_for_delivery', 'mark_delivered', 'cancel']
+    if action not in valid_actions:
+        return jsonify({'error': 'Invalid action.'}), 400
+
+    # Map actions to status
+    status_map = {
+        'mark_in_transit': 'in_transit',
+        'mark_out_for_delivery': 'out_for_delivery',
+        'mark_delivered': 'delivered',
+        'cancel': 'cancelled'
+    }
+
+    new_status = status_map[action]
+
+    # Branches can only move their own parcels; the ownership check is part of each UPDATE
+    branch_id = None if current_user.is_admin else current_user.id
+    chunks = bulk_change_shipment_status(parcel_ids, new_status, changed_by=current_user.id, branch_id=branch_id)
+    updated_count = sum(chunk['updated'] for chunk in chunks)
+
+    if chunks and 'error' in chunks[-1]:
+        return jsonify({
+            'error': f"Failed to update parcels: {chunks[-1]['error']}",
+            'updated_count': updated_count,
+            'chunks': chunks
+        }), 500
+
+    return jsonify({
+        'success': True,
+        'message': f'Successfully updated {updated_count} parcels to {new_status}.',
+        'updated_count': updated_count,
+        'requested_count': len(set(parcel_ids)),
+        'chunks': chunks
+    })
+
+@bp.route('/api/parcels/export')
+@login_required
+def export_filtered_parcels():
+    if not current_user.is_admin:
+        return jsonify({'error': 'Access denied. Admin privileges required.'}), 403
+
+    filters = {
+        'search_query': request.args.get('search', ''),
+        'status_filter': request.args.get('status', ''),
+        'country_filter': request.args.get('country', ''),
+        'date_from': request.args.get('date_from', ''),
+        'date_to': request.args.get('date_to', '')
+    }
+    job = enqueue_job('export_filtered_parcels', {'filters': filters}, created_by=current_user.id)
+    return job_accepted(job)
+
+@bp.route('/api/parcels/print-slips', methods=['POST'])
+@login_required
+def print_parcel_slips():
+    if not current_user.is_admin:
+        return jsonify({'error': 'Access denied. Admin privileges required.'}), 403
+
+    data = request.get_json()
+    if not data or not data.get('parcel_ids'):
+        return jsonify({'error': 'Invalid data provided.'}), 400
+
+    try:
+        parcel_ids = [int(parcel_id) for parcel_id in data['parcel_ids']]
+    except (TypeError, ValueError):
+        return jsonify({'error': 'Invalid data provided.'}), 400
+
+    if len(parcel_ids) > MAX_SLIPS_PER_JOB:
+        return jsonify({'error': f'Select at most {MAX_SLIPS_PER_JOB} parcels per print.'}), 400
+
+    job = enqueue_job('print_slips', {'shipment_ids': parcel_ids}, created_by=current_user.id)
+    return job_accepted(job)
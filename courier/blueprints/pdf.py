@@ -0,0 +1,492 @@
+"""
+PDF slips, receipts and undertakings (ReportLab is imported on first use)
+"""
+import io
+
+from flask import Blueprint, flash, redirect, send_file, url_for
+from flask_login import current_user, login_required
+
+from ..barcodes import create_barcode_drawing
+from ..models import Shipment
+
+bp = Blueprint('pdf', __name__)
+
+def preload_pdf_stack():
+    """Import the ReportLab modules the PDF routes use.
+
+    With ``gunicorn --preload`` and PRELOAD_PDF_STACK=1 this runs once in the
+    master, so workers share the pages copy-on-write instead of each paying
+    for the import on their first PDF.
+    """
+    import reportlab.graphics.barcode.code128  # noqa: F401
+    import reportlab.graphics.shapes  # noqa: F401
+    import reportlab.lib.styles  # noqa: F401
+    import reportlab.platypus  # noqa: F401
+
+def build_slips_pdf(shipments, output, progress=None):
+    """Write sender, courier and parcel slips for each shipment to ``output``.
+
+    ``progress`` is called with the number of shipments laid out so far.
+    """
+    # ReportLab is imported on first use to keep worker startup light
+    from reportlab.lib import colors
+    from reportlab.lib.pagesizes import letter
+    from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
+    from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle, PageBreak
+
+    doc = SimpleDocTemplate(output, pagesize=letter)
+    styles = getSampleStyleSheet()
+
+    # Custom styles
+    title_style = ParagraphStyle(
+        'CustomTitle',
+        parent=styles['Heading1'],
+        fontSize=20,
+        spaceAfter=20,
+        alignment=1  # Center alignment
+    )
+
+    content = []
+
+    # Helper function to create slip content
+    def create_slip_content(shipment, slip_type, title, border_color):
+        slip_content = []
+
+        # Header
+        slip_content.append(Paragraph(f'PICS Courier Services - {title}', title_style))
+        slip_content.append(Paragraph(f'Tracking ID: {shipment.tracking_id}', styles['Heading3']))
+        if shipment.barcode:
+            # Cached per barcode, so the three slips share one drawing
+            slip_content.append(create_barcode_drawing(shipment.barcode))
+        slip_content.append(Spacer(1, 20))
+
+        # Sender and Receiver Information
+        sender_receiver_data = [
+            ['Sender Information', 'Receiver Information'],
+            ['Name:', shipment.sender_name, 'Name:', shipment.receiver_name],
+            ['CNIC:', shipment.sender_cnic, 'CNIC:', shipment.receiver_cnic],
+            ['Phone:', shipment.sender_phone, 'Phone:', shipment.receiver_phone],
+            ['Address:', shipment.sender_address, 'Address:', shipment.receiver_address],
+            ['Postal Code:', shipment.sender_postal_code, 'Postal Code:', shipment.receiver_postal_code]
+        ]
+
+        table = Table(sender_receiver_data, colWidths=[100, 200, 100, 200])
+        table.setStyle(TableStyle([
+            ('BACKGROUND', (0, 0), (-1, 0), colors.grey),
+            ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
+            ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
+            ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+            ('FONTSIZE', (0, 0), (-1, 0), 12),
+            ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
+            ('BACKGROUND', (0, 1), (-1, -1), colors.beige),
+            ('GRID', (0, 0), (-1, -1), 1, colors.black)
+        ]))
+        slip_content.append(table)
+        slip_content.append(Spacer(1, 20))
+
+        # Package Details
+        slip_content.append(Paragraph('Package Details', styles['Heading3']))
+
+        # Different package details for parcel label vs other slips
+        if slip_type == 'parcel':
+            # Parcel label - minimal info, no pricing
+            package_data = [
+                ['Weight (kg):', f"{shipment.chargeable_weight:.2f}"],
+                ['Dimensions (cm):', f"{shipment.length}×{shipment.width}×{shipment.height}"],
+                ['Destination:', shipment.destination_country.name],
+                ['Package Type:', 'Documents' if shipment.document_type == 'docs' else 'Non-Documents']
+            ]
+        else:
+            # Sender and Courier copies - full details with pricing
+            package_data = [
+                ['Length (cm):', str(shipment.length)],
+                ['Width (cm):', str(shipment.width)],
+                ['Height (cm):', str(shipment.height)],
+                ['Actual Weight (kg):', str(shipment.actual_weight)],
+                ['Volumetric Weight (kg):', f"{shipment.volumetric_weight:.2f}"],
+                ['Chargeable Weight (kg):', f"{shipment.chargeable_weight:.2f}"],
+                ['Weight Type:', shipment.weight_type.title()],
+                ['Package Type:', 'Documents' if shipment.document_type == 'docs' else 'Non-Documents']
+            ]
+
+        package_table = Table(package_data, colWidths=[150, 100])
+        package_table.setStyle(TableStyle([
+            ('BACKGROUND', (0, 0), (-1, -1), colors.lightblue),
+            ('GRID', (0, 0), (-1, -1), 1, colors.black)
+        ]))
+        slip_content.append(package_table)
+        slip_content.append(Spacer(1, 20))
+
+        # Pricing Details (only for sender and courier copies, not parcel label)
+        if slip_type != 'parcel':
+            slip_content.append(Paragraph('Pricing Details', styles['Heading3']))
+            pricing_data = [
+                ['Base Price:', f"{shipment.destination_country.currency} {shipment.base_price:.2f}"],
+                ['GST (18%):', f"{shipment.destination_country.currency} {shipment.gst_amount:.2f}"],
+                ['Final Price:', f"{shipment.destination_country.currency} {shipment.final_price:.2f}"]
+            ]
+
+            pricing_table = Table(pricing_data, colWidths=[150, 100])
+            pricing_table.setStyle(TableStyle([
+                ('BACKGROUND', (0, 0), (-1, -1), colors.lightgreen),
+                ('GRID', (0, 0), (-1, -1), 1, colors.black),
+                ('FONTNAME', (-1, 0), (-1, -1), 'Helvetica-Bold')
+            ]))
+            slip_content.append(pricing_table)
+            slip_content.append(Spacer(1, 30))
+
+        # Footer
+        slip_content.append(Paragraph(f'Date: {shipment.created_at.strftime("%Y-%m-%d %H:%M")}', styles['Normal']))
+        slip_content.append(Paragraph('Thank you for choosing PICS!', styles['Italic']))
+
+        return slip_content
+
+    # Add all three slips for each shipment
+    for index, shipment in enumerate(shipments):
+        if index:
+            content.append(PageBreak())
+        content.extend(create_slip_content(shipment, 'sender', 'SENDER COPY', colors.blue))
+        content.append(PageBreak())
+        content.extend(create_slip_content(shipment, 'courier', 'COURIER OFFICE COPY', colors.green))
+        content.append(PageBreak())
+        content.extend(create_slip_content(shipment, 'parcel', 'PARCEL LABEL', colors.purple))
+        if progress:
+            progress(index + 1)
+
+    doc.build(content)
+
+@bp.route('/shipment/<int:shipment_id>/download-all-slips')
+@login_required
+def download_all_slips(shipment_id):
+    shipment = Shipment.query.get_or_404(shipment_id)
+    if shipment.client_id != current_user.id and not current_user.is_admin:
+        flash('Access denied.', 'error')
+        return redirect(url_for('booking.dashboard'))
+
+    # Generate PDF with all three slips
+    buffer = io.BytesIO()
+    build_slips_pdf([shipment], buffer)
+
+    buffer.seek(0)
+    return send_file(
+        buffer,
+        as_attachment=True,
+        download_name=f'shipment-slips-{shipment.tracking_id}.pdf',
+        mimetype='application/pdf'
+    )
+
+@bp.route('/shipment/<int:shipment_id>/print-undertaking')
+@login_required
+def print_undertaking(shipment_id):
+    """Generate and return undertaking document with shipment details"""
+    shipment = Shipment.query.get_or_404(shipment_id)
+    if shipment.client_id != current_user.id and not current_user.is_admin:
+        flash('Access denied.', 'error')
+        return redirect(url_for('booking.dashboard'))
+
+    # ReportLab is imported on first use to keep worker startup light
+    from reportlab.lib.pagesizes import letter
+    from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
+    from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer
+
+    # Generate undertaking PDF with shipment details
+    buffer = io.BytesIO()
+    doc = SimpleDocTemplate(buffer, pagesize=letter)
+    styles = getSampleStyleSheet()
+
+    # Custom styles
+    title_style = ParagraphStyle(
+        'CustomTitle',
+        parent=styles['Heading1'],
+        fontSize=24,
+        spaceAfter=30,
+        alignment=1  # Center alignment
+    )
+
+    content = []
+
+    # Header
+    content.append(Paragraph('PICS Courier Services', title_style))
+    content.append(Paragraph('UNDERTAKING / DECLARATION', styles['Heading2']))
+    content.append(Paragraph(f'Shipment ID: {shipment.tracking_id}', styles['Heading3']))
+    content.append(Spacer(1, 20))
+
+    # Create undertaking content using simple text with proper formatting
+    content.append(Spacer(1, 20))
+
+    # Title
+    title_style = ParagraphStyle(
+        'UndertakingTitle',
+        parent=styles['Heading1'],
+        fontSize=18,
+        spaceAfter=20,
+        alignment=1  # Center alignment
+    )
+    content.append(Paragraph('DECLARATION AND UNDERTAKING', title_style))
+    content.append(Paragraph(f'Shipment ID: {shipment.tracking_id}', styles['Heading3']))
+    content.append(Spacer(1, 20))
+
+    # Main declaration text
+    declaration_style = ParagraphStyle(
+        'DeclarationText',
+        parent=styles['Normal'],
+        fontSize=11,
+        leading=14,
+        spaceAfter=12
+    )
+
+    content.append(Paragraph(
+        f'I, <b>{shipment.sender_name}</b>, holder of CNIC No. <b>{shipment.sender_cnic}</b>, residing at <b>{shipment.sender_address}</b>, do hereby solemnly declare and undertake as follows:',
+        declaration_style
+    ))
+
+    content.append(Spacer(1, 15))
+
+    # Numbered points
+    points = [
+        f"That I am the sender of the shipment with Tracking ID <b>{shipment.tracking_id}</b> being sent to <b>{shipment.receiver_name}</b> at <b>{shipment.receiver_address}</b>.",
+        "That the contents of the above-mentioned shipment are as declared and do not include any prohibited, illegal, or dangerous items.",
+        "That I accept full responsibility for the contents of the shipment and any consequences arising from any misdeclaration.",
+        "That I have read and understood all the terms and conditions of PICS Courier Services and agree to abide by them.",
+        "That I authorize PICS Courier Services to inspect the shipment if required by law or for security purposes.",
+        "That I understand that PICS Courier Services shall not be liable for any loss or damage to the shipment beyond the declared value.",
+        "That I declare that the weight and dimensions provided are accurate and I understand that incorrect information may result in additional charges.",
+        "That I understand that prohibited items will be confiscated and may result in legal action."
+    ]
+
+    for i, point in enumerate(points, 1):
+        content.append(Paragraph(f"{i}. {point}", declaration_style))
+
+    content.append(Spacer(1, 20))
+
+    # Information sections
+    section_style = ParagraphStyle(
+        'SectionHeader',
+        parent=styles['Normal'],
+        fontSize=12,
+        fontName='Helvetica-Bold',
+        spaceAfter=8
+    )
+
+    info_style = ParagraphStyle(
+        'InfoText',
+        parent=styles['Normal'],
+        fontSize=10,
+        leading=12,
+        spaceAfter=6
+    )
+
+    # Sender Information
+    content.append(Paragraph('<b>Sender Information:</b>', section_style))
+    sender_info = [
+        f"Name: {shipment.sender_name}",
+        f"CNIC: {shipment.sender_cnic}",
+        f"Phone: {shipment.sender_phone}",
+        f"Address: {shipment.sender_address}"
+    ]
+    for info in sender_info:
+        content.append(Paragraph(info, info_style))
+
+    content.append(Spacer(1, 15))
+
+    # Receiver Information
+    content.append(Paragraph('<b>Receiver Information:</b>', section_style))
+    receiver_info = [
+        f"Name: {shipment.receiver_name}",
+        f"CNIC: {shipment.receiver_cnic}",
+        f"Phone: {shipment.receiver_phone}",
+        f"Address: {shipment.receiver_address}"
+    ]
+    for info in receiver_info:
+        content.append(Paragraph(info, info_style))
+
+    content.append(Spacer(1, 15))
+
+    # Package Information
+    content.append(Paragraph('<b>Package Information:</b>', section_style))
+    package_info = [
+        f"Weight: {shipment.chargeable_weight} kg",
+        f"Dimensions: {shipment.length} × {shipment.width} × {shipment.height} cm",
+        f"Destination: {shipment.destination_country.name}",
+        f"Value: {shipment.destination_country.currency} {shipment.final_price}"
+    ]
+    for info in package_info:
+        content.append(Paragraph(info, info_style))
+
+    content.append(Spacer(1, 20))
+
+    # Final declaration
+    content.append(Paragraph(
+        'I hereby declare that the above information is true and correct to the best of my knowledge and belief.',
+        declaration_style
+    ))
+
+    content.append(Spacer(1, 20))
+
+    # Date and signature
+    date_style = ParagraphStyle(
+        'DateStyle',
+        parent=styles['Normal'],
+        fontSize=11,
+        alignment=1,  # Center alignment
+        spaceAfter=10
+    )
+
+    signature_style = ParagraphStyle(
+        'SignatureStyle',
+        parent=styles['Normal'],
+        fontSize=11,
+        alignment=1,  # Center alignment
+        spaceAfter=30
+    )
+
+    content.append(Paragraph(f'<b>Date: {shipment.created_at.strftime("%Y-%m-%d")}</b>', date_style))
+    content.append(Paragraph('___________________________', signature_style))
+    content.append(Paragraph("<b>Sender's Signature</b>", signature_style))
+
+    # Footer
+    content.append(Paragraph(f'Date: {shipment.created_at.strftime("%Y-%m-%d %H:%M")}', styles['Normal']))
+    content.append(Paragraph('Thank you for choosing PICS!', styles['Italic']))
+
+    doc.build(content)
+
+    buffer.seek(0)
+    return send_file(
+        buffer,
+        as_attachment=True,
+        download_name=f'undertaking-{shipment.tracking_id}.pdf',
+        mimetype='application/pdf'
+    )
+
+@bp.route('/shipment/<int:shipment_id>/download-receipt')
+@login_required
+def download_receipt(shipment_id):
+    shipment = Shipment.query.get_or_404(shipment_id)
+    if shipment.client_id != current_user.id and not current_user.is_admin:
+        flash('Access denied.', 'error')
+        return redirect(url_for('booking.dashboard'))
+
+    # ReportLab is imported on first use to keep worker startup light
+    from reportlab.lib import colors
+    from reportlab.lib.pagesizes import letter
+    from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
+    from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle
+
+    # Generate PDF receipt
+    buffer = io.BytesIO()
+    doc = SimpleDocTemplate(buffer, pagesize=letter)
+    styles = getSampleStyleSheet()
+
+    # Custom styles
+    title_style = ParagraphStyle(
+        'CustomTitle',
+        parent=styles['Heading1'],
+        fontSize=24,
+        spaceAfter=30,
+        alignment=1  # Center alignment
+    )
+
+    content = []
+
+    # Header
+    content.append(Paragraph('PICS Courier Services', title_style))
+    content.append(Paragraph('Shipment Receipt', styles['Heading2']))
+    content.append(Paragraph(f'Tracking ID: {shipment.tracking_id}', styles['Heading3']))
+    if shipment.barcode:
+        content.append(create_barcode_drawing(shipment.barcode))
+    content.append(Spacer(1, 20))
+
+    # Sender and Receiver Information
+    sender_receiver_data = [
+        ['Sender Information', 'Receiver Information'],
+        ['Name:', shipment.sender_name, 'Name:', shipment.receiver_name],
+        ['CNIC:', shipment.sender_cnic, 'CNIC:', shipment.receiver_cnic],
+        ['Phone:', shipment.sender_phone, 'Phone:', shipment.receiver_phone],
+        ['Address:', shipment.sender_address, 'Address:', shipment.receiver_address],
+        ['Postal Code:', shipment.sender_postal_code, 'Postal Code:', shipment.receiver_postal_code]
+    ]
+
+    table = Table(sender_receiver_data, colWidths=[100, 200, 100, 200])
+    table.setStyle(TableStyle([
+        ('BACKGROUND', (0, 0), (-1, 0), colors.grey),
+        ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
+        ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
+        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+        ('FONTSIZE', (0, 0), (-1, 0), 14),
+        ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
+        ('BACKGROUND', (0, 1), (-1, -1), colors.beige),
+        ('GRID', (0, 0), (-1, -1), 1, colors.black)
+    ]))
+    content.append(table)
+    content.append(Spacer(1, 20))
+
+    # Package Details
+    content.append(Paragraph('Package Details', styles['Heading3']))
+    package_data = [
+        ['Length (cm):', str(shipment.length)],
+        ['Width (cm):', str(shipment.width)],
+        ['Height (cm):', str(shipment.height)],
+        ['Actual Weight (kg):', str(shipment.actual_weight)],
+        ['Volumetric Weight (kg):', f"{shipment.volumetric_weight:.2f}"],
+        ['Chargeable Weight (kg):', f"{shipment.chargeable_weight:.2f}"],
+        ['Weight Type:', shipment.weight_type.title()],
+        ['Package Type:', 'Documents' if shipment.document_type == 'docs' else 'Non-Documents']
+    ]
+
+    package_table = Table(package_data, colWidths=[150, 100])
+    package_table.setStyle(TableStyle([
+        ('BACKGROUND', (0, 0), (-1, -1), colors.lightblue),
+        ('GRID', (0, 0), (-1, -1), 1, colors.black)
+    ]))
+    content.append(package_table)
+    content.append(Spacer(1, 20))
+
+    # Pricing Details
+    content.append(Paragraph('Pricing Details', styles['Heading3']))
+    pricing_data = [
+        ['Base Price:', f"{shipment.destination_country.currency} {shipment.base_price:.2f}"],
+        ['GST (18%):', f"{shipment.destination_country.currency} {shipment.gst_amount:.2f}"],
+        ['Final Price:', f"{shipment.destination_country.currency} {shipment.final_price:.2f}"]
+    ]
+
+    pricing_table = Table(pricing_data, colWidths=[150, 100])
+    pricing_table.setStyle(TableStyle([
+        ('BACKGROUND', (0, 0), (-1, -1), colors.lightgreen),
+        ('GRID', (0, 0), (-1, -1), 1, colors.black),
+        ('FONTNAME', (-1, 0), (-1, -1), 'Helvetica-Bold')
+    ]))
+    content.append(pricing_table)
+    content.append(Spacer(1, 20))
+
+    # Undertaking Details
+    if shipment.undertaking_accepted or shipment.undertaking_text:
+        content.append(Paragraph('Declaration & Special Instructions', styles['Heading3']))
+
+        undertaking_data = []
+        if shipment.undertaking_accepted:
+            undertaking_data.append(['Terms Accepted:', 'Yes'])
+        if shipment.undertaking_text:
+            undertaking_data.append(['Special Instructions:', shipment.undertaking_text])
+
+        if undertaking_data:
+            undertaking_table = Table(undertaking_data, colWidths=[150, 300])
+            undertaking_table.setStyle(TableStyle([
+                ('BACKGROUND', (0, 0), (-1, -1), colors.lightyellow),
+                ('GRID', (0, 0), (-1, -1), 1, colors.black)
+            ]))
+            content.append(undertaking_table)
+            content.append(Spacer(1, 20))
+
+    # Footer
+    content.append(Paragraph(f'Date: {shipment.created_at.strftime("%Y-%m-%d %H:%M")}', styles['Normal']))
+    content.append(Paragraph('Thank you for choosing PICS!', styles['Italic']))
+
+    doc.build(content)
+
+    buffer.seek(0)
+    return send_file(
+        buffer,
+        as_attachment=True,
+        download_name=f'receipt-{shipment.tracking_id}.pdf',
+        mimetype='application/pdf'
+    )
@@ -0,0 +1,248 @@
+"""
+Admin report pages and CSV report exports
+"""
+from datetime import datetime, timedelta
+
+from flask import Blueprint, current_app, flash, jsonify, redirect, render_template, request, url_for
+from flask_login import current_user, login_required
+
+from ..jobs import enqueue_job, job_accepted
+from ..models import Branch, DailyRecord, MonthlyRecord
+from ..rollups import CUBE_DIMENSIONS, hourly_activity, query_daily_rollup, report_summaries
+
+bp = Blueprint('reports', __name__)
+
+@bp.route('/admin/reports')
+@login_required
+def reports():
+    if not current_user.is_admin:
+        flash('Access denied. Admin privileges required.', 'error')
+        return redirect(url_for('booking.dashboard'))
+
+    # Headline figures come from the rollup cube, cached per worker
+    summary = report_summaries.summary()
+
+    # Get recent daily records
+    recent_records = DailyRecord.query.order_by(DailyRecord.date.desc()).limit(5).all()
+
+    return render_template('reports.html',
+                         recent_records=recent_records,
+                         **summary)
+
+@bp.route('/admin/reports/daily')
+@login_required
+def daily_reports():
+    if not current_user.is_admin:
+        flash('Access denied. Admin privileges required.', 'error')
+        return redirect(url_for('booking.dashboard'))
+
+    # Get date range parameters
+    start_date_str = request.args.get('start_date')
+    end_date_str = request.args.get('end_date')
+
+    if start_date_str and end_date_str:
+        start_date = datetime.strptime(start_date_str, '%Y-%m-%d').date()
+        end_date = datetime.strptime(end_date_str, '%Y-%m-%d').date()
+    else:
+        # Default to last 30 days
+        end_date = datetime.now().date()
+        start_date = end_date - timedelta(days=30)
+
+    daily_records = DailyRecord.query.filter(
+        DailyRecord.date >= start_date,
+        DailyRecord.date <= end_date
+    ).order_by(DailyRecord.date.desc()).all()
+
+    # Calculate summary statistics
+    total_shipments = sum(record.total_shipments for record in daily_records)
+    total_revenue = sum(record.total_revenue for record in daily_records)
+    total_weight = sum(record.total_weight for record in daily_records)
+    avg_package_value = total_revenue / total_shipments if total_shipments > 0 else 0
+
+    return render_template('daily_reports.html',
+                         daily_records=daily_records,
+                         start_date=start_date,
+                         end_date=end_date,
+                         total_shipments=total_shipments,
+                         total_revenue=total_revenue,
+                         total_weight=total_weight,
+                         avg_package_value=avg_package_value)
+
+@bp.route('/admin/reports/monthly')
+@login_required
+def monthly_reports():
+    if not current_user.is_admin:
+        flash('Access denied. Admin privileges required.', 'error')
+        return redirect(url_for('booking.dashboard'))
+
+    # Get year parameter
+    year = request.args.get('year', datetime.now().year, type=int)
+    current_year = year
+
+    # Get monthly records for the selected year
+    monthly_records = MonthlyRecord.query.filter(
+        MonthlyRecord.year == year
+    ).order_by(MonthlyRecord.month.desc()).all()
+
+    # Calculate summary statistics
+    total_shipments = sum(record.total_shipments for record in monthly_records)
+    total_revenue = sum(record.total_revenue for record in monthly_records)
+    total_weight = sum(record.total_weight for record in monthly_records)
+    avg_growth_rate = sum(record.growth_rate for record in monthly_records) / len(monthly_records) if monthly_records else 0
+
+    return render_template('monthly_reports.html',
+                         monthly_records=monthly_records,
+                         current_year=current_year,
+                         total_shipments=total_shipments,
+                         total_revenue=total_revenue,
+                         total_weight=total_weight,
+                         avg_growth_rate=avg_growth_rate)
+
+@bp.route('/admin/reports/export/daily/<date>')
+@login_required
+def export_daily_report(date):
+    if not current_user.is_admin:
+        flash('Access denied. Admin privileges required.', 'error')
+        return redirect(url_for('booking.dashboard'))
+
+    try:
+        report_date = datetime.strptime(date, '%Y-%m-%d').date()
+    except ValueError:
+        flash('Invalid report date.', 'error')
+        return redirect(url_for('reports.daily_reports'))
+
+    if not DailyRecord.query.filter_by(date=report_date).first():
+        flash('No data found for the selected date.', 'error')
+        return redirect(url_for('reports.daily_reports'))
+
+    job = enqueue_job('export_daily_report', {'date': report_date.strftime('%Y-%m-%d')}, created_by=current_user.id)
+    return job_accepted(job)
+
+@bp.route('/admin/reports/export/monthly/<int:year>/<int:month>')
+@login_required
+def export_monthly_report(year, month):
+    if not current_user.is_admin:
+        flash('Access denied. Admin privileges required.', 'error')
+        return redirect(url_for('booking.dashboard'))
+
+    if not MonthlyRecord.query.filter_by(year=year, month=month).first():
+        flash('No data found for the selected month.', 'error')
+        return redirect(url_for('reports.monthly_reports'))
+
+    job = enqueue_job('export_monthly_report', {'year': year, 'month': month}, created_by=current_user.id)
+    return job_accepted(job)
+
+def _list_arg(name, type=str):
+    """Comma-separated query argument as a list, or None when absent"""
+    value = request.args.get(name, '')
+    return [type(item) for item in value.split(',') if item.strip()] or None
+
+@bp.route('/api/reports/cube')
+@login_required
+def report_cube_api():
+    """Slice-and-dice shipment totals from the daily rollup cube.
+
+    ?group_by=month,country&start=2024-01-01&end=2024-12-31&branch=2&status=delivered
+    """
+    if not current_user.is_admin:
+        return jsonify({'error': 'Access denied. Admin privileges required.'}), 403
+
+    try:
+        dimensions = _list_arg('group_by') or []
+        start = datetime.strptime(request.args['start'], '%Y-%m-%d').date() if request.args.get('start') else None
+        end = datetime.strptime(request.args['end'], '%Y-%m-%d').date() if request.args.get('end') else None
+        branch_ids = _list_arg('branch', int)
+        country_ids = _list_arg('country', int)
+    except ValueError:
+        return jsonify({'error': 'Dates must be YYYY-MM-DD and branch/country ids integers.'}), 400
+
+    unknown = [name for name in dimensions if name not in CUBE_DIMENSIONS]
+    if unknown:
+        return jsonify({'error': f"Unknown dimensions: {', '.join(unknown)}. Use {', '.join(CUBE_DIMENSIONS)}."}), 400
+
+    rows = query_daily_rollup(
+        dimensions, start, end,
+        branch_ids=branch_ids,
+        country_ids=country_ids,
+        statuses=_list_arg('status'),
+        document_types=_list_arg('document_type')
+    )
+
+    return jsonify({
+        'group_by': dimensions,
+        'start': start.isoformat() if start else None,
+        'end': end.isoformat() if end else None,
+        'rows': rows,
+        'totals': {
+            'shipments': sum(row['shipments'] for row in rows),
+            'revenue': round(sum(row['revenue'] for row in rows), 2),
+            'revenue_pkr': round(sum(row['revenue_pkr'] for row in rows), 2),
+            'weight': round(sum(row['weight'] for row in rows), 2)
+        }
+    })
+
+WEEKDAYS = ['Mon', 'Tue', 'Wed', 'Thu', 'Fri', 'Sat', 'Sun']
+
+def _hourly_activity_from_args():
+    """hourly_activity for the start_date/end_date/branch query arguments (last 30 days by default)"""
+    start_date_str = request.args.get('start_date')
+    end_date_str = request.args.get('end_date')
+
+    if start_date_str and end_date_str:
+        start_date = datetime.strptime(start_date_str, '%Y-%m-%d').date()
+        end_date = datetime.strptime(end_date_str, '%Y-%m-%d').date()
+    else:
+        end_date = datetime.now().date()
+        start_date = end_date - timedelta(days=30)
+
+    if end_date < start_date:
+        raise ValueError('The end date is before the start date.')
+
+    return hourly_activity(start_date, end_date, branch_ids=_list_arg('branch', int),
+                           utc_offset_hours=current_app.config['REPORT_UTC_OFFSET_HOURS'])
+
+def _polyline(values, width, height):
+    """SVG polyline points scaling ``values`` to a width x height box"""
+    top = max(values) or 1
+    step = width / max(len(values) - 1, 1)
+    return ' '.join(f'{index * step:.1f},{height - value / top * height:.1f}' for index, value in enumerate(values))
+
+@bp.route('/admin/reports/hourly')
+@login_required
+def hourly_reports():
+    if not current_user.is_admin:
+        flash('Access denied. Admin privileges required.', 'error')
+        return redirect(url_for('booking.dashboard'))
+
+    try:
+        activity = _hourly_activity_from_args()
+    except ValueError:
+        flash('Invalid date range.', 'error')
+        return redirect(url_for('reports.hourly_reports'))
+
+    heatmap_max = max(max(row) for row in activity['heatmap']) or 1
+    busiest = max(activity['by_hour'], key=lambda hour: hour['shipments'])
+
+    return render_template('hourly_reports.html',
+                         activity=activity,
+                         weekdays=WEEKDAYS,
+                         heatmap_max=heatmap_max,
+                         busiest=busiest,
+                         branches=Branch.query.order_by(Branch.name).all(),
+                         branch_filter=request.args.get('branch', ''),
+                         hour_line=_polyline([hour['avg_per_day'] for hour in activity['by_hour']], 720, 160),
+                         timeline_line=_polyline([hour['shipments'] for hour in activity['timeline']], 720, 160) if activity['timeline'] else None)
+
+@bp.route('/api/reports/hourly')
+@login_required
+def hourly_reports_api():
+    """Hour-of-day x weekday heatmap and intraday trends, answered from the hourly rollups"""
+    if not current_user.is_admin:
+        return jsonify({'error': 'Access denied. Admin privileges required.'}), 403
+
+    try:
+        activity = _hourly_activity_from_args()
+    except ValueError:
+        return jsonify({'error': 'Dates must be YYYY-MM-DD, with the end on or after the start.'}), 400
+
+    return jsonify({'weekdays': WEEKDAYS, **activity})
@@ -0,0 +1,173 @@
+"""
+Negotiated gzip/brotli compression of text responses, with per-worker savings metrics
+"""
+import threading
+import time
+import zlib
+
+from flask import request
+
+try:
+    import brotli
+except ImportError:  # optional; gzip is offered without it
+    brotli = None
+
+# PDFs, images and zip/Parquet exports are already compressed and pass through untouched
+COMPRESSIBLE_MIMETYPES = {
+    'text/html', 'text/css', 'text/plain', 'text/csv', 'text/javascript', 'application/javascript',
+    'application/json', 'application/xml', 'text/xml', 'image/svg+xml'
+}
+
+class CompressionMetrics:
+    """Per-worker counters for compressed responses and the bytes they saved"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.compressed = {}
+        self.below_threshold = 0
+        self.not_accepted = 0
+        self.bytes_in = 0
+        self.bytes_out = 0
+        self.seconds = 0.0
+
+    def record(self, encoding, bytes_in, bytes_out, seconds):
+        with self._lock:
+            self.compressed[encoding] = self.compressed.get(encoding, 0) + 1
+            self.bytes_in += bytes_in
+            self.bytes_out += bytes_out
+            self.seconds += seconds
+
+    def record_skip(self, reason):
+        with self._lock:
+            setattr(self, reason, getattr(self, reason) + 1)
+
+    def snapshot(self, link_kbps):
+        with self._lock:
+            saved = self.bytes_in - self.bytes_out
+            return {
+                'compressed': dict(self.compressed),
+                'below_threshold': self.below_threshold,
+                'not_accepted': self.not_accepted,
+                'bytes_in': self.bytes_in,
+                'bytes_out': self.bytes_out,
+                'bytes_saved': saved,
+                'ratio': round(self.bytes_out / self.bytes_in, 3) if self.bytes_in else None,
+                'compress_ms': round(self.seconds * 1000, 1),
+                # What the saved bytes would have cost on a link of link_kbps
+                'link_kbps': link_kbps,
+                'transfer_seconds_saved': round(saved * 8 / (link_kbps * 1000), 1) if link_kbps else None
+            }
+
+class ResponseCompressor:
+    """after_request hook compressing text responses for clients that accept gzip or br.
+
+    Bodies below COMPRESS_MIN_SIZE are sent as they are. File and generator
+    responses (job result downloads) are compressed chunk by chunk as they
+    stream, so nothing is buffered whole.
+    """
+
+    def __init__(self):
+        self.app = None
+        self.metrics = CompressionMetrics()
+
+    def init_app(self, app):
+        self.app = app
+        app.after_request(self.compress)
+
+    def encodings(self):
+        return ['br', 'gzip'] if brotli is not None else ['gzip']
+
+    def compress(self, response):
+        config = self.app.config
+        if (not config['COMPRESS_RESPONSES']
+                or request.method == 'HEAD'
+                or response.status_code < 200 or response.status_code in (204, 206, 304)
+                or 'Content-Encoding' in response.headers
+                or response.mimetype not in COMPRESSIBLE_MIMETYPES):
+            return response
+
+        response.vary.add('Accept-Encoding')
+        encoding = request.accept_encodings.best_match(self.encodings())
+        if encoding is None:
+            self.metrics.record_skip('not_accepted')
+            return response
+
+        streamed = response.is_streamed or response.direct_passthrough
+        length = response.content_length if streamed else len(response.get_data())
+        if length is not None and length < config['COMPRESS_MIN_SIZE']:
+            self.metrics.record_skip('below_threshold')
+            return response
+
+        if streamed:
+            response.response = self._compress_stream(response.response, encoding)
+            response.direct_passthrough = False
+            response.content_length = None
+            # Byte ranges of the file no longer line up with the gzip/br body
+            response.headers.pop('Accept-Ranges', None)
+        else:
+            start = time.perf_counter()
+            data = response.get_data()
+            compressor = self._compressor(encoding)
+            compressed = compressor.compress(data) + compressor.flush()
+            self.metrics.record(encoding, len(data), len(compressed), time.perf_counter() - start)
+            response.set_data(compressed)
+
+        response.headers['Content-Encoding'] = encoding
+        # The compressed body is a different representation of the same resource
+        etag, weak = response.get_etag()
+        if etag and not weak:
+            response.set_etag(etag, weak=True)
+        return response
+
+    def _compressor(self, encoding):
+        """Object with compress(bytes) and flush() for ``encoding``"""
+        if encoding == 'br':
+            return _BrotliCompressor(self.app.config['COMPRESS_BROTLI_QUALITY'])
+        # wbits 31: gzip container, no file name or timestamp
+        return zlib.compressobj(self.app.config['COMPRESS_GZIP_LEVEL'], zlib.DEFLATED, 31)
+
+    def _compress_stream(self, chunks, encoding):
+        compressor = self._compressor(encoding)
+        bytes_in = bytes_out = 0
+        seconds = 0.0
+        try:
+            for chunk in chunks:
+                if isinstance(chunk, str):
+                    chunk = chunk.encode('utf-8')
+                start = time.perf_counter()
+                data = compressor.compress(chunk)
+                seconds += time.perf_counter() - start
+                bytes_in += len(chunk)
+                if data:
+                    bytes_out += len(data)
+                    yield data
+            data = compressor.flush()
+            bytes_out += len(data)
+            yield data
+        finally:
+            # Replacing response.response means the response no longer closes the file itself
+            if hasattr(chunks, 'close'):
+                chunks.close()
+            self.metrics.record(encoding, bytes_in, bytes_out, seconds)
+
+    def stats(self):
+        return {
+            'enabled': self.app.config['COMPRESS_RESPONSES'],
+            'encodings': self.encodings(),
+            'min_size': self.app.config['COMPRESS_MIN_SIZE'],
+            **self.metrics.snapshot(self.app.config['COMPRESS_METRICS_LINK_KBPS'])
+        }
+
+class _BrotliCompressor:
+    """brotli.Compressor behind the zlib compress()/flush() interface"""
+
+    def __init__(self, quality):
+        self.compressor = brotli.Compressor(quality=quality)
+
+    def compress(self, data):
+        return self.compressor.process(data)
+
+    def flush(self):
+        return self.compressor.finish()
+
+response_compressor = ResponseCompressor()
@@ -0,0 +1,68 @@
+"""
+Application configuration, read from environment variables
+"""
+import os
+
+
+def configure_app(app):
+    """Load configuration from environment variables into app.config"""
+    app.config['SECRET_KEY'] = os.environ.get('SECRET_KEY') or 'dev-secret-key-change-in-production'
+    app.config['SQLALCHEMY_DATABASE_URI'] = os.environ.get('DATABASE_URL') or f'sqlite:///{os.path.join(os.getcwd(), "instance", "courier.db")}'
+    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    app.config['UPLOAD_FOLDER'] = os.environ.get('UPLOAD_FOLDER', 'uploads')
+    app.config['MAX_CONTENT_LENGTH'] = int(os.environ.get('MAX_CONTENT_LENGTH', '16777216'))  # 16MB max file size
+    app.config['RATE_CARD_REFRESH_SECONDS'] = float(os.environ.get('RATE_CARD_REFRESH_SECONDS', '5'))
+    app.config['PRICING_TABLE_STEP'] = float(os.environ.get('PRICING_TABLE_STEP', '0'))  # kg per slot, e.g. 0.01; 0 disables the lookup table
+    app.config['PRICING_TABLE_MAX_WEIGHT'] = float(os.environ.get('PRICING_TABLE_MAX_WEIGHT', '100'))  # kg; heavier quotes use bisect
+    app.config['EXCHANGE_RATE_CACHE_SECONDS'] = float(os.environ.get('EXCHANGE_RATE_CACHE_SECONDS', '300'))
+    app.config['BARCODE_CACHE_SIZE'] = int(os.environ.get('BARCODE_CACHE_SIZE', '10000'))  # labels per worker; 0 disables
+    app.config['BARCODE_CACHE_SECONDS'] = float(os.environ.get('BARCODE_CACHE_SECONDS', '30'))  # for changes made through other workers
+    app.config['BARCODE_IMAGE_FOLDER'] = os.environ.get('BARCODE_IMAGE_FOLDER') or os.path.join(app.instance_path, 'barcodes')
+    app.config['BARCODE_IMAGE_CACHE_SIZE'] = int(os.environ.get('BARCODE_IMAGE_CACHE_SIZE', '500'))  # images/drawings kept in memory per worker
+    app.config['REPORT_UTC_OFFSET_HOURS'] = float(os.environ.get('REPORT_UTC_OFFSET_HOURS', '0'))  # local time for hourly reports, e.g. 5 for PKT
+    app.config['REPORT_TODAY_CACHE_SECONDS'] = float(os.environ.get('REPORT_TODAY_CACHE_SECONDS', '30'))  # current month/today on /admin/reports
+    app.config['REPORT_CLOSED_CACHE_SECONDS'] = float(os.environ.get('REPORT_CLOSED_CACHE_SECONDS', '3600'))  # closed months, for writes through other workers
+    # gzip/brotli for text responses; turn off when a proxy in front already compresses
+    app.config['COMPRESS_RESPONSES'] = os.environ.get('COMPRESS_RESPONSES', '1') == '1'
+    app.config['COMPRESS_MIN_SIZE'] = int(os.environ.get('COMPRESS_MIN_SIZE', '1024'))  # bytes
+    app.config['COMPRESS_GZIP_LEVEL'] = int(os.environ.get('COMPRESS_GZIP_LEVEL', '6'))
+    app.config['COMPRESS_BROTLI_QUALITY'] = int(os.environ.get('COMPRESS_BROTLI_QUALITY', '5'))
+    app.config['COMPRESS_METRICS_LINK_KBPS'] = float(os.environ.get('COMPRESS_METRICS_LINK_KBPS', '1000'))  # for transfer time saved
+    # Self-hosted CSS/JS built by `flask --app main build-assets`
+    app.config['ASSET_FOLDER'] = os.path.join(app.root_path, os.environ.get('ASSET_FOLDER') or os.path.join('static', 'dist'))
+    app.config['ASSET_MAX_AGE'] = int(os.environ.get('ASSET_MAX_AGE', str(365 * 24 * 3600)))  # seconds; file names change with content
+    app.config['TAILWIND_CLI'] = os.environ.get('TAILWIND_CLI', 'npx --yes tailwindcss@3.4.17')
+    app.config['EXPORT_SAFETY_LAG_SECONDS'] = float(os.environ.get('EXPORT_SAFETY_LAG_SECONDS', '300'))  # newest bookings wait for the next since=last export
+    app.config['PRELOAD_PDF_STACK'] = os.environ.get('PRELOAD_PDF_STACK') == '1'
+
+    # Background jobs (see courier/jobs.py); JOBS_RUN_INLINE runs them in the request when no worker is deployed
+    app.config['JOB_RESULTS_FOLDER'] = os.environ.get('JOB_RESULTS_FOLDER') or os.path.join(app.instance_path, 'jobs')
+    app.config['JOBS_RUN_INLINE'] = os.environ.get('JOBS_RUN_INLINE') == '1'
+    app.config['JOB_POLL_SECONDS'] = float(os.environ.get('JOB_POLL_SECONDS', '1'))
+    app.config['JOB_MAX_ATTEMPTS'] = int(os.environ.get('JOB_MAX_ATTEMPTS', '3'))
+    app.config['JOB_RETRY_DELAY_SECONDS'] = float(os.environ.get('JOB_RETRY_DELAY_SECONDS', '10'))  # doubled on each retry
+    app.config['JOB_STALE_SECONDS'] = int(os.environ.get('JOB_STALE_SECONDS', '600'))  # running jobs with no heartbeat for this long are retried
+    app.config['JOB_RESULT_TTL_HOURS'] = float(os.environ.get('JOB_RESULT_TTL_HOURS', '24'))
+
+    # Comma-separated blueprint names to serve; empty serves all of them
+    app.config['COURIER_BLUEPRINTS'] = [name.strip() for name in os.environ.get('COURIER_BLUEPRINTS', '').split(',') if name.strip()]
+
+    # SQLite tuning profile, applied to every new connection (ignored for other databases)
+    app.config['SQLITE_TUNING'] = os.environ.get('SQLITE_TUNING', '1') == '1'
+    app.config['SQLITE_BUSY_TIMEOUT_MS'] = int(os.environ.get('SQLITE_BUSY_TIMEOUT_MS', '5000'))
+    app.config['SQLITE_MMAP_SIZE'] = int(os.environ.get('SQLITE_MMAP_SIZE', str(256 * 1024 * 1024)))
+    app.config['SQLITE_CACHE_SIZE_KB'] = int(os.environ.get('SQLITE_CACHE_SIZE_KB', '20000'))
+
+    # Connection pool for server databases (Postgres); each gunicorn worker gets its own pool,
+    # sized so every request thread plus one background refresh thread can hold a connection
+    gunicorn_threads = int(os.environ.get('GUNICORN_THREADS', '1'))
+    app.config['DB_POOL_SIZE'] = int(os.environ.get('DB_POOL_SIZE', str(gunicorn_threads + 1)))
+    app.config['DB_MAX_OVERFLOW'] = int(os.environ.get('DB_MAX_OVERFLOW', str(gunicorn_threads)))
+    app.config['DB_POOL_TIMEOUT'] = int(os.environ.get('DB_POOL_TIMEOUT', '10'))  # seconds to wait for a free connection
+    app.config['DB_POOL_RECYCLE'] = int(os.environ.get('DB_POOL_RECYCLE', '1800'))  # seconds; below the server/proxy idle cutoff
+    app.config['DB_POOL_PRE_PING'] = os.environ.get('DB_POOL_PRE_PING', '1') == '1'
+    app.config['DB_STATEMENT_TIMEOUT_MS'] = int(os.environ.get('DB_STATEMENT_TIMEOUT_MS', '30000'))
+
+    # Heroku/Railway still hand out postgres:// URLs, which SQLAlchemy no longer accepts
+    if app.config['SQLALCHEMY_DATABASE_URI'].startswith('postgres://'):
+        app.config['SQLALCHEMY_DATABASE_URI'] = 'postgresql://' + app.config['SQLALCHEMY_DATABASE_URI'][len('postgres://'):]
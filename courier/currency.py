@@ -0,0 +1,144 @@
+"""
+Exchange rates and PKR conversion
+"""
+import csv
+import operator
+import time
+from datetime import datetime
+
+from .extensions import db
+from .models import ExchangeRate
+
+class ExchangeRateCache:
+    """Per-worker cache of PKR rates keyed by (currency, date).
+
+    Entries are dropped wholesale every EXCHANGE_RATE_CACHE_SECONDS so rates
+    loaded through another worker are picked up without a restart.
+    """
+
+    def __init__(self):
+        self.app = None
+        self._rates = {}
+        self._expires = 0.0
+
+    def init_app(self, app):
+        self.app = app
+
+    def get(self, currency, on_date):
+        if time.monotonic() >= self._expires:
+            self.clear()
+
+        key = (currency, on_date)
+        rate = self._rates.get(key)
+        if rate is None:
+            rate = self._load(currency, on_date)
+            self._rates[key] = rate
+        return rate
+
+    def clear(self):
+        self._rates = {}
+        self._expires = time.monotonic() + self.app.config['EXCHANGE_RATE_CACHE_SECONDS']
+
+    @staticmethod
+    def _load(currency, on_date):
+        row = db.session.query(ExchangeRate.rate_to_pkr).filter(
+            ExchangeRate.currency == currency,
+            ExchangeRate.effective_date <= on_date
+        ).order_by(ExchangeRate.effective_date.desc()).first()
+
+        if row is None:
+            # Older than any loaded rate: use the earliest one we have
+            row = db.session.query(ExchangeRate.rate_to_pkr).filter(
+                ExchangeRate.currency == currency
+            ).order_by(ExchangeRate.effective_date).first()
+
+        if row is None:
+            raise ValueError(f'No exchange rate loaded for {currency}.')
+        return row[0]
+
+exchange_rates = ExchangeRateCache()
+
+def get_exchange_rate(currency, on_date=None):
+    """Return PKR per unit of currency in effect on on_date (defaults to today)"""
+    currency = (currency or '').upper()
+    if currency == 'PKR':
+        return 1.0
+    return exchange_rates.get(currency, on_date or datetime.utcnow().date())
+
+def convert_to_pkr(amount, from_currency='USD', on_date=None):
+    """Convert foreign currency to PKR.
+
+    Raises ValueError when no rate has been loaded for the currency.
+    """
+    return amount * get_exchange_rate(from_currency, on_date)
+
+def convert_to_pkr_bulk(amounts, currencies, on_dates=None):
+    """Convert parallel sequences of amounts and currencies to PKR.
+
+    Each distinct (currency, date) is resolved once; the per-row work is a
+    C-level map, so large report and export result sets convert in one pass.
+    """
+    currencies = [(currency or '').upper() for currency in currencies]
+    if on_dates is None:
+        today = datetime.utcnow().date()
+        keys = list(zip(currencies, [today] * len(currencies)))
+    else:
+        keys = list(zip(currencies, on_dates))
+
+    rates = {key: get_exchange_rate(*key) for key in set(keys)}
+    return list(map(operator.mul, amounts, map(rates.__getitem__, keys)))
+
+def load_exchange_rates_csv(csvfile):
+    """Bulk load exchange rates from CSV (currency, rate_to_pkr, effective_date).
+
+    Rows replace any existing rate for the same currency and date.
+    Returns (loaded_count, error_count).
+    """
+    rates = {}
+    error_count = 0
+
+    reader = csv.DictReader(csvfile)
+    for row in reader:
+        try:
+            currency = row['currency'].strip().upper()
+            effective_date = datetime.strptime(row['effective_date'].strip(), '%Y-%m-%d').date()
+            rates[(currency, effective_date)] = float(row['rate_to_pkr'])
+        except (KeyError, ValueError, AttributeError) as e:
+            print(f"Error processing row {row}: {e}")
+            error_count += 1
+
+    if rates:
+        dates_by_currency = {}
+        for currency, effective_date in rates:
+            dates_by_currency.setdefault(currency, []).append(effective_date)
+
+        for currency, dates in dates_by_currency.items():
+            ExchangeRate.query.filter(
+                ExchangeRate.currency == currency,
+                ExchangeRate.effective_date.in_(dates)
+            ).delete(synchronize_session=False)
+
+        now = datetime.utcnow()
+        db.session.execute(ExchangeRate.__table__.insert(), [
+            {'currency': currency, 'effective_date': effective_date, 'rate_to_pkr': rate, 'created_at': now}
+            for (currency, effective_date), rate in rates.items()
+        ])
+        db.session.commit()
+
+    exchange_rates.clear()
+    return len(rates), error_count
+
+def current_exchange_rates():
+    """Latest loaded rate per currency as (currency, rate_to_pkr, effective_date) rows"""
+    latest = db.session.query(
+        ExchangeRate.currency,
+        db.func.max(ExchangeRate.effective_date).label('effective_date')
+    ).group_by(ExchangeRate.currency).subquery()
+
+    return db.session.query(
+        ExchangeRate.currency, ExchangeRate.rate_to_pkr, ExchangeRate.effective_date
+    ).join(
+        latest,
+        db.and_(ExchangeRate.currency == latest.c.currency,
+                ExchangeRate.effective_date == latest.c.effective_date)
+    ).order_by(ExchangeRate.currency).all()
@@ -0,0 +1,164 @@
+"""
+Database engine tuning: SQLite pragmas, pool sizing and pool metrics
+"""
+import sqlite3
+import threading
+import time
+
+from flask import current_app
+from sqlalchemy import event
+from sqlalchemy.pool import QueuePool
+
+from .extensions import db
+
+class PoolMetrics:
+    """Per-worker counters for connection checkouts and how long they waited"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.checkouts = 0
+        self.connects = 0
+        self.invalidated = 0
+        self.timeouts = 0
+        self.in_use = 0
+        self.peak_in_use = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+
+    def record_wait(self, seconds, timed_out=False):
+        with self._lock:
+            self.total_wait += seconds
+            self.max_wait = max(self.max_wait, seconds)
+            if timed_out:
+                self.timeouts += 1
+
+    def record_connect(self):
+        with self._lock:
+            self.connects += 1
+
+    def record_invalidate(self):
+        with self._lock:
+            self.invalidated += 1
+
+    def record_checkout(self):
+        with self._lock:
+            self.checkouts += 1
+            self.in_use += 1
+            self.peak_in_use = max(self.peak_in_use, self.in_use)
+
+    def record_checkin(self):
+        with self._lock:
+            self.in_use = max(self.in_use - 1, 0)
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                'checkouts': self.checkouts,
+                'connects': self.connects,
+                'invalidated': self.invalidated,
+                'timeouts': self.timeouts,
+                'in_use': self.in_use,
+                'peak_in_use': self.peak_in_use,
+                'avg_wait_ms': round(self.total_wait / self.checkouts * 1000, 3) if self.checkouts else 0,
+                'max_wait_ms': round(self.max_wait * 1000, 3),
+            }
+
+pool_metrics = PoolMetrics()
+
+
+class TimedQueuePool(QueuePool):
+    """QueuePool that records how long each checkout waited for a connection"""
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            connection = super()._do_get()
+        except Exception:
+            pool_metrics.record_wait(time.perf_counter() - start, timed_out=True)
+            raise
+        pool_metrics.record_wait(time.perf_counter() - start)
+        return connection
+
+def server_engine_options(config):
+    """Engine options for non-SQLite databases, read from the environment"""
+    options = {
+        'poolclass': TimedQueuePool,
+        'pool_size': config['DB_POOL_SIZE'],
+        'max_overflow': config['DB_MAX_OVERFLOW'],
+        'pool_timeout': config['DB_POOL_TIMEOUT'],
+        'pool_recycle': config['DB_POOL_RECYCLE'],
+        'pool_pre_ping': config['DB_POOL_PRE_PING'],
+    }
+    if config['SQLALCHEMY_DATABASE_URI'].startswith('postgresql') and config['DB_STATEMENT_TIMEOUT_MS']:
+        options['connect_args'] = {'options': f"-c statement_timeout={config['DB_STATEMENT_TIMEOUT_MS']}"}
+    return options
+
+def init_engine_events(engine, config):
+    """Attach pool metrics and, for SQLite, the tuning profile to an engine"""
+
+    @event.listens_for(engine, 'connect')
+    def _on_connect(dbapi_connection, connection_record):
+        pool_metrics.record_connect()
+        if config['SQLITE_TUNING'] and isinstance(dbapi_connection, sqlite3.Connection):
+            apply_sqlite_pragmas(dbapi_connection, config)
+
+    @event.listens_for(engine, 'checkout')
+    def _on_checkout(dbapi_connection, connection_record, connection_proxy):
+        pool_metrics.record_checkout()
+
+    @event.listens_for(engine, 'checkin')
+    def _on_checkin(dbapi_connection, connection_record):
+        pool_metrics.record_checkin()
+
+    @event.listens_for(engine, 'invalidate')
+    def _on_invalidate(dbapi_connection, connection_record, exception):
+        pool_metrics.record_invalidate()
+
+
+def sqlite_pragmas(config):
+    """Return the (pragma, value) pairs of the SQLite tuning profile"""
+    return [
+        ('journal_mode', 'wal'),  # Readers no longer block the writer
+        ('synchronous', 1),  # NORMAL: fsync at checkpoints only, safe with WAL
+        ('busy_timeout', config['SQLITE_BUSY_TIMEOUT_MS']),
+        ('mmap_size', config['SQLITE_MMAP_SIZE']),
+        ('cache_size', -config['SQLITE_CACHE_SIZE_KB']),  # Negative means KiB
+        ('temp_store', 2),  # MEMORY
+    ]
+
+def apply_sqlite_pragmas(dbapi_connection, config):
+    """Apply the tuning profile to a raw sqlite3 connection"""
+    cursor = dbapi_connection.cursor()
+    try:
+        for pragma, value in sqlite_pragmas(config):
+            cursor.execute(f'PRAGMA {pragma}={value}')
+    finally:
+        cursor.close()
+
+def verify_sqlite_profile():
+    """Read the tuning pragmas back and report any that did not take effect.
+
+    Returns a dict of pragma -> (expected, actual); empty when the database is
+    not SQLite or tuning is disabled.
+    """
+    if not current_app.config['SQLITE_TUNING'] or db.engine.dialect.name != 'sqlite':
+        return {}
+
+    results = {}
+    with db.engine.connect() as connection:
+        for pragma, expected in sqlite_pragmas(current_app.config):
+            actual = connection.exec_driver_sql(f'PRAGMA {pragma}').scalar()
+            results[pragma] = (expected, actual)
+
+    # mmap_size is capped by the SQLite build; anything non-zero means mmap is on
+    mismatched = {
+        pragma: values for pragma, values in results.items()
+        if str(values[0]).lower() != str(values[1]).lower()
+        and not (pragma == 'mmap_size' and values[1])
+    }
+    if mismatched:
+        for pragma, (expected, actual) in mismatched.items():
+            print(f"WARNING: SQLite PRAGMA {pragma} is {actual}, expected {expected}")
+    else:
+        print("✓ SQLite tuning profile active (WAL, synchronous=NORMAL, busy timeout, mmap, cache, temp_store)")
+    return results
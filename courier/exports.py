@@ -0,0 +1,446 @@
+"""
+CSV and columnar (Parquet/NPZ) exports of shipments and report records,
+written to files by background jobs
+"""
+import csv
+import importlib.util
+import json
+import math
+import shutil
+import struct
+import tempfile
+import zipfile
+from datetime import datetime, timedelta
+
+from flask import current_app
+
+from .extensions import db
+from .listings import parcel_rows_query
+from .models import Branch, Country, ExportCursor, Shipment
+
+# Rows fetched per round trip, and how often progress is reported
+EXPORT_BATCH_SIZE = 1000
+
+# Rows per column batch (and Parquet row group) in columnar exports
+COLUMNAR_BATCH_SIZE = 50000
+
+def apply_parcel_filters(query, search_query='', status_filter='', country_filter='', date_from='', date_to=''):
+    """Apply the parcel management search/status/country/date filters to a Shipment-Branch query"""
+    if search_query:
+        query = query.filter(
+            db.or_(
+                Shipment.tracking_id.ilike(f'%{search_query}%'),
+                Branch.name.ilike(f'%{search_query}%'),
+                Shipment.sender_name.ilike(f'%{search_query}%'),
+                Shipment.sender_phone.ilike(f'%{search_query}%')
+            )
+        )
+
+    if status_filter:
+        query = query.filter(Shipment.status == status_filter)
+
+    if country_filter:
+        query = query.filter(Shipment.destination_country_id == country_filter)
+
+    if date_from:
+        query = query.filter(db.func.date(Shipment.created_at) >= date_from)
+
+    if date_to:
+        query = query.filter(db.func.date(Shipment.created_at) <= date_to)
+
+    return query
+
+def _stream_rows(query, progress=None):
+    """Iterate a query in EXPORT_BATCH_SIZE batches, reporting progress between batches"""
+    total = query.order_by(None).count()
+    if progress:
+        progress(0, total)
+
+    done = 0
+    for row in query.yield_per(EXPORT_BATCH_SIZE):
+        yield row
+        done += 1
+        if progress and done % EXPORT_BATCH_SIZE == 0:
+            progress(done, total)
+
+    if progress:
+        progress(done, total)
+
+def write_all_shipments_csv(output, progress=None):
+    """Every shipment with its branch and destination, newest first"""
+    query = parcel_rows_query(
+        Branch.email.label('client_email'), Shipment.sender_name, Shipment.receiver_name, Shipment.receiver_phone,
+        Shipment.document_type, Shipment.undertaking_accepted, Shipment.undertaking_text
+    ).order_by(Shipment.created_at.desc())
+
+    writer = csv.writer(output)
+
+    # Write header
+    writer.writerow([
+        'Tracking ID', 'Client Name', 'Client Email', 'Sender Name', 'Sender Phone',
+        'Receiver Name', 'Receiver Phone', 'Destination Country', 'Weight (kg)',
+        'Weight Type', 'Package Type', 'Final Price', 'Status', 'Undertaking Accepted',
+        'Special Instructions', 'Created At'
+    ])
+
+    # Write data
+    for row in _stream_rows(query, progress):
+        writer.writerow([
+            row.tracking_id,
+            row.client_name,
+            row.client_email,
+            row.sender_name,
+            row.sender_phone,
+            row.receiver_name,
+            row.receiver_phone,
+            row.destination_country,
+            f"{row.chargeable_weight:.2f}",
+            row.weight_type.title(),
+            'Documents' if row.document_type == 'docs' else 'Non-Documents',
+            f"{row.final_price:.2f}",
+            row.status.title(),
+            'Yes' if row.undertaking_accepted else 'No',
+            row.undertaking_text or '',
+            row.created_at.strftime('%Y-%m-%d %H:%M:%S')
+        ])
+
+def write_filtered_parcels_csv(output, filters, progress=None):
+    """Shipments matching the parcel management filters, newest first"""
+    query = parcel_rows_query(
+        Branch.email.label('client_email'), Shipment.sender_name, Shipment.receiver_name, Shipment.receiver_phone,
+        Shipment.document_type
+    )
+    query = apply_parcel_filters(query, **filters).order_by(Shipment.created_at.desc())
+
+    writer = csv.writer(output)
+
+    # Write header
+    writer.writerow([
+        'Tracking ID', 'Barcode', 'Customer Name', 'Customer Email', 'Sender Name', 'Sender Phone',
+        'Receiver Name', 'Receiver Phone', 'Destination Country', 'Weight (kg)',
+        'Weight Type', 'Package Type', 'Final Price', 'Final Price (PKR)', 'Status', 'Created At'
+    ])
+
+    # Write data
+    for row in _stream_rows(query, progress):
+        writer.writerow([
+            row.tracking_id,
+            row.barcode,
+            row.client_name,
+            row.client_email,
+            row.sender_name,
+            row.sender_phone,
+            row.receiver_name,
+            row.receiver_phone,
+            row.destination_country,
+            f"{row.chargeable_weight:.2f}",
+            row.weight_type.title(),
+            'Documents' if row.document_type == 'docs' else 'Non-Documents',
+            f"{row.final_price:.2f}",
+            f"{row.final_price_pkr:.2f}",
+            row.status.title(),
+            row.created_at.strftime('%Y-%m-%d %H:%M:%S')
+        ])
+
+def _write_shipment_details(writer, query, progress=None):
+    writer.writerow([])  # Empty row
+    writer.writerow(['Detailed Shipment Data'])
+    writer.writerow(['Tracking ID', 'Destination', 'Weight (kg)', 'Final Price', 'Weight Type', 'Created At'])
+
+    query = query.join(Country).with_entities(
+        Shipment.tracking_id, Country.name, Shipment.chargeable_weight,
+        Shipment.final_price, Shipment.weight_type, Shipment.created_at
+    )
+    for tracking_id, destination, weight, final_price, weight_type, created_at in _stream_rows(query, progress):
+        writer.writerow([
+            tracking_id,
+            destination,
+            f"{weight:.2f}",
+            f"{final_price:.2f}",
+            weight_type.title(),
+            created_at.strftime('%Y-%m-%d %H:%M:%S')
+        ])
+
+def write_daily_report_csv(output, daily_record, progress=None):
+    writer = csv.writer(output)
+
+    # Write header
+    writer.writerow(['Date', 'Total Shipments', 'Total Revenue', 'Total Weight (kg)', 'Avg Package Value', 'Top Destination'])
+
+    # Write data
+    writer.writerow([
+        daily_record.date.strftime('%Y-%m-%d'),
+        daily_record.total_shipments,
+        f"{daily_record.total_revenue:.2f}",
+        f"{daily_record.total_weight:.2f}",
+        f"{daily_record.avg_package_value:.2f}",
+        daily_record.top_destination or 'N/A'
+    ])
+
+    # Detailed shipment data for the day
+    day_shipments = Shipment.query.filter(
+        db.func.date(Shipment.created_at) == daily_record.date
+    )
+    _write_shipment_details(writer, day_shipments, progress)
+
+def write_monthly_report_csv(output, monthly_record, progress=None):
+    writer = csv.writer(output)
+
+    # Write header
+    writer.writerow(['Year', 'Month', 'Total Shipments', 'Total Revenue', 'Total Weight (kg)', 'Avg Package Value', 'Growth Rate (%)', 'Top Destination'])
+
+    # Write data
+    writer.writerow([
+        monthly_record.year,
+        monthly_record.month,
+        monthly_record.total_shipments,
+        f"{monthly_record.total_revenue:.2f}",
+        f"{monthly_record.total_weight:.2f}",
+        f"{monthly_record.avg_package_value:.2f}",
+        f"{monthly_record.growth_rate:.2f}",
+        monthly_record.top_destination or 'N/A'
+    ])
+
+    # Detailed shipment data for the month
+    month_shipments = Shipment.query.filter(
+        db.func.extract('year', Shipment.created_at) == monthly_record.year,
+        db.func.extract('month', Shipment.created_at) == monthly_record.month
+    )
+    _write_shipment_details(writer, month_shipments, progress)
+
+# Columnar export layout: (name, type, SQL expression). 'category' columns are
+# dictionary-encoded; timestamps are microseconds, UTC, without a zone.
+SHIPMENT_COLUMNS = [
+    ('id', 'int64', Shipment.id),
+    ('tracking_id', 'string', Shipment.tracking_id),
+    ('barcode', 'string', Shipment.barcode),
+    ('branch', 'category', Branch.name),
+    ('sender_name', 'string', Shipment.sender_name),
+    ('sender_phone', 'string', Shipment.sender_phone),
+    ('receiver_name', 'string', Shipment.receiver_name),
+    ('receiver_phone', 'string', Shipment.receiver_phone),
+    ('destination_country', 'category', Country.name),
+    ('chargeable_weight', 'float64', Shipment.chargeable_weight),
+    ('weight_type', 'category', Shipment.weight_type),
+    ('document_type', 'category', Shipment.document_type),
+    ('final_price', 'float64', Shipment.final_price),
+    ('final_price_pkr', 'float64', Shipment.final_price_pkr),
+    ('status', 'category', Shipment.status),
+    ('undertaking_accepted', 'bool', Shipment.undertaking_accepted),
+    ('created_at', 'timestamp', Shipment.created_at)
+]
+
+COLUMNAR_FORMATS = {
+    'parquet': ('parquet', 'application/vnd.apache.parquet'),
+    'npz': ('npz', 'application/zip')
+}
+
+def columnar_format(requested='parquet'):
+    """The columnar format to write: Parquet needs pyarrow, NPZ needs nothing"""
+    if requested == 'parquet' and importlib.util.find_spec('pyarrow') is None:
+        return 'npz'
+    return requested
+
+def _in_range(since, until):
+    """Filter for shipments after the (created_at, id) position ``since`` up to and including ``until``"""
+    criteria = []
+    if since is not None:
+        criteria.append(db.or_(Shipment.created_at > since[0],
+                               db.and_(Shipment.created_at == since[0], Shipment.id > since[1])))
+    criteria.append(db.or_(Shipment.created_at < until[0],
+                           db.and_(Shipment.created_at == until[0], Shipment.id <= until[1])))
+    return db.and_(*criteria)
+
+def _last_position(*criteria):
+    """The (created_at, id) of the newest shipment matching criteria, or None"""
+    return db.session.query(Shipment.created_at, Shipment.id).filter(
+        Shipment.created_at.isnot(None), *criteria
+    ).order_by(Shipment.created_at.desc(), Shipment.id.desc()).first()
+
+def _column_batches(since, until):
+    """Shipments between two (created_at, id) positions as lists of column tuples, COLUMNAR_BATCH_SIZE rows at a time"""
+    query = db.select(*[expression for _, _, expression in SHIPMENT_COLUMNS]).select_from(Shipment).join(
+        Branch, Shipment.client_id == Branch.id
+    ).join(
+        Country, Shipment.destination_country_id == Country.id
+    ).where(_in_range(since, until)).order_by(Shipment.created_at, Shipment.id)
+
+    result = db.session.execute(query, execution_options={'yield_per': COLUMNAR_BATCH_SIZE})
+    for rows in result.partitions():
+        yield list(zip(*rows))
+
+def write_shipments_columnar(output, format, since=None, until=None, progress=None):
+    """Write shipments after the (created_at, id) position ``since`` up to ``until`` to ``output``.
+
+    ``until`` defaults to the newest shipment, fixed before the first batch so
+    rows booked meanwhile wait for the next export. Returns the export's
+    metadata: row count and both positions.
+    """
+    if until is None:
+        until = _last_position()
+        until = tuple(until) if until else None
+    metadata = {
+        'since_created_at': since[0].isoformat() if since else None,
+        'since_id': since[1] if since else 0,
+        'until_created_at': until[0].isoformat() if until else None,
+        'until_id': until[1] if until else 0,
+        'rows': 0,
+        'exported_at': datetime.utcnow().isoformat()
+    }
+    total = db.session.query(db.func.count(Shipment.id)).filter(_in_range(since, until)).scalar() if until else 0
+    if progress:
+        progress(0, total)
+
+    writer = (_ParquetWriter if format == 'parquet' else _NpzWriter)(output, metadata)
+    if until:
+        for columns in _column_batches(since, until):
+            writer.write_batch(columns)
+            metadata['rows'] += len(columns[0])
+            if progress:
+                progress(metadata['rows'], total)
+    writer.close()
+    return metadata
+
+def export_shipments_since_last(output, format, cursor_name, progress=None):
+    """Columnar export of the shipments booked since ``cursor_name`` last ran; moves the cursor on.
+
+    The cursor is a (created_at, id) position. Shipments booked within the
+    last EXPORT_SAFETY_LAG_SECONDS are left for the next run, so a booking
+    whose transaction commits after a newer one has been exported is not
+    skipped. The cursor is updated in the session but not committed.
+    """
+    cursor = db.session.get(ExportCursor, cursor_name) or ExportCursor(name=cursor_name, last_id=0)
+    since = (cursor.last_created_at, cursor.last_id) if cursor.last_created_at else None
+
+    cutoff = datetime.utcnow() - timedelta(seconds=current_app.config['EXPORT_SAFETY_LAG_SECONDS'])
+    until = _last_position(Shipment.created_at <= cutoff)
+    if until is None or (since is not None and tuple(until) <= since):
+        until = since or (datetime.min, 0)  # nothing new that is old enough: an empty range
+    metadata = write_shipments_columnar(output, format, since=since, until=tuple(until), progress=progress)
+
+    if metadata['rows']:
+        cursor.last_created_at = datetime.fromisoformat(metadata['until_created_at'])
+        cursor.last_id = metadata['until_id']
+    cursor.exported_at = datetime.utcnow()
+    db.session.add(cursor)
+    return metadata
+
+class _ParquetWriter:
+    """Row group per batch through pyarrow, with dictionary-encoded category columns"""
+
+    def __init__(self, output, metadata):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        self.pa = pa
+        types = {
+            'int64': pa.int64(),
+            'float64': pa.float64(),
+            'string': pa.string(),
+            'category': pa.dictionary(pa.int32(), pa.string()),
+            'bool': pa.bool_(),
+            'timestamp': pa.timestamp('us')
+        }
+        # The id range travels in the file footer for the next incremental pull
+        self.schema = pa.schema(
+            [pa.field(name, types[kind]) for name, kind, _ in SHIPMENT_COLUMNS],
+            metadata={'courier.export': json.dumps({key: value for key, value in metadata.items() if key != 'rows'})}
+        )
+        self.writer = pq.ParquetWriter(output, self.schema, compression='zstd')
+
+    def write_batch(self, columns):
+        arrays = []
+        for (name, kind, _), values in zip(SHIPMENT_COLUMNS, columns):
+            if kind == 'category':
+                arrays.append(self.pa.array(values, type=self.pa.string()).dictionary_encode())
+            else:
+                arrays.append(self.pa.array(values, type=self.schema.field(name).type))
+        self.writer.write_table(self.pa.Table.from_arrays(arrays, schema=self.schema))
+
+    def close(self):
+        self.writer.close()
+
+_EPOCH = datetime(1970, 1, 1)
+
+def _npy_header(descr, shape):
+    """Version 1.0 .npy header for a C-order array"""
+    header = repr({'descr': descr, 'fortran_order': False, 'shape': shape})
+    padding = 64 - (10 + len(header) + 1) % 64
+    header = (header + ' ' * padding + '\n').encode('latin1')
+    return b'\x93NUMPY\x01\x00' + struct.pack('<H', len(header)) + header
+
+class _NpzWriter:
+    """NumPy .npz archive written without NumPy; ``numpy.load`` reads it.
+
+    Each column is spooled to a temporary file while batches arrive (the
+    .npy header needs the final row count and string width), then deflated
+    into the archive. Category columns become int32 codes in ``<name>.npy``
+    (-1 for NULL) and their values in ``<name>_categories.npy``; metadata is
+    a JSON string in ``_metadata.npy``.
+    """
+    PACKERS = {
+        'int64': ('<i8', lambda value: struct.pack('<q', value)),
+        'float64': ('<f8', lambda value: struct.pack('<d', math.nan if value is None else value)),
+        'bool': ('|b1', lambda value: b'\x01' if value else b'\x00'),
+        'timestamp': ('<M8[us]', lambda value: struct.pack('<q', -2 ** 63 if value is None else
+                                                            (value - _EPOCH) // timedelta(microseconds=1)))
+    }
+
+    def __init__(self, output, metadata):
+        self.output = output
+        self.metadata = metadata
+        self.rows = 0
+        self.spools = [tempfile.TemporaryFile() for _ in SHIPMENT_COLUMNS]
+        self.widths = [1] * len(SHIPMENT_COLUMNS)
+        self.categories = [{} for _ in SHIPMENT_COLUMNS]
+
+    def write_batch(self, columns):
+        for index, ((_, kind, _), values) in enumerate(zip(SHIPMENT_COLUMNS, columns)):
+            spool = self.spools[index]
+            if kind == 'category':
+                codes = self.categories[index]
+                spool.write(struct.pack(f'<{len(values)}i', *[
+                    -1 if value is None else codes.setdefault(value, len(codes)) for value in values
+                ]))
+            elif kind == 'string':
+                # Length-prefixed UTF-32 now, padded to the widest value in close()
+                for value in values:
+                    encoded = (value or '').encode('utf-32-le')
+                    self.widths[index] = max(self.widths[index], len(encoded) // 4)
+                    spool.write(struct.pack('<I', len(encoded)) + encoded)
+            else:
+                spool.write(b''.join(map(self.PACKERS[kind][1], values)))
+        self.rows += len(columns[0])
+
+    def close(self):
+        with zipfile.ZipFile(self.output, 'w', zipfile.ZIP_DEFLATED) as archive:
+            for index, (name, kind, _) in enumerate(SHIPMENT_COLUMNS):
+                spool = self.spools[index]
+                spool.seek(0)
+                with archive.open(f'{name}.npy', 'w', force_zip64=True) as member:
+                    if kind == 'category':
+                        member.write(_npy_header('<i4', (self.rows,)))
+                        shutil.copyfileobj(spool, member)
+                    elif kind == 'string':
+                        width = self.widths[index]
+                        member.write(_npy_header(f'<U{width}', (self.rows,)))
+                        for _ in range(self.rows):
+                            (length,) = struct.unpack('<I', spool.read(4))
+                            member.write(spool.read(length).ljust(width * 4, b'\x00'))
+                    else:
+                        member.write(_npy_header(self.PACKERS[kind][0], (self.rows,)))
+                        shutil.copyfileobj(spool, member)
+                spool.close()
+
+                if kind == 'category':
+                    values = list(self.categories[index])
+                    archive.writestr(f'{name}_categories.npy', _npy_array(values))
+
+            archive.writestr('_metadata.npy', _npy_array(json.dumps(self.metadata)))
+
+def _npy_array(values):
+    """.npy bytes for a list of strings (1-d) or a single string (0-d)"""
+    strings = [values] if isinstance(values, str) else values
+    width = max([len(value) for value in strings] + [1])
+    body = b''.join(value.encode('utf-32-le').ljust(width * 4, b'\x00') for value in strings)
+    return _npy_header(f'<U{width}', () if isinstance(values, str) else (len(values),)) + body
@@ -0,0 +1,9 @@
+"""
+Flask extensions, created unbound and attached to the app in create_app()
+"""
+from flask_login import LoginManager
+from flask_sqlalchemy import SQLAlchemy
+
+db = SQLAlchemy()
+login_manager = LoginManager()
+login_manager.login_view = 'auth.login'
@@ -0,0 +1,68 @@
+"""
+WTForms used by the booking, auth and admin pages
+"""
+from flask_wtf import FlaskForm
+from wtforms import StringField, PasswordField, FloatField, TextAreaField, SelectField, FileField, BooleanField, HiddenField
+from wtforms.validators import DataRequired, Email, Length, ValidationError, Optional
+
+from .models import Branch
+
+class LoginForm(FlaskForm):
+    email = StringField('Email', validators=[DataRequired(), Email()])
+    password = PasswordField('Password', validators=[DataRequired()])
+
+class BranchRegistrationForm(FlaskForm):
+    name = StringField('Branch Name', validators=[DataRequired(), Length(min=2, max=100)])
+    email = StringField('Email', validators=[DataRequired(), Email()])
+    password = PasswordField('Password', validators=[DataRequired(), Length(min=6)])
+    phone = StringField('Phone', validators=[DataRequired(), Length(min=10, max=20)])
+    branch_code = StringField('Branch Code', validators=[DataRequired(), Length(min=2, max=20)])
+    address = TextAreaField('Address', validators=[DataRequired()])
+    postal_code = StringField('Postal Code', validators=[DataRequired()])
+
+    def validate_email(self, email):
+        branch = Branch.query.filter_by(email=email.data).first()
+        if branch:
+            raise ValidationError('Email already registered.')
+
+    def validate_branch_code(self, branch_code):
+        branch = Branch.query.filter_by(branch_code=branch_code.data).first()
+        if branch:
+            raise ValidationError('Branch code already registered.')
+
+class ShipmentForm(FlaskForm):
+    # Sender Information
+    sender_name = StringField('Sender Name', validators=[DataRequired()])
+    sender_phone = StringField('Sender Phone', validators=[DataRequired()])
+    sender_cnic = StringField('Sender CNIC', validators=[DataRequired()])
+    sender_address = TextAreaField('Sender Address', validators=[DataRequired()])
+    sender_postal_code = StringField('Sender Postal Code', validators=[DataRequired()])
+
+    # Receiver Information
+    receiver_name = StringField('Receiver Name', validators=[DataRequired()])
+    receiver_phone = StringField('Receiver Phone', validators=[DataRequired()])
+    receiver_cnic = StringField('Receiver CNIC', validators=[DataRequired()])
+    receiver_address = TextAreaField('Receiver Address', validators=[DataRequired()])
+    receiver_postal_code = StringField('Receiver Postal Code', validators=[DataRequired()])
+
+    # Package Information
+    destination_country = SelectField('Destination Country', validators=[DataRequired()])
+    length = FloatField('Length (cm)', validators=[DataRequired()])
+    width = FloatField('Width (cm)', validators=[DataRequired()])
+    height = FloatField('Height (cm)', validators=[DataRequired()])
+    actual_weight = FloatField('Actual Weight (kg)', validators=[DataRequired()])
+    weight_type = SelectField('Weight Type', choices=[('actual', 'Actual Weight'), ('volumetric', 'Volumetric Weight')], validators=[DataRequired()])
+    document_type = SelectField('Package Type', choices=[('docs', 'Documents'), ('non_docs', 'Non-Documents')], validators=[DataRequired()])
+
+    # Undertaking
+    undertaking_accepted = BooleanField('I accept the Terms and Conditions', validators=[Optional()])
+    undertaking_text = TextAreaField('Special Instructions (Optional)', validators=[Optional()])
+
+    # Rate card the page quoted from; set by the booking page's script
+    rate_card_version = HiddenField()
+
+class PricingUploadForm(FlaskForm):
+    pricing_file = FileField('Pricing File (CSV)', validators=[DataRequired()])
+
+class ExchangeRateUploadForm(FlaskForm):
+    rates_file = FileField('Exchange Rates File (CSV)', validators=[DataRequired()])
@@ -0,0 +1,284 @@
+"""
+Background jobs for work that would otherwise outlive the gunicorn timeout
+
+Jobs live in the application database, so no Redis or Celery is needed:
+web requests insert a row and return its id, and worker processes started
+with `flask --app main run-jobs` claim rows, report progress and write result
+files under JOB_RESULTS_FOLDER (instance/jobs by default).
+"""
+import json
+import multiprocessing
+import os
+import socket
+import time
+import traceback
+from datetime import datetime, timedelta
+
+import click
+from flask import current_app, jsonify, redirect, request, url_for
+from sqlalchemy.exc import OperationalError
+from werkzeug.utils import secure_filename
+
+from .extensions import db
+from .models import Job
+
+JOB_HANDLERS = {}
+
+class JobFailed(Exception):
+    """Raised by a handler for errors that retrying cannot fix"""
+
+def job_handler(kind):
+    """Register a function as the handler for jobs of ``kind``.
+
+    Handlers are called as ``handler(ctx, **params)`` with a JobContext and
+    may return a short message to show once the job is done.
+    """
+    def register(func):
+        JOB_HANDLERS[kind] = func
+        return func
+    return register
+
+class JobContext:
+    """Progress reporting and result files for the job a handler is running"""
+
+    def __init__(self, job):
+        self.job = job
+        self.path = None
+        self.result_name = None
+        self.result_mimetype = None
+        self.done = 0
+        self.total = None
+        self.message = None
+
+    def progress(self, done, total=None, message=None):
+        """Record progress and refresh the heartbeat.
+
+        Written on its own short connection, so the handler's session (and
+        any result it is iterating) is untouched; skipped if the row is busy.
+        """
+        self.done = done
+        if total is not None:
+            self.total = total
+        if message is not None:
+            self.message = message[:255]
+        try:
+            with db.engine.begin() as connection:
+                connection.execute(db.update(Job).where(Job.id == self.job.id).values(
+                    progress=self.done,
+                    total=self.total,
+                    message=self.message,
+                    heartbeat_at=datetime.utcnow()
+                ))
+        except OperationalError as e:
+            print(f"Could not record progress for job #{self.job.id}: {e}")
+
+    def open_result(self, filename, mimetype, binary=False):
+        """Open the job's result file for writing; it is offered as ``filename``"""
+        folder = current_app.config['JOB_RESULTS_FOLDER']
+        os.makedirs(folder, exist_ok=True)
+        # Recorded on the job only when it succeeds, so the handler's session stays clean
+        self.path = os.path.join(folder, f'{self.job.id}-{secure_filename(filename)}')
+        self.result_name = filename
+        self.result_mimetype = mimetype
+        if binary:
+            return open(self.path, 'wb')
+        return open(self.path, 'w', newline='', encoding='utf-8')
+
+    def discard_result(self):
+        if self.path and os.path.exists(self.path):
+            os.remove(self.path)
+        self.path = None
+
+def result_path(job):
+    return os.path.join(current_app.config['JOB_RESULTS_FOLDER'], job.result_file)
+
+def _remove_result(job):
+    if job.result_file:
+        try:
+            os.remove(result_path(job))
+        except OSError:
+            pass
+        job.result_file = None
+
+def enqueue_job(kind, params=None, created_by=None, max_attempts=None, unique=False):
+    """Queue a job and return it.
+
+    With ``unique`` an already queued job of the same kind and params is
+    returned instead of adding another. With JOBS_RUN_INLINE the job runs
+    before this returns, for setups without a worker process.
+    """
+    params_json = json.dumps(params or {}, sort_keys=True)
+    if unique:
+        existing = Job.query.filter_by(kind=kind, params=params_json, status='queued').first()
+        if existing:
+            return existing
+
+    job = Job(
+        kind=kind,
+        params=params_json,
+        created_by=created_by,
+        max_attempts=max_attempts or current_app.config['JOB_MAX_ATTEMPTS']
+    )
+    db.session.add(job)
+    db.session.commit()
+
+    if current_app.config['JOBS_RUN_INLINE'] and claim_job(job.id, 'inline'):
+        run_job(job)
+    return job
+
+def job_accepted(job):
+    """Answer an enqueue request: JSON for API callers, otherwise the job's progress page"""
+    if request.is_json or request.accept_mimetypes.best == 'application/json':
+        return jsonify({
+            'success': True,
+            'job_id': job.id,
+            'status': job.status,
+            'status_url': url_for('jobs.job_status_api', job_id=job.id),
+            'page_url': url_for('jobs.job_page', job_id=job.id)
+        }), 202
+    return redirect(url_for('jobs.job_page', job_id=job.id))
+
+def claim_job(job_id, worker):
+    """Atomically move a queued job to running; False if another worker won"""
+    now = datetime.utcnow()
+    try:
+        claimed = Job.query.filter_by(id=job_id, status='queued').update({
+            'status': 'running',
+            'worker': worker,
+            'attempts': Job.attempts + 1,
+            'started_at': now,
+            'heartbeat_at': now
+        }, synchronize_session=False)
+        db.session.commit()
+    except OperationalError:
+        # Lost a write race on SQLite; the job stays with whoever holds it
+        db.session.rollback()
+        return False
+    if claimed:
+        db.session.expire_all()
+    return claimed == 1
+
+def claim_next_job(worker):
+    """Claim the oldest runnable job, or return None when the queue is empty"""
+    candidates = db.session.query(Job.id).filter(
+        Job.status == 'queued',
+        Job.run_after <= datetime.utcnow()
+    ).order_by(Job.id).limit(10).all()
+
+    for (job_id,) in candidates:
+        if claim_job(job_id, worker):
+            return db.session.get(Job, job_id)
+    return None
+
+def _retry_or_fail(job, error, retryable=True):
+    now = datetime.utcnow()
+    job.error = error
+    if retryable and job.attempts < job.max_attempts:
+        delay = current_app.config['JOB_RETRY_DELAY_SECONDS'] * 2 ** max(job.attempts - 1, 0)
+        job.status = 'queued'
+        job.run_after = now + timedelta(seconds=delay)
+    else:
+        job.status = 'failed'
+        job.finished_at = now
+
+def run_job(job):
+    """Run a claimed job's handler and record the outcome; True on success"""
+    from . import tasks  # noqa: F401  (registers the handlers)
+
+    handler = JOB_HANDLERS.get(job.kind)
+    ctx = JobContext(job)
+    try:
+        if handler is None:
+            raise JobFailed(f'No handler registered for job kind {job.kind!r}')
+        message = handler(ctx, **json.loads(job.params or '{}'))
+    except Exception as e:
+        db.session.rollback()
+        print(f"Job #{job.id} ({job.kind}) attempt {job.attempts} failed: {e}")
+        traceback.print_exc()
+        ctx.discard_result()
+        _remove_result(job)
+        _retry_or_fail(job, f'{type(e).__name__}: {e}', retryable=not isinstance(e, JobFailed))
+        db.session.commit()
+        return False
+
+    job.status = 'done'
+    if ctx.path:
+        job.result_file = os.path.basename(ctx.path)
+        job.result_name = ctx.result_name
+        job.result_mimetype = ctx.result_mimetype
+    job.total = ctx.total
+    job.progress = ctx.total or ctx.done
+    job.message = (message or ctx.message or '')[:255] or None
+    job.error = None
+    job.finished_at = datetime.utcnow()
+    db.session.commit()
+    return True
+
+def requeue_stale_jobs():
+    """Retry running jobs whose worker stopped sending heartbeats"""
+    cutoff = datetime.utcnow() - timedelta(seconds=current_app.config['JOB_STALE_SECONDS'])
+    stale_jobs = Job.query.filter(Job.status == 'running', Job.heartbeat_at < cutoff).all()
+    for job in stale_jobs:
+        _remove_result(job)
+        _retry_or_fail(job, f'Worker {job.worker} stopped responding')
+    db.session.commit()
+    return len(stale_jobs)
+
+def purge_expired_jobs():
+    """Delete finished jobs, and their result files, after JOB_RESULT_TTL_HOURS"""
+    cutoff = datetime.utcnow() - timedelta(hours=current_app.config['JOB_RESULT_TTL_HOURS'])
+    expired_jobs = Job.query.filter(Job.status.in_(['done', 'failed']), Job.finished_at < cutoff).all()
+    for job in expired_jobs:
+        _remove_result(job)
+        db.session.delete(job)
+    db.session.commit()
+    return len(expired_jobs)
+
+def work(poll_interval=None, once=False):
+    """Claim and run jobs until interrupted; with ``once`` stop when the queue is empty"""
+    worker = f'{socket.gethostname()}:{os.getpid()}'
+    poll_interval = poll_interval or current_app.config['JOB_POLL_SECONDS']
+    last_maintenance = 0
+    print(f"Job worker {worker} started")
+
+    while True:
+        if time.monotonic() - last_maintenance > 60:
+            requeue_stale_jobs()
+            purge_expired_jobs()
+            last_maintenance = time.monotonic()
+
+        job = claim_next_job(worker)
+        if job:
+            print(f"Job #{job.id} ({job.kind}) claimed by {worker}")
+            run_job(job)
+            db.session.remove()
+            continue
+
+        if once:
+            return
+        time.sleep(poll_interval)
+
+def _work_in_new_app(poll_interval, once):
+    from . import create_app
+
+    app = create_app()
+    with app.app_context():
+        work(poll_interval, once)
+
+def register_job_commands(app):
+    @app.cli.command('run-jobs')
+    @click.option('--processes', default=1, show_default=True, help='Worker processes to start.')
+    @click.option('--poll-interval', type=float, default=None, help='Seconds to sleep when the queue is empty.')
+    @click.option('--once', is_flag=True, help='Exit once the queue is empty.')
+    def run_jobs_command(processes, poll_interval, once):
+        """Run background job workers."""
+        if processes <= 1:
+            work(poll_interval, once)
+            return
+
+        spawn = multiprocessing.get_context('spawn')
+        workers = [spawn.Process(target=_work_in_new_app, args=(poll_interval, once)) for _ in range(processes)]
+        for process in workers:
+            process.start()
+        for process in workers:
+            process.join()
@@ -0,0 +1,54 @@
+"""
+Lean shipment projections for listing pages, list APIs and exports
+"""
+from sqlalchemy.orm import contains_eager, load_only
+
+from .extensions import db
+from .models import Branch, Country, Shipment
+
+# What listing pages show; addresses, CNICs, dimensions and the undertaking text stay unloaded
+SHIPMENT_LISTING_COLUMNS = (
+    Shipment.id, Shipment.tracking_id, Shipment.barcode, Shipment.client_id, Shipment.destination_country_id,
+    Shipment.sender_name, Shipment.sender_phone, Shipment.receiver_name, Shipment.receiver_phone,
+    Shipment.chargeable_weight, Shipment.weight_type, Shipment.document_type,
+    Shipment.final_price, Shipment.final_price_pkr, Shipment.status, Shipment.created_at
+)
+
+def shipment_listing_query():
+    """Shipment query for listing templates, joined to Branch and Country.
+
+    Loads only SHIPMENT_LISTING_COLUMNS plus the branch name/email and the
+    country name/currency, filled from the joins so ``shipment.branch`` and
+    ``shipment.destination_country`` cost no extra queries. Touching any
+    other column loads it on access, one query per row.
+    """
+    return Shipment.query.join(Shipment.branch).join(Shipment.destination_country).options(
+        load_only(*SHIPMENT_LISTING_COLUMNS),
+        contains_eager(Shipment.branch).load_only(Branch.name, Branch.email),
+        contains_eager(Shipment.destination_country).load_only(Country.name, Country.currency)
+    )
+
+def parcel_rows_query(*extra_columns):
+    """Flat parcel rows (no ORM objects) for tables and JSON, joined to Branch and Country.
+
+    Rows carry the listing columns as attributes, with ``client_name`` and
+    ``destination_country`` for the joined names, plus any ``extra_columns``.
+    Without extras the column order is serializers.ParcelRow's arguments.
+    """
+    return db.session.query(
+        Shipment.id, Shipment.tracking_id, Shipment.barcode,
+        Branch.name.label('client_name'), Shipment.sender_phone,
+        Country.name.label('destination_country'),
+        Shipment.chargeable_weight, Shipment.weight_type,
+        Shipment.final_price, Shipment.final_price_pkr,
+        Shipment.status, Shipment.created_at,
+        *extra_columns
+    ).select_from(Shipment).join(Shipment.branch).join(Shipment.destination_country)
+
+def scanned_shipment_query(shipment_id):
+    """The columns serializers.ScannedShipment needs, with the destination's name"""
+    return db.session.query(
+        Shipment.id, Shipment.tracking_id, Shipment.sender_name, Shipment.sender_phone,
+        Shipment.receiver_name, Shipment.receiver_phone, Country.name.label('destination'),
+        Shipment.chargeable_weight, Shipment.status, Shipment.created_at
+    ).join(Shipment.destination_country).filter(Shipment.id == shipment_id)
@@ -0,0 +1,516 @@
+"""
+Schema migrations and seed data, run explicitly rather than at worker startup
+
+    flask --app main migrate-db
+    python init_db.py
+"""
+import os
+from datetime import datetime
+
+import click
+from flask import current_app
+from sqlalchemy import inspect as sa_inspect
+
+from .barcodes import decode_barcode, generate_barcode_number, generate_barcode_with_shipment_data
+from .currency import convert_to_pkr, convert_to_pkr_bulk, load_exchange_rates_csv
+from .database import verify_sqlite_profile
+from .extensions import db
+from .models import Branch, BranchStats, Country, DailyRollup, ExchangeRate, HourlyRollup, Shipment, ShipmentEvent
+from .pricing import calculate_pricing, import_rate_card_csv, migrate_legacy_pricing_tiers
+from .rollups import rebuild_daily_rollup, rebuild_hourly_rollup
+from .shipments import (CLEANUP_CHUNK_SIZE, cleanup_duplicate_tracking_ids, generate_tracking_id, next_change_seq,
+                        rebuild_branch_stats)
+
+def run_migrations():
+    """Bring the schema and seed data up to date; returns False on failure"""
+    # Confirm the SQLite tuning profile took effect
+    verify_sqlite_profile()
+
+    print("Checking and updating database schema...")
+    if not update_database_schema():
+        print("Failed to update database schema.")
+        return False
+
+    print("Updating existing shipments with new features...")
+    update_existing_shipments()
+
+    print("Initializing database...")
+    if not initialize_database():
+        print("Failed to initialize database. Please check the error messages above.")
+        return False
+    return True
+
+def register_commands(app):
+    @app.cli.command('migrate-db')
+    def migrate_db_command():
+        """Update the database schema and load sample data."""
+        if not run_migrations():
+            raise SystemExit(1)
+
+    @app.cli.command('cleanup-duplicates')
+    @click.option('--dry-run', is_flag=True, help='Report duplicates without deleting anything.')
+    @click.option('--chunk-size', default=CLEANUP_CHUNK_SIZE, show_default=True, help='Shipments deleted per transaction.')
+    def cleanup_duplicates_command(dry_run, chunk_size):
+        """Delete shipments that repeat a tracking ID, keeping the oldest."""
+        report = cleanup_duplicate_tracking_ids(dry_run=dry_run, chunk_size=chunk_size)
+        for duplicate_id, tracking_id, keeper_id in report['duplicates']:
+            print(f"  {tracking_id}: {'would delete' if dry_run else 'deleted'} shipment {duplicate_id}, kept {keeper_id}")
+
+    @app.cli.command('rebuild-branch-stats')
+    def rebuild_branch_stats_command():
+        """Recompute every branch's dashboard counters from its shipments."""
+        count = rebuild_branch_stats()
+        db.session.commit()
+        print(f"✓ Rebuilt counters for {count} branches")
+
+    @app.cli.command('rebuild-rollups')
+    @click.option('--start', type=click.DateTime(['%Y-%m-%d']), help='First booking date to rebuild (default: all).')
+    @click.option('--end', type=click.DateTime(['%Y-%m-%d']), help='Last booking date to rebuild (default: all).')
+    def rebuild_rollups_command(start, end):
+        """Recompute the daily report cube and hourly rollups from the shipment table."""
+        start, end = (start.date() if start else None), (end.date() if end else None)
+        daily_count = rebuild_daily_rollup(start, end)
+        hourly_count = rebuild_hourly_rollup(start, end)
+        db.session.commit()
+        print(f"✓ Rebuilt {daily_count} daily and {hourly_count} hourly rollup cells")
+
+def _add_missing_columns(table, columns):
+    """ALTER TABLE ``table`` to add any of ``columns`` ((name, type) pairs) it lacks.
+
+    Columns are looked up with the inspector rather than probed with a SELECT:
+    on Postgres a failed probe aborts the transaction and every later ALTER
+    with it.
+    """
+    existing = {column['name'] for column in sa_inspect(db.engine).get_columns(table)}
+    for column, column_type in columns:
+        if column in existing:
+            print(f"✓ {column} column already exists")
+            continue
+        print(f"Adding {column} column to {table} table...")
+        db.session.execute(db.text(f"ALTER TABLE {table} ADD COLUMN {column} {column_type}"))
+        print(f"✓ Added {column} column")
+
+def update_database_schema():
+    """Update database schema to add new columns"""
+    try:
+        _add_missing_columns('shipment', [
+            ('barcode', 'VARCHAR(20)'),
+            ('final_price_pkr', 'FLOAT'),
+            # Change feed
+            ('updated_at', 'TIMESTAMP'),
+            ('change_seq', 'BIGINT')
+        ])
+
+        # Rate cards
+        _add_missing_columns('pricing_tier', [('rate_card_id', 'INTEGER')])
+
+        db.session.commit()
+        print("Database schema check completed!")
+        return True
+
+    except Exception as e:
+        db.session.rollback()
+        print(f"Error checking database schema: {e}")
+        return False
+
+def update_existing_shipments():
+    """Update existing shipments with barcodes and PKR pricing"""
+    try:
+        # Find shipments without barcodes - use a simpler query to avoid column issues
+        try:
+            # Try with branch_id first (new structure)
+            shipments_without_barcode = Shipment.query.filter(
+                db.or_(Shipment.barcode.is_(None), Shipment.barcode == '')
+            ).all()
+        except Exception:
+            # If that fails, try with client_id (old structure)
+            shipments_without_barcode = Shipment.query.filter(
+                db.or_(Shipment.barcode.is_(None), Shipment.barcode == '')
+            ).all()
+
+        if shipments_without_barcode:
+            print(f"Updating {len(shipments_without_barcode)} shipments with enhanced barcodes...")
+            for shipment in shipments_without_barcode:
+                # Generate comprehensive barcode with shipment data if missing
+                if not shipment.barcode:
+                    generate_barcode_with_shipment_data(shipment)
+
+            # Calculate PKR price if missing, at the rate in effect on the booking date
+            missing_pkr = [s for s in shipments_without_barcode if not s.final_price_pkr]
+            if missing_pkr:
+                try:
+                    pkr_prices = convert_to_pkr_bulk(
+                        [s.final_price for s in missing_pkr],
+                        [s.destination_country.currency for s in missing_pkr],
+                        [s.created_at.date() for s in missing_pkr]
+                    )
+                    for shipment, final_price_pkr in zip(missing_pkr, pkr_prices):
+                        shipment.final_price_pkr = final_price_pkr
+                except ValueError as e:
+                    print(f"Note: Could not backfill PKR prices: {e}")
+
+            db.session.commit()
+            print(f"✓ Updated {len(shipments_without_barcode)} existing shipments with enhanced barcodes")
+        else:
+            print("All shipments already have barcodes and PKR pricing")
+
+        return True
+
+    except Exception as e:
+        print(f"Error updating existing shipments: {e}")
+        # Don't rollback here as it might cause context issues
+        return False
+
+def backfill_booking_events():
+    """Add a 'booked' ShipmentEvent, dated at booking, to shipments that have no history"""
+    result = db.session.execute(db.insert(ShipmentEvent).from_select(
+        ['shipment_id', 'from_status', 'to_status', 'changed_by', 'created_at'],
+        db.select(
+            Shipment.id,
+            db.null(),
+            db.literal('booked'),
+            Shipment.client_id,
+            Shipment.created_at
+        ).where(~db.exists().where(ShipmentEvent.shipment_id == Shipment.id))
+    ))
+    db.session.commit()
+    if result.rowcount:
+        print(f"✓ Added booking events for {result.rowcount} shipments")
+
+def backfill_change_feed():
+    """Stamp shipments from before the change feed with one change sequence number"""
+    # create_all() skips indexes on tables that already existed
+    db.session.execute(db.text("CREATE INDEX IF NOT EXISTS ix_shipment_change_seq ON shipment (change_seq, id)"))
+    unstamped = Shipment.query.filter(Shipment.change_seq.is_(None))
+    if db.session.query(unstamped.exists()).scalar():
+        count = unstamped.update({
+            'change_seq': next_change_seq(),
+            'updated_at': db.func.coalesce(Shipment.updated_at, Shipment.created_at)
+        }, synchronize_session=False)
+        print(f"✓ Added {count} shipments to the change feed")
+    db.session.commit()
+
+def create_tables():
+    db.create_all()
+
+    # Create default admin user if not exists
+    admin = Branch.query.filter_by(email='admin@login.com').first()
+    if not admin:
+        admin = Branch(
+            name='Administrator',
+            email='admin@login.com',
+            phone='0000000000',
+            branch_code='ADMIN',
+            address='Admin Office',
+            postal_code='00000',
+            is_admin=True
+        )
+        admin.set_password('admin123')
+        db.session.add(admin)
+        db.session.commit()
+
+def initialize_database():
+    """Initialize database tables and sample data"""
+    try:
+        # Only create tables if they don't exist
+        try:
+            create_tables()
+            print("Database tables created successfully!")
+        except Exception as e:
+            print(f"Note: Tables may already exist: {e}")
+
+        # Move pre-versioning pricing tiers into a published rate card
+        try:
+            migrate_legacy_pricing_tiers()
+        except Exception as e:
+            print(f"Note: Could not migrate legacy pricing tiers: {e}")
+
+        # Give shipments booked before status history existed their booking event
+        try:
+            backfill_booking_events()
+        except Exception as e:
+            print(f"Note: Could not backfill shipment events: {e}")
+
+        # Put shipments booked before the change feed existed into it
+        try:
+            backfill_change_feed()
+        except Exception as e:
+            db.session.rollback()
+            print(f"Note: Could not backfill the change feed: {e}")
+
+        # create_all() skips indexes on tables that already existed
+        try:
+            db.session.execute(db.text("CREATE INDEX IF NOT EXISTS ix_shipment_created_at_id ON shipment (created_at, id)"))
+            db.session.commit()
+        except Exception as e:
+            db.session.rollback()
+            print(f"Note: Could not create the export cursor index: {e}")
+
+        # Clean up any duplicate tracking IDs
+        try:
+            cleanup_duplicate_tracking_ids()
+        except Exception as e:
+            print(f"Note: Could not cleanup duplicates: {e}")
+
+        # Build the per-branch dashboard counters on first run
+        try:
+            if BranchStats.query.count() == 0:
+                count = rebuild_branch_stats()
+                db.session.commit()
+                print(f"✓ Built dashboard counters for {count} branches")
+        except Exception as e:
+            db.session.rollback()
+            print(f"Note: Could not build branch counters: {e}")
+
+        # Build the report rollups on first run
+        try:
+            if DailyRollup.query.count() == 0:
+                count = rebuild_daily_rollup()
+                db.session.commit()
+                print(f"✓ Built {count} daily rollup cells")
+            if HourlyRollup.query.count() == 0:
+                count = rebuild_hourly_rollup()
+                db.session.commit()
+                print(f"✓ Built {count} hourly rollup cells")
+        except Exception as e:
+            db.session.rollback()
+            print(f"Note: Could not build report rollups: {e}")
+
+        # Load sample pricing data if no countries exist
+        try:
+            if Country.query.count() == 0:
+                load_sample_pricing_data()
+                print("Sample pricing data loaded!")
+        except Exception as e:
+            print(f"Note: Could not load pricing data: {e}")
+
+        # Load sample exchange rates if none exist
+        try:
+            if ExchangeRate.query.count() == 0:
+                load_sample_exchange_rates()
+                print("Sample exchange rates loaded!")
+        except Exception as e:
+            print(f"Note: Could not load exchange rates: {e}")
+
+        # Test the enhanced barcode system
+        try:
+            test_barcode_system()
+            print("Enhanced barcode system test completed!")
+        except Exception as e:
+            print(f"Note: Could not test barcode system: {e}")
+
+        print("Database initialization completed!")
+        return True
+    except Exception as e:
+        print(f"Database initialization failed: {e}")
+        return False
+
+def load_sample_pricing_data():
+    """Load sample pricing data from CSV file"""
+    try:
+        csv_path = os.path.join(current_app.root_path, 'sample_pricing.csv')
+
+        if not os.path.exists(csv_path):
+            print("Sample pricing CSV file not found!")
+            return
+
+        with open(csv_path, 'r') as csvfile:
+            rate_card, success_count, error_count = import_rate_card_csv(csvfile, 'Sample pricing')
+
+        # The sample card is quoted from immediately
+        rate_card.status = 'published'
+        rate_card.published_at = datetime.utcnow()
+        db.session.commit()
+        print(f"Sample pricing data loaded successfully! {success_count} records added, {error_count} errors.")
+
+    except Exception as e:
+        print(f"Error loading sample pricing data: {str(e)}")
+        db.session.rollback()
+
+def load_sample_exchange_rates():
+    """Load sample exchange rates from CSV file"""
+    csv_path = os.path.join(current_app.root_path, 'sample_exchange_rates.csv')
+
+    if not os.path.exists(csv_path):
+        print("Sample exchange rates CSV file not found!")
+        return
+
+    with open(csv_path, 'r') as csvfile:
+        loaded_count, error_count = load_exchange_rates_csv(csvfile)
+    print(f"Sample exchange rates loaded successfully! {loaded_count} rates added, {error_count} errors.")
+
+def create_sample_shipments():
+    """Create sample shipments with different senders for testing"""
+    try:
+        # Get or create a test admin user
+        admin = Branch.query.filter_by(email='admin@login.com').first()
+        if not admin:
+            return
+
+        # Get a destination country
+        pakistan = Country.query.filter_by(code='PK').first()
+        if not pakistan:
+            pakistan = Country(
+                name='Pakistan',
+                code='PK',
+                currency='PKR',
+                is_active=True
+            )
+            db.session.add(pakistan)
+            db.session.flush()  # Flush to get the ID without committing
+
+        # Sample shipment data
+        sample_shipments = [
+            {
+                'sender_name': 'Ahmed Hassan',
+                'sender_phone': '03111234567',
+                'sender_cnic': '3520112345671',
+                'sender_address': '123 Main Street, Lahore, Pakistan',
+                'sender_postal_code': '54000',
+                'receiver_name': 'Sara Ahmed',
+                'receiver_phone': '03111234568',
+                'receiver_cnic': '3520112345674',
+                'receiver_address': '456 Business Ave, Karachi, Pakistan',
+                'receiver_postal_code': '75500'
+            },
+            {
+                'sender_name': 'Fatima Khan',
+                'sender_phone': '03219876543',
+                'sender_cnic': '3520112345672',
+                'sender_address': '456 Garden Road, Karachi, Pakistan',
+                'sender_postal_code': '75500',
+                'receiver_name': 'Omar Khan',
+                'receiver_phone': '03219876544',
+                'receiver_cnic': '3520112345675',
+                'receiver_address': '789 Mall Road, Lahore, Pakistan',
+                'receiver_postal_code': '54000'
+            },
+            {
+                'sender_name': 'Usman Ali',
+                'sender_phone': '03331234567',
+                'sender_cnic': '3520112345673',
+                'sender_address': '789 Business District, Islamabad, Pakistan',
+                'sender_postal_code': '44000',
+                'receiver_name': 'Ayesha Usman',
+                'receiver_phone': '03331234568',
+                'receiver_cnic': '3520112345676',
+                'receiver_address': '321 Lake View, Islamabad, Pakistan',
+                'receiver_postal_code': '44000'
+            },
+            {
+                'sender_name': 'Ahmed Hassan',  # Repeat customer
+                'sender_phone': '03111234567',
+                'sender_cnic': '3520112345671',
+                'sender_address': '123 Main Street, Lahore, Pakistan',
+                'sender_postal_code': '54000',
+                'receiver_name': 'Zahra Ahmed',
+                'receiver_phone': '03111234569',
+                'receiver_cnic': '3520112345677',
+                'receiver_address': '654 Park Lane, Faisalabad, Pakistan',
+                'receiver_postal_code': '38000'
+            }
+        ]
+
+        shipments_created = 0
+        for shipment_data in sample_shipments:
+            # Check if similar shipment already exists
+            existing = Shipment.query.filter_by(
+                sender_phone=shipment_data['sender_phone'],
+                receiver_phone=shipment_data['receiver_phone']
+            ).first()
+
+            if not existing:
+                # Generate tracking ID and barcode
+                tracking_id = generate_tracking_id()
+
+                # Calculate pricing (using default values)
+                pricing_data = calculate_pricing(
+                    pakistan.id, 10, 10, 10, 1.0, 'actual'
+                )
+
+                if 'error' not in pricing_data:
+                    final_price_pkr = convert_to_pkr(pricing_data['final_price'], 'USD')
+
+                    shipment = Shipment(
+                        tracking_id=tracking_id,
+                        barcode='',  # Will be set after creation
+                        client_id=admin.id,
+                        sender_name=shipment_data['sender_name'],
+                        sender_phone=shipment_data['sender_phone'],
+                        sender_cnic=shipment_data['sender_cnic'],
+                        sender_address=shipment_data['sender_address'],
+                        sender_postal_code=shipment_data['sender_postal_code'],
+                        receiver_name=shipment_data['receiver_name'],
+                        receiver_phone=shipment_data['receiver_phone'],
+                        receiver_cnic=shipment_data['receiver_cnic'],
+                        receiver_address=shipment_data['receiver_address'],
+                        receiver_postal_code=shipment_data['receiver_postal_code'],
+                        destination_country_id=pakistan.id,
+                        length=10,
+                        width=10,
+                        height=10,
+                        actual_weight=1.0,
+                        weight_type='actual',
+                        document_type='non_docs',
+                        volumetric_weight=pricing_data['volumetric_weight'],
+                        chargeable_weight=pricing_data['chargeable_weight'],
+                        base_price=pricing_data['base_price'],
+                        gst_amount=pricing_data['gst_amount'],
+                        final_price=pricing_data['final_price'],
+                        final_price_pkr=final_price_pkr,
+                        status='delivered'  # Mark as delivered so they appear in history
+                    )
+
+                    db.session.add(shipment)
+                    shipments_created += 1
+
+        db.session.commit()
+
+        # Generate comprehensive barcodes for all created shipments
+        for shipment_data in sample_shipments[:shipments_created]:
+            existing = Shipment.query.filter_by(
+                sender_phone=shipment_data['sender_phone'],
+                receiver_phone=shipment_data['receiver_phone']
+            ).first()
+
+            if existing and not existing.barcode:
+                generate_barcode_with_shipment_data(existing)
+
+        db.session.commit()
+        print(f"Created {shipments_created} sample shipments for testing!")
+
+    except Exception as e:
+        print(f"Error creating sample shipments: {e}")
+        db.session.rollback()
+
+def test_barcode_system():
+    """Test the barcode generation and decoding system"""
+    print("Testing Enhanced Barcode System...")
+
+    # Test data
+    test_shipment_data = {
+        'sender_phone': '03111234567',
+        'receiver_phone': '03119876543',
+        'weight': '2.5',
+        'destination_code': 'PK'
+    }
+
+    # Generate barcode
+    barcode = generate_barcode_number(test_shipment_data)
+    print(f"Generated Barcode: {barcode}")
+
+    # Decode barcode
+    decoded_info = decode_barcode(barcode)
+    print(f"Decoded Info: {decoded_info}")
+
+    # Verify the barcode contains expected information
+    if decoded_info:
+        print("✓ Barcode generation and decoding successful!")
+        print(f"✓ Encoded sender phone: {decoded_info.get('sender_phone', 'N/A')}")
+        print(f"✓ Encoded receiver phone: {decoded_info.get('receiver_phone', 'N/A')}")
+        print(f"✓ Encoded weight: {decoded_info.get('weight', 'N/A')}")
+        print(f"✓ Destination code: {decoded_info.get('destination', 'N/A')}")
+    else:
+        print("✗ Barcode decoding failed!")
+
+    return barcode
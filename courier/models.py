@@ -0,0 +1,274 @@
+"""
+Database models
+"""
+from datetime import datetime
+
+from flask_login import UserMixin
+from werkzeug.security import generate_password_hash, check_password_hash
+
+from .extensions import db, login_manager
+
+@login_manager.user_loader
+def load_user(user_id):
+    return Branch.query.get(int(user_id))
+
+class Branch(UserMixin, db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    name = db.Column(db.String(100), nullable=False)
+    email = db.Column(db.String(100), unique=True, nullable=False)
+    password_hash = db.Column(db.String(128), nullable=False)
+    phone = db.Column(db.String(20), nullable=False)
+    branch_code = db.Column(db.String(20), unique=True, nullable=False)
+    address = db.Column(db.Text, nullable=False)
+    postal_code = db.Column(db.String(20), nullable=False)
+    is_admin = db.Column(db.Boolean, default=False)
+    is_active = db.Column(db.Boolean, default=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    def set_password(self, password):
+        self.password_hash = generate_password_hash(password)
+
+    def check_password(self, password):
+        return check_password_hash(self.password_hash, password)
+
+class Country(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    name = db.Column(db.String(100), nullable=False)
+    code = db.Column(db.String(3), unique=True, nullable=False)
+    currency = db.Column(db.String(3), nullable=False)
+    is_active = db.Column(db.Boolean, default=True)
+
+class PricingTier(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    country_id = db.Column(db.Integer, db.ForeignKey('country.id'), nullable=False)
+    min_weight = db.Column(db.Float, nullable=False)
+    max_weight = db.Column(db.Float, nullable=False)
+    price_per_kg = db.Column(db.Float, nullable=False)
+    base_fee = db.Column(db.Float, default=0)
+    is_active = db.Column(db.Boolean, default=True)
+    rate_card_id = db.Column(db.Integer, db.ForeignKey('rate_card.id'))
+
+    country = db.relationship('Country', backref=db.backref('pricing_tiers', lazy=True))
+    rate_card = db.relationship('RateCard', backref=db.backref('tiers', lazy=True))
+
+class RateCard(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    label = db.Column(db.String(100), nullable=False)
+    status = db.Column(db.String(20), default='draft')  # draft, published, retired
+    effective_from = db.Column(db.DateTime)  # UTC; NULL means effective immediately
+    tier_count = db.Column(db.Integer, default=0)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    published_at = db.Column(db.DateTime)
+
+class Shipment(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    tracking_id = db.Column(db.String(50), unique=True, nullable=False)
+    barcode = db.Column(db.String(20), unique=True, nullable=False)
+    client_id = db.Column(db.Integer, db.ForeignKey('branch.id'), nullable=False)  # Changed from branch_id to client_id to match existing DB
+
+    # Insurance fields (from existing database)
+    insurance_amount = db.Column(db.Float, default=0)
+    insurance_selected = db.Column(db.Boolean, default=False)
+
+    # Sender Information
+    sender_name = db.Column(db.String(100), nullable=False)
+    sender_phone = db.Column(db.String(20), nullable=False)
+    sender_cnic = db.Column(db.String(20), nullable=False)
+    sender_address = db.Column(db.Text, nullable=False)
+    sender_postal_code = db.Column(db.String(20), nullable=False)
+
+    # Receiver Information
+    receiver_name = db.Column(db.String(100), nullable=False)
+    receiver_phone = db.Column(db.String(20), nullable=False)
+    receiver_cnic = db.Column(db.String(20), nullable=False)
+    receiver_address = db.Column(db.Text, nullable=False)
+    receiver_postal_code = db.Column(db.String(20), nullable=False)
+
+    # Package Information
+    destination_country_id = db.Column(db.Integer, db.ForeignKey('country.id'), nullable=False)
+    length = db.Column(db.Float, nullable=False)
+    width = db.Column(db.Float, nullable=False)
+    height = db.Column(db.Float, nullable=False)
+    actual_weight = db.Column(db.Float, nullable=False)
+    weight_type = db.Column(db.String(20), nullable=False)  # 'actual' or 'volumetric'
+    document_type = db.Column(db.String(20), nullable=False, default='non_docs')  # 'docs' or 'non_docs'
+
+    # Pricing Information
+    volumetric_weight = db.Column(db.Float, nullable=False)
+    chargeable_weight = db.Column(db.Float, nullable=False)
+    base_price = db.Column(db.Float, nullable=False)
+    gst_amount = db.Column(db.Float, nullable=False)
+    final_price = db.Column(db.Float, nullable=False)
+    final_price_pkr = db.Column(db.Float, nullable=False)  # Final price in PKR
+
+    # Status
+    status = db.Column(db.String(20), default='booked')  # booked, in_transit, delivered, cancelled
+
+    # Undertaking
+    undertaking_accepted = db.Column(db.Boolean, default=False)
+    undertaking_text = db.Column(db.Text)
+
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    # Change feed: bumped on booking and every status change (see shipments.next_change_seq)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow)
+    change_seq = db.Column(db.BigInteger)
+
+    __table_args__ = (
+        db.Index('ix_shipment_change_seq', 'change_seq', 'id'),
+        db.Index('ix_shipment_created_at_id', 'created_at', 'id')  # incremental export cursor
+    )
+
+    branch = db.relationship('Branch', backref=db.backref('shipments', lazy=True))
+    destination_country = db.relationship('Country', backref=db.backref('shipments', lazy=True))
+
+class ExchangeRate(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    currency = db.Column(db.String(3), nullable=False)
+    rate_to_pkr = db.Column(db.Float, nullable=False)  # PKR per 1 unit of currency
+    effective_date = db.Column(db.Date, nullable=False)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    __table_args__ = (db.UniqueConstraint('currency', 'effective_date', name='unique_currency_effective_date'),)
+
+class DailyRecord(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    date = db.Column(db.Date, nullable=False, unique=True)
+    total_shipments = db.Column(db.Integer, default=0)
+    total_revenue = db.Column(db.Float, default=0)
+    total_weight = db.Column(db.Float, default=0)
+    avg_package_value = db.Column(db.Float, default=0)
+    top_destination = db.Column(db.String(100))
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+class MonthlyRecord(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    year = db.Column(db.Integer, nullable=False)
+    month = db.Column(db.Integer, nullable=False)  # 1-12
+    total_shipments = db.Column(db.Integer, default=0)
+    total_revenue = db.Column(db.Float, default=0)
+    total_weight = db.Column(db.Float, default=0)
+    avg_package_value = db.Column(db.Float, default=0)
+    growth_rate = db.Column(db.Float, default=0)  # Compared to previous month
+    top_destination = db.Column(db.String(100))
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    __table_args__ = (db.UniqueConstraint('year', 'month', name='unique_year_month'),)
+
+class ShipmentAnalytics(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    shipment_id = db.Column(db.Integer, db.ForeignKey('shipment.id'), nullable=False)
+    processing_time = db.Column(db.Float)  # Time from booking to delivery in hours
+    delivery_status = db.Column(db.String(20), default='pending')
+    customer_rating = db.Column(db.Integer)  # 1-5 rating
+    issues_reported = db.Column(db.Text)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    shipment = db.relationship('Shipment', backref=db.backref('analytics', lazy=True))
+
+class ShipmentEvent(db.Model):
+    """Append-only status history; one row per status change"""
+    id = db.Column(db.Integer, primary_key=True)
+    shipment_id = db.Column(db.Integer, db.ForeignKey('shipment.id'), nullable=False, index=True)
+    from_status = db.Column(db.String(20))  # NULL for the booking itself
+    to_status = db.Column(db.String(20), nullable=False)
+    changed_by = db.Column(db.Integer, db.ForeignKey('branch.id'))
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    shipment = db.relationship('Shipment', backref=db.backref('events', lazy=True, order_by='ShipmentEvent.id'))
+
+class DailyRollup(db.Model):
+    """Report cube: shipment totals per day, branch, destination, status and document type (see rollups.py)"""
+    id = db.Column(db.Integer, primary_key=True)
+    date = db.Column(db.Date, nullable=False)  # UTC booking date
+    branch_id = db.Column(db.Integer, db.ForeignKey('branch.id'), nullable=False)
+    destination_country_id = db.Column(db.Integer, db.ForeignKey('country.id'), nullable=False)
+    status = db.Column(db.String(20), nullable=False)
+    document_type = db.Column(db.String(20), nullable=False)
+    shipment_count = db.Column(db.Integer, nullable=False, default=0)
+    revenue = db.Column(db.Float, nullable=False, default=0)
+    revenue_pkr = db.Column(db.Float, nullable=False, default=0)
+    weight = db.Column(db.Float, nullable=False, default=0)
+
+    __table_args__ = (db.UniqueConstraint('date', 'branch_id', 'destination_country_id', 'status', 'document_type',
+                                          name='unique_daily_rollup_cell'),)
+
+class HourlyRollup(db.Model):
+    """Bookings per UTC hour and branch, for intraday reports (see rollups.py)"""
+    id = db.Column(db.Integer, primary_key=True)
+    date = db.Column(db.Date, nullable=False)  # UTC booking date
+    hour = db.Column(db.Integer, nullable=False)  # UTC hour, 0-23
+    branch_id = db.Column(db.Integer, db.ForeignKey('branch.id'), nullable=False)
+    shipment_count = db.Column(db.Integer, nullable=False, default=0)
+    revenue = db.Column(db.Float, nullable=False, default=0)
+    weight = db.Column(db.Float, nullable=False, default=0)
+
+    __table_args__ = (db.UniqueConstraint('date', 'hour', 'branch_id', name='unique_hourly_rollup_cell'),)
+
+class BranchStats(db.Model):
+    """Running per-branch totals, kept in step with bookings and status changes (see shipments.py: record_booking_stats, change_shipment_status)"""
+    branch_id = db.Column(db.Integer, db.ForeignKey('branch.id'), primary_key=True)
+    total_shipments = db.Column(db.Integer, nullable=False, default=0)
+    total_revenue = db.Column(db.Float, nullable=False, default=0)
+    total_weight = db.Column(db.Float, nullable=False, default=0)
+
+    # One counter per status in shipments.SHIPMENT_STATUSES
+    booked_count = db.Column(db.Integer, nullable=False, default=0)
+    in_transit_count = db.Column(db.Integer, nullable=False, default=0)
+    out_for_delivery_count = db.Column(db.Integer, nullable=False, default=0)
+    delivered_count = db.Column(db.Integer, nullable=False, default=0)
+    cancelled_count = db.Column(db.Integer, nullable=False, default=0)
+
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    def status_counts(self, statuses):
+        return {status: getattr(self, f'{status}_count') for status in statuses}
+
+class Job(db.Model):
+    """Background job, claimed and run by `flask --app main run-jobs` workers"""
+    id = db.Column(db.Integer, primary_key=True)
+    kind = db.Column(db.String(50), nullable=False)
+    params = db.Column(db.Text)  # JSON keyword arguments for the handler
+    status = db.Column(db.String(20), default='queued', index=True)  # queued, running, done, failed
+    progress = db.Column(db.Integer, default=0)
+    total = db.Column(db.Integer)
+    message = db.Column(db.String(255))
+    error = db.Column(db.Text)
+    attempts = db.Column(db.Integer, default=0)
+    max_attempts = db.Column(db.Integer, default=3)
+    run_after = db.Column(db.DateTime, default=datetime.utcnow)  # retries are pushed back with a delay
+    worker = db.Column(db.String(100))
+    heartbeat_at = db.Column(db.DateTime)
+
+    # Result file under JOB_RESULTS_FOLDER, served by /jobs/<id>/download
+    result_file = db.Column(db.String(255))
+    result_name = db.Column(db.String(255))
+    result_mimetype = db.Column(db.String(100))
+
+    created_by = db.Column(db.Integer, db.ForeignKey('branch.id'))
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    started_at = db.Column(db.DateTime)
+    finished_at = db.Column(db.DateTime)
+
+class ExportCursor(db.Model):
+    """Where an incremental export stopped, so the next one starts after it"""
+    name = db.Column(db.String(50), primary_key=True)
+    last_id = db.Column(db.Integer, nullable=False, default=0)
+    last_created_at = db.Column(db.DateTime)
+    exported_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+class ChangeSequence(db.Model):
+    """Counter behind Shipment.change_seq; its row lock orders concurrent writers"""
+    name = db.Column(db.String(50), primary_key=True)
+    value = db.Column(db.BigInteger, nullable=False, default=0)
+
+class DeletedShipment(db.Model):
+    """Tombstone for a shipment removed by the duplicate cleanup, so the change feed can report the delete"""
+    id = db.Column(db.Integer, primary_key=True)
+    shipment_id = db.Column(db.Integer, nullable=False)  # no foreign key: the shipment is gone
+    tracking_id = db.Column(db.String(50), nullable=False)
+    client_id = db.Column(db.Integer)
+    change_seq = db.Column(db.BigInteger, nullable=False)
+    deleted_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    __table_args__ = (db.Index('ix_deleted_shipment_change_seq', 'change_seq', 'shipment_id'),)
@@ -0,0 +1,372 @@
+"""
+Versioned rate cards and quoting
+"""
+import bisect
+import csv
+import math
+import threading
+import time
+from array import array
+from datetime import datetime
+
+from flask import current_app
+
+from .currency import get_exchange_rate
+from .extensions import db
+from .models import Country, PricingTier, RateCard
+
+GST_RATE = 0.18
+VOLUMETRIC_DIVISOR = 5000  # cm³ per kg
+
+class PricingTable:
+    """Flat per-weight-step arrays for one country's tiers.
+
+    Slot ``k`` holds the tier chosen for any weight in ``((k-1)*step, k*step]``.
+    Only compiled when every tier boundary sits on the step grid, so the
+    table gives the same tier as a range scan.
+    """
+
+    def __init__(self, step, rows, max_weight):
+        self.step = step
+        self.inv_step = 1 / step
+        slots = int(round(min(rows[-1][0], max_weight) * self.inv_step)) + 1
+
+        self.tier = array('i', [-1]) * slots
+        self.price_per_kg = array('d', [0.0]) * slots
+        self.base_fee = array('d', [0.0]) * slots
+
+        position = 0
+        for slot in range(slots):
+            grid_weight = slot * step
+            while position < len(rows) and rows[position][0] < grid_weight - step / 2:
+                position += 1
+            if position < len(rows) and rows[position][1] <= grid_weight + step / 2:
+                self.tier[slot] = position
+                self.price_per_kg[slot] = rows[position][2]
+                self.base_fee[slot] = rows[position][3]
+
+    @staticmethod
+    def fits(step, rows):
+        """True when every tier boundary is a whole number of steps"""
+        for max_weight, min_weight, _, _ in rows:
+            for boundary in (min_weight, max_weight):
+                if abs(boundary / step - round(boundary / step)) > 1e-6:
+                    return False
+        return True
+
+    @property
+    def nbytes(self):
+        return sum(a.itemsize * len(a) for a in (self.tier, self.price_per_kg, self.base_fee))
+
+class PricingIndex:
+    """Immutable in-memory view of one rate card's active tiers, keyed by country"""
+
+    def __init__(self, rate_card_id, currencies, tiers, table_step=0, table_max_weight=0):
+        self.rate_card_id = rate_card_id
+        self.currencies = currencies  # country_id -> currency
+        self.tier_count = len(tiers)
+        self._snapshot = None
+
+        bands = {}
+        for tier in sorted(tiers, key=lambda t: (t.country_id, t.max_weight, t.id)):
+            bands.setdefault(tier.country_id, []).append(
+                (tier.max_weight, tier.min_weight, tier.price_per_kg, tier.base_fee or 0)
+            )
+
+        # Parallel tuples so lookups are a bisect on max_weight
+        self._bands = {
+            country_id: (tuple(row[0] for row in rows), tuple(rows))
+            for country_id, rows in bands.items()
+        }
+
+        # Optional O(1) tables; countries with off-grid boundaries keep using bisect
+        self._tables = {}
+        if table_step > 0:
+            for country_id, rows in bands.items():
+                if PricingTable.fits(table_step, rows):
+                    self._tables[country_id] = PricingTable(table_step, rows, table_max_weight)
+
+    @property
+    def table_bytes(self):
+        """Memory held by the compiled lookup tables, in bytes"""
+        return sum(table.nbytes for table in self._tables.values())
+
+    def snapshot(self):
+        """JSON-ready tiers per country for client-side quotes.
+
+        Each country's tiers are ``[max_weight, min_weight, price_per_kg, base_fee]``
+        sorted by max_weight, so the first tier whose max_weight covers a weight
+        is the one ``lookup`` picks.
+        """
+        if self._snapshot is None:
+            self._snapshot = {
+                str(country_id): {
+                    'currency': currency,
+                    'tiers': [list(row) for row in self._bands[country_id][1]] if country_id in self._bands else []
+                }
+                for country_id, currency in self.currencies.items()
+            }
+        return self._snapshot
+
+    def lookup(self, country_id, weight):
+        """Return (price_per_kg, base_fee) for the first tier covering weight, or None"""
+        band = self._bands.get(country_id)
+        if not band:
+            return None
+
+        max_weights, rows = band
+
+        table = self._tables.get(country_id)
+        if table is not None:
+            slot = math.ceil(weight * table.inv_step - 1e-9)
+            if 0 <= slot < len(table.tier):
+                position = table.tier[slot]
+                if position < 0:
+                    return None
+                # Guard against float noise right at a boundary; bisect settles it
+                if rows[position][1] <= weight <= rows[position][0]:
+                    return table.price_per_kg[slot], table.base_fee[slot]
+
+        position = bisect.bisect_left(max_weights, weight)
+        if position < len(rows) and rows[position][1] <= weight:
+            return rows[position][2], rows[position][3]
+        return None
+
+def build_pricing_index(rate_card_id):
+    """Load one rate card's tiers into a PricingIndex"""
+    tiers = PricingTier.query.filter_by(rate_card_id=rate_card_id, is_active=True).all()
+    currencies = dict(db.session.query(Country.id, Country.currency).all())
+    index = PricingIndex(
+        rate_card_id, currencies, tiers,
+        table_step=current_app.config['PRICING_TABLE_STEP'],
+        table_max_weight=current_app.config['PRICING_TABLE_MAX_WEIGHT']
+    )
+    return index
+
+class RateCardRegistry:
+    """Per-worker pointer to the pricing indexes of published rate cards.
+
+    Quotes read ``_schedule`` once and never take a lock. Refreshes build any
+    missing indexes off the request path and publish them with one assignment,
+    so a quote sees either the old schedule or the new one, never a mix.
+    """
+
+    def __init__(self):
+        self.app = None
+        self._schedule = ()  # ((effective_from, PricingIndex), ...) oldest first
+        self._indexes = {}  # rate_card_id -> PricingIndex, including warmed drafts
+        self._warming = set()  # draft ids being built in the background
+        self._build_lock = threading.Lock()
+        self._next_check = 0.0
+        self._loaded = False  # schedule read at least once, even if nothing is published
+
+    def init_app(self, app):
+        self.app = app
+
+    def current(self, now=None):
+        """Return the PricingIndex in effect at ``now`` (UTC), or None"""
+        if not self._loaded:
+            # Cold start: nothing to serve yet, so build inline once
+            self.refresh()
+        elif time.monotonic() >= self._next_check:
+            self.refresh_async()
+
+        now = now or datetime.utcnow()
+        for effective_from, index in reversed(self._schedule):
+            if effective_from <= now:
+                return index
+        return None
+
+    def refresh(self):
+        """Re-read published rate cards and swap in a new schedule.
+
+        Drafts that have no index yet are handed to ``warm``, so a card
+        imported by the job worker is usually built before anyone publishes it.
+        """
+        with self._build_lock:
+            self._next_check = time.monotonic() + self.app.config['RATE_CARD_REFRESH_SECONDS']
+
+            cards = db.session.query(RateCard.id, RateCard.status, RateCard.effective_from).filter(
+                RateCard.status != 'retired'
+            ).order_by(RateCard.effective_from, RateCard.id).all()
+
+            indexes = {}
+            schedule = []
+            drafts = []
+            for rate_card_id, status, effective_from in cards:
+                index = self._indexes.get(rate_card_id)
+                if status == 'published':
+                    index = index or build_pricing_index(rate_card_id)
+                    schedule.append((effective_from or datetime.min, index))
+                elif index is None and rate_card_id not in self._warming:
+                    drafts.append(rate_card_id)
+                if index is not None:
+                    indexes[rate_card_id] = index
+
+            self._indexes = indexes
+            self._schedule = tuple(schedule)
+            self._loaded = True
+
+        for rate_card_id in drafts:
+            self.warm(rate_card_id)
+
+    def refresh_async(self):
+        """Refresh in a background thread; quotes keep using the current schedule"""
+        self._next_check = time.monotonic() + self.app.config['RATE_CARD_REFRESH_SECONDS']
+        threading.Thread(target=self._run_in_context, args=(self.refresh,), daemon=True).start()
+
+    def warm(self, rate_card_id):
+        """Build a staged card's index in the background so publishing it is a pointer swap"""
+        def build():
+            try:
+                index = build_pricing_index(rate_card_id)
+                with self._build_lock:
+                    self._indexes = {**self._indexes, rate_card_id: index}
+            finally:
+                self._warming.discard(rate_card_id)
+
+        self._warming.add(rate_card_id)
+        threading.Thread(target=self._run_in_context, args=(build,), daemon=True).start()
+
+    def _run_in_context(self, func):
+        try:
+            with self.app.app_context():
+                func()
+        except Exception as e:
+            print(f"Error refreshing rate cards: {e}")
+
+rate_cards = RateCardRegistry()
+
+def import_rate_card_csv(csvfile, label):
+    """Load a pricing CSV into a new draft rate card.
+
+    Returns (rate_card, success_count, error_count). Nothing is quoted from the
+    card until it is published.
+    """
+    rate_card = RateCard(label=label, status='draft')
+    db.session.add(rate_card)
+    db.session.flush()  # Get the rate card ID
+
+    success_count = 0
+    error_count = 0
+
+    reader = csv.DictReader(csvfile)
+    for row in reader:
+        try:
+            # Get or create country
+            country = Country.query.filter_by(code=row['country_code'].upper()).first()
+            if not country:
+                country = Country(
+                    name=row['country_name'],
+                    code=row['country_code'].upper(),
+                    currency=row['currency'].upper(),
+                    is_active=True
+                )
+                db.session.add(country)
+                db.session.flush()  # Get the country ID
+
+            # Create pricing tier
+            pricing_tier = PricingTier(
+                country_id=country.id,
+                rate_card_id=rate_card.id,
+                min_weight=float(row['min_weight']),
+                max_weight=float(row['max_weight']),
+                price_per_kg=float(row['price_per_kg']),
+                base_fee=float(row.get('base_fee', 0)),
+                is_active=True
+            )
+            db.session.add(pricing_tier)
+            success_count += 1
+
+        except Exception as e:
+            print(f"Error processing row {row}: {e}")
+            error_count += 1
+
+    rate_card.tier_count = success_count
+    db.session.commit()
+    return rate_card, success_count, error_count
+
+def migrate_legacy_pricing_tiers():
+    """Attach pricing tiers that predate rate cards to a published legacy card"""
+    legacy_count = PricingTier.query.filter(PricingTier.rate_card_id.is_(None)).count()
+    if legacy_count == 0:
+        return None
+
+    rate_card = RateCard(
+        label='Legacy pricing',
+        status='published',
+        tier_count=legacy_count,
+        published_at=datetime.utcnow()
+    )
+    db.session.add(rate_card)
+    db.session.flush()
+
+    PricingTier.query.filter(PricingTier.rate_card_id.is_(None)).update(
+        {'rate_card_id': rate_card.id}, synchronize_session=False
+    )
+    db.session.commit()
+    print(f"✓ Moved {legacy_count} legacy pricing tiers into rate card #{rate_card.id}")
+    return rate_card
+
+def rate_card_snapshot():
+    """The rate card in effect now, in the form book_shipment.html quotes from.
+
+    ``version`` is the rate card id; bookings quoted from an older version are
+    rejected on submit. PKR rates are today's, for display only.
+    """
+    index = rate_cards.current()
+    if index is None:
+        return None
+
+    pkr_rates = {}
+    for currency in set(index.currencies.values()):
+        try:
+            pkr_rates[currency] = get_exchange_rate(currency)
+        except ValueError:
+            pass  # Quoted without a PKR figure; booking reports the missing rate
+
+    return {
+        'version': index.rate_card_id,
+        'gst_rate': GST_RATE,
+        'volumetric_divisor': VOLUMETRIC_DIVISOR,
+        'countries': index.snapshot(),
+        'pkr_rates': pkr_rates
+    }
+
+def calculate_pricing(country_id, length, width, height, weight, weight_type):
+    try:
+        index = rate_cards.current()
+        if index is None:
+            return {'error': 'No published rate card is in effect.'}
+
+        country_id = int(country_id)
+        currency = index.currencies.get(country_id)
+        if not currency:
+            return {'error': 'Invalid country selected.'}
+
+        volumetric_weight = (length * width * height) / VOLUMETRIC_DIVISOR
+        chargeable_weight = max(weight, volumetric_weight)  # Always use the higher weight
+
+        # Find appropriate pricing tier
+        pricing_tier = index.lookup(country_id, chargeable_weight)
+
+        if not pricing_tier:
+            return {'error': 'No pricing tier found for this weight range.'}
+
+        price_per_kg, base_fee = pricing_tier
+        base_price = (chargeable_weight * price_per_kg) + base_fee
+        gst_amount = base_price * GST_RATE
+        final_price = base_price + gst_amount
+
+        return {
+            'volumetric_weight': round(volumetric_weight, 2),
+            'chargeable_weight': round(chargeable_weight, 2),
+            'base_price': round(base_price, 2),
+            'gst_amount': round(gst_amount, 2),
+            'final_price': round(final_price, 2),
+            'currency': currency,
+            'rate_card_id': index.rate_card_id
+        }
+
+    except Exception as e:
+        return {'error': f'Error calculating pricing: {str(e)}'}
@@ -0,0 +1,99 @@
+"""
+Daily and monthly report records and per-shipment analytics
+"""
+from collections import Counter
+from datetime import datetime
+
+from .currency import convert_to_pkr_bulk
+from .extensions import db
+from .models import Country, DailyRecord, MonthlyRecord, Shipment, ShipmentAnalytics
+
+def _shipment_totals(*criteria):
+    """Return (shipments, PKR revenue, weight, top destination) for shipments matching criteria.
+
+    Prices are in each destination's currency, so revenue is converted in one
+    vectorized pass at the rate effective on each booking date.
+    """
+    rows = db.session.query(
+        Shipment.final_price, Country.currency, Shipment.created_at, Shipment.chargeable_weight, Country.name
+    ).join(Country, Shipment.destination_country_id == Country.id).filter(*criteria).all()
+    if not rows:
+        return 0, 0, 0, None
+
+    prices, currencies, created, weights, destinations = zip(*rows)
+    revenue = sum(convert_to_pkr_bulk(prices, currencies, [created_at.date() for created_at in created]))
+    top_destination = Counter(destinations).most_common(1)[0][0]
+    return len(rows), revenue, sum(weights), top_destination
+
+def update_daily_records():
+    """Update daily records for today and yesterday if needed"""
+    today = datetime.now().date()
+
+    # Check if today's record exists
+    daily_record = DailyRecord.query.filter_by(date=today).first()
+    if not daily_record:
+        daily_record = DailyRecord(date=today)
+        db.session.add(daily_record)
+
+    # Calculate statistics for today's shipments
+    total_shipments, total_revenue, total_weight, top_destination = _shipment_totals(
+        db.func.date(Shipment.created_at) == today
+    )
+    avg_package_value = total_revenue / total_shipments if total_shipments > 0 else 0
+
+    # Update record
+    daily_record.total_shipments = total_shipments
+    daily_record.total_revenue = total_revenue
+    daily_record.total_weight = total_weight
+    daily_record.avg_package_value = avg_package_value
+    daily_record.top_destination = top_destination
+
+    db.session.commit()
+    return daily_record
+
+def update_monthly_records():
+    """Update monthly records for current month"""
+    now = datetime.now()
+    current_year = now.year
+    current_month = now.month
+
+    # Check if current month's record exists
+    monthly_record = MonthlyRecord.query.filter_by(year=current_year, month=current_month).first()
+    if not monthly_record:
+        monthly_record = MonthlyRecord(year=current_year, month=current_month)
+        db.session.add(monthly_record)
+
+    # Calculate statistics for the current month's shipments
+    total_shipments, total_revenue, total_weight, top_destination = _shipment_totals(
+        db.func.extract('year', Shipment.created_at) == current_year,
+        db.func.extract('month', Shipment.created_at) == current_month
+    )
+    avg_package_value = total_revenue / total_shipments if total_shipments > 0 else 0
+
+    # Calculate growth rate (compared to previous month)
+    prev_month = current_month - 1 if current_month > 1 else 12
+    prev_year = current_year if current_month > 1 else current_year - 1
+
+    prev_record = MonthlyRecord.query.filter_by(year=prev_year, month=prev_month).first()
+    if prev_record and prev_record.total_revenue > 0:
+        growth_rate = ((total_revenue - prev_record.total_revenue) / prev_record.total_revenue) * 100
+    else:
+        growth_rate = 0
+
+    # Update record
+    monthly_record.total_shipments = total_shipments
+    monthly_record.total_revenue = total_revenue
+    monthly_record.total_weight = total_weight
+    monthly_record.avg_package_value = avg_package_value
+    monthly_record.growth_rate = growth_rate
+    monthly_record.top_destination = top_destination
+
+    db.session.commit()
+    return monthly_record
+
+def generate_shipment_analytics(shipment_id):
+    """Generate analytics data for a shipment"""
+    analytics = ShipmentAnalytics(shipment_id=shipment_id)
+    db.session.add(analytics)
+    db.session.commit()
+    return analytics
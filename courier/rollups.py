@@ -0,0 +1,348 @@
+"""
+Report rollups: a per-day cube of shipment totals and hourly booking counts,
+kept in step with bookings and status changes, and the cached report summary
+"""
+import threading
+import time
+from datetime import date, datetime, timedelta
+
+from .extensions import db
+from .models import Branch, Country, DailyRollup, HourlyRollup, Shipment
+
+ROLLUP_KEYS = ['date', 'branch_id', 'destination_country_id', 'status', 'document_type']
+ROLLUP_MEASURES = ['shipment_count', 'revenue', 'revenue_pkr', 'weight']
+
+def _sqlite():
+    return db.engine.dialect.name == 'sqlite'
+
+def _day(column):
+    """SQL expression for the date part of a datetime column"""
+    # CAST(... AS DATE) gives SQLite a number, not a date
+    return db.func.date(column) if _sqlite() else db.cast(column, db.Date)
+
+def _hour(column):
+    """SQL expression for the hour (0-23) of a datetime column"""
+    if _sqlite():
+        return db.cast(db.func.strftime('%H', column), db.Integer)
+    return db.cast(db.func.extract('hour', column), db.Integer)
+
+def _period(column, fmt):
+    """``column`` (a date) formatted as YYYY-MM (fmt='month') or YYYY (fmt='year')"""
+    if _sqlite():
+        return db.func.strftime('%Y-%m' if fmt == 'month' else '%Y', column)
+    return db.func.to_char(column, 'YYYY-MM' if fmt == 'month' else 'YYYY')
+
+def _upsert(model):
+    """INSERT for ``model`` with ON CONFLICT support (SQLite and PostgreSQL)"""
+    if _sqlite():
+        from sqlalchemy.dialects.sqlite import insert
+    else:
+        from sqlalchemy.dialects.postgresql import insert
+    return insert(model)
+
+def _shipment_keys(status=None):
+    """DailyRollup key expressions for shipment rows, and the ones to GROUP BY.
+
+    With ``status`` every row is keyed under that status.
+    """
+    keys = [
+        _day(Shipment.created_at),
+        Shipment.client_id,
+        Shipment.destination_country_id,
+        db.func.coalesce(Shipment.status, 'booked') if status is None else db.literal(status, db.String),
+        db.func.coalesce(Shipment.document_type, 'non_docs')
+    ]
+    group_by = keys if status is None else keys[:3] + keys[4:]
+    return keys, group_by
+
+def _shipment_measures(sign=1):
+    return [
+        sign * db.func.count(Shipment.id),
+        sign * db.func.sum(Shipment.final_price),
+        sign * db.func.sum(db.func.coalesce(Shipment.final_price_pkr, 0)),
+        sign * db.func.sum(Shipment.chargeable_weight)
+    ]
+
+def add_to_daily_rollup(condition, sign=1, status=None):
+    """Add the shipments matching ``condition`` to their DailyRollup cells (subtract with sign=-1).
+
+    With ``status`` they are counted under that status rather than their
+    current one, which is how a status change moves them between cells.
+    One grouped INSERT ... SELECT ... ON CONFLICT in the caller's transaction.
+    """
+    keys, group_by = _shipment_keys(status)
+    select = db.select(*keys, *_shipment_measures(sign)).where(condition).group_by(*group_by)
+
+    _add_cells(DailyRollup, ROLLUP_KEYS, ROLLUP_MEASURES, select)
+
+def _add_cells(model, keys, measures, select):
+    """INSERT ``select`` rows into ``model``, adding their measures to cells that already exist"""
+    insert = _upsert(model).from_select(keys + measures, select)
+    db.session.execute(insert.on_conflict_do_update(
+        index_elements=keys,
+        set_={measure: getattr(model, measure) + getattr(insert.excluded, measure) for measure in measures}
+    ))
+
+def rebuild_daily_rollup(start=None, end=None):
+    """Recompute DailyRollup from the shipment table, for all dates or ``start``..``end`` inclusive.
+
+    Runs in the caller's transaction; returns the number of cells written.
+    """
+    keys, group_by = _shipment_keys()
+    day = keys[0]
+    cells = DailyRollup.query
+    shipments = db.select(*keys, *_shipment_measures()).group_by(*group_by)
+
+    if start is not None:
+        cells = cells.filter(DailyRollup.date >= start)
+        shipments = shipments.where(day >= _day(db.literal(start, db.Date)))
+    if end is not None:
+        cells = cells.filter(DailyRollup.date <= end)
+        shipments = shipments.where(day <= _day(db.literal(end, db.Date)))
+
+    cells.delete(synchronize_session=False)
+    result = db.session.execute(db.insert(DailyRollup).from_select(ROLLUP_KEYS + ROLLUP_MEASURES, shipments))
+    report_summaries.invalidate()
+    return result.rowcount
+
+class ReportSummaryCache:
+    """Per-worker cache of the /admin/reports headline figures, read from DailyRollup.
+
+    Totals for closed periods (before the current month) are kept until
+    invalidate() is called, or for REPORT_CLOSED_CACHE_SECONDS to pick up
+    writes made through other workers. The current month, today included,
+    is one aggregate reused for REPORT_TODAY_CACHE_SECONDS.
+    """
+
+    def __init__(self):
+        self.app = None
+        self._closed = {}
+        self._current = {}
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        self.app = app
+
+    def summary(self, today=None):
+        """todays_shipments, monthly_revenue, total_shipments and growth_rate for the reports page"""
+        today = today or datetime.utcnow().date()
+        month_start = today.replace(day=1)
+        closed = self._cached(self._closed, month_start, 'REPORT_CLOSED_CACHE_SECONDS', self._load_closed)
+        current = self._cached(self._current, today, 'REPORT_TODAY_CACHE_SECONDS', self._load_current)
+
+        previous_revenue = closed['previous_month_revenue']
+        return {
+            'todays_shipments': current['todays_shipments'],
+            'monthly_revenue': current['month_revenue'],
+            'total_shipments': closed['shipments'] + current['recent_shipments'],
+            'growth_rate': (current['month_revenue'] - previous_revenue) / previous_revenue * 100 if previous_revenue > 0 else 0
+        }
+
+    def invalidate(self):
+        """Drop every cached figure; call after changing shipments outside today's bookings"""
+        with self._lock:
+            self._closed = {}
+            self._current = {}
+
+    def _cached(self, entries, key, ttl_setting, load):
+        now = time.monotonic()
+        with self._lock:
+            entry = entries.get(key)
+        if entry is not None and entry[1] > now:
+            return entry[0]
+
+        figures = load(key)
+        with self._lock:
+            # Keyed by month/day, so a new period starts a new entry; keep only the latest
+            entries.clear()
+            entries[key] = (figures, now + self.app.config[ttl_setting])
+        return figures
+
+    @staticmethod
+    def _load_closed(month_start):
+        previous_month_start = (month_start - timedelta(days=1)).replace(day=1)
+        shipments, previous_revenue = db.session.query(
+            db.func.sum(DailyRollup.shipment_count),
+            db.func.sum(db.case((DailyRollup.date >= previous_month_start, DailyRollup.revenue), else_=0))
+        ).filter(DailyRollup.date < month_start).one()
+        return {'shipments': shipments or 0, 'previous_month_revenue': previous_revenue or 0}
+
+    @staticmethod
+    def _load_current(today):
+        # Cells after this month (clock skew) still count towards the grand total
+        in_month = DailyRollup.date < (today.replace(day=1) + timedelta(days=32)).replace(day=1)
+        todays_shipments, later_shipments, month_revenue = db.session.query(
+            db.func.sum(db.case((DailyRollup.date == today, DailyRollup.shipment_count), else_=0)),
+            db.func.sum(DailyRollup.shipment_count),
+            db.func.sum(db.case((in_month, DailyRollup.revenue), else_=0))
+        ).filter(DailyRollup.date >= today.replace(day=1)).one()
+        return {
+            'todays_shipments': todays_shipments or 0,
+            'recent_shipments': later_shipments or 0,
+            'month_revenue': month_revenue or 0
+        }
+
+report_summaries = ReportSummaryCache()
+
+def _cube_dimensions():
+    """Dimension name -> (label, SQL expression) pairs for query_daily_rollup"""
+    return {
+        'day': [('day', DailyRollup.date)],
+        'month': [('month', _period(DailyRollup.date, 'month'))],
+        'year': [('year', _period(DailyRollup.date, 'year'))],
+        'branch': [('branch_id', DailyRollup.branch_id), ('branch', Branch.name)],
+        'country': [('country_id', DailyRollup.destination_country_id), ('country', Country.name)],
+        'status': [('status', DailyRollup.status)],
+        'document_type': [('document_type', DailyRollup.document_type)]
+    }
+
+CUBE_DIMENSIONS = ['day', 'month', 'year', 'branch', 'country', 'status', 'document_type']
+
+def query_daily_rollup(dimensions, start=None, end=None, branch_ids=None, country_ids=None,
+                       statuses=None, document_types=None):
+    """Slice the cube: totals grouped by ``dimensions`` (names from CUBE_DIMENSIONS).
+
+    Filters are lists (None means all). Returns one dict per group with the
+    dimension values and shipments, revenue, revenue_pkr and weight, in
+    dimension order. Reads DailyRollup only, never the shipment table.
+    """
+    available = _cube_dimensions()
+    columns = [expression.label(label) for name in dimensions for label, expression in available[name]]
+
+    query = db.session.query(
+        *columns,
+        db.func.sum(DailyRollup.shipment_count).label('shipments'),
+        db.func.sum(DailyRollup.revenue).label('revenue'),
+        db.func.sum(DailyRollup.revenue_pkr).label('revenue_pkr'),
+        db.func.sum(DailyRollup.weight).label('weight')
+    ).select_from(DailyRollup)
+
+    if 'branch' in dimensions:
+        query = query.join(Branch, Branch.id == DailyRollup.branch_id)
+    if 'country' in dimensions:
+        query = query.join(Country, Country.id == DailyRollup.destination_country_id)
+
+    if start is not None:
+        query = query.filter(DailyRollup.date >= start)
+    if end is not None:
+        query = query.filter(DailyRollup.date <= end)
+    if branch_ids:
+        query = query.filter(DailyRollup.branch_id.in_(branch_ids))
+    if country_ids:
+        query = query.filter(DailyRollup.destination_country_id.in_(country_ids))
+    if statuses:
+        query = query.filter(DailyRollup.status.in_(statuses))
+    if document_types:
+        query = query.filter(DailyRollup.document_type.in_(document_types))
+
+    if columns:
+        query = query.group_by(*columns).order_by(*columns)
+
+    rows = []
+    for row in query:
+        values = row._asdict()
+        if not values['shipments']:
+            continue  # Cells emptied by status changes or cleanup
+        for label, value in values.items():
+            if isinstance(value, date):
+                values[label] = value.isoformat()
+            elif label in ('revenue', 'revenue_pkr', 'weight'):
+                values[label] = round(value or 0, 2)
+        rows.append(values)
+    return rows
+
+HOURLY_KEYS = ['date', 'hour', 'branch_id']
+HOURLY_MEASURES = ['shipment_count', 'revenue', 'weight']
+
+def _hourly_select(sign=1):
+    day, hour = _day(Shipment.created_at), _hour(Shipment.created_at)
+    return db.select(
+        day, hour, Shipment.client_id,
+        sign * db.func.count(Shipment.id),
+        sign * db.func.sum(Shipment.final_price),
+        sign * db.func.sum(Shipment.chargeable_weight)
+    ).group_by(day, hour, Shipment.client_id)
+
+def add_to_hourly_rollup(condition, sign=1):
+    """Add bookings matching ``condition`` to their HourlyRollup cells (subtract with sign=-1)"""
+    _add_cells(HourlyRollup, HOURLY_KEYS, HOURLY_MEASURES, _hourly_select(sign).where(condition))
+
+def rebuild_hourly_rollup(start=None, end=None):
+    """Recompute HourlyRollup from the shipment table, for all dates or ``start``..``end`` inclusive"""
+    day = _day(Shipment.created_at)
+    cells = HourlyRollup.query
+    shipments = _hourly_select()
+    if start is not None:
+        cells = cells.filter(HourlyRollup.date >= start)
+        shipments = shipments.where(day >= _day(db.literal(start, db.Date)))
+    if end is not None:
+        cells = cells.filter(HourlyRollup.date <= end)
+        shipments = shipments.where(day <= _day(db.literal(end, db.Date)))
+
+    cells.delete(synchronize_session=False)
+    result = db.session.execute(db.insert(HourlyRollup).from_select(HOURLY_KEYS + HOURLY_MEASURES, shipments))
+    return result.rowcount
+
+# Longest range, in days, for which hourly_activity returns an hour-by-hour timeline
+HOURLY_TIMELINE_MAX_DAYS = 31
+
+def hourly_activity(start, end, branch_ids=None, utc_offset_hours=0):
+    """Booking volume by local hour between local dates ``start`` and ``end`` inclusive.
+
+    Reads HourlyRollup only. Hours are shifted by ``utc_offset_hours``
+    before bucketing. Returns a dict with:
+
+    - heatmap: 7 x 24 shipment counts, Monday first
+    - by_hour: 24 dicts of shipments, revenue and the average per day
+    - timeline: hour-by-hour shipments for ranges of up to
+      HOURLY_TIMELINE_MAX_DAYS days, else None
+    """
+    offset = timedelta(hours=utc_offset_hours)
+    query = db.session.query(
+        HourlyRollup.date, HourlyRollup.hour,
+        db.func.sum(HourlyRollup.shipment_count), db.func.sum(HourlyRollup.revenue)
+    ).filter(
+        # One extra UTC day either side covers any offset
+        HourlyRollup.date >= start - timedelta(days=1),
+        HourlyRollup.date <= end + timedelta(days=1)
+    ).group_by(HourlyRollup.date, HourlyRollup.hour)
+    if branch_ids:
+        query = query.filter(HourlyRollup.branch_id.in_(branch_ids))
+
+    days = (end - start).days + 1
+    heatmap = [[0] * 24 for _ in range(7)]
+    hour_shipments = [0] * 24
+    hour_revenue = [0.0] * 24
+    timeline = {} if days <= HOURLY_TIMELINE_MAX_DAYS else None
+
+    for utc_date, utc_hour, shipments, revenue in query:
+        local = datetime.combine(utc_date, datetime.min.time()) + timedelta(hours=utc_hour) + offset
+        if not shipments or not start <= local.date() <= end:
+            continue
+        heatmap[local.weekday()][local.hour] += shipments
+        hour_shipments[local.hour] += shipments
+        hour_revenue[local.hour] += revenue or 0
+        if timeline is not None:
+            timeline[local] = timeline.get(local, 0) + shipments
+
+    if timeline is not None:
+        first = datetime.combine(start, datetime.min.time())
+        timeline = [
+            {'hour': (first + timedelta(hours=index)).strftime('%Y-%m-%d %H:00'),
+             'shipments': timeline.get(first + timedelta(hours=index), 0)}
+            for index in range(days * 24)
+        ]
+
+    return {
+        'start': start.isoformat(),
+        'end': end.isoformat(),
+        'days': days,
+        'utc_offset_hours': utc_offset_hours,
+        'heatmap': heatmap,
+        'by_hour': [
+            {'hour': hour, 'shipments': hour_shipments[hour], 'revenue': round(hour_revenue[hour], 2),
+             'avg_per_day': round(hour_shipments[hour] / days, 2)}
+            for hour in range(24)
+        ],
+        'timeline': timeline
+    }
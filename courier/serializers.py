@@ -0,0 +1,91 @@
+"""
+Row DTOs shared by HTML views and the JSON API, and the app's JSON encoder
+"""
+import operator
+
+from flask.json.provider import DefaultJSONProvider
+
+try:
+    import orjson
+except ImportError:  # optional; the stdlib encoder is used without it
+    orjson = None
+
+def format_timestamp(value):
+    """'YYYY-MM-DD HH:MM:SS', sliced from isoformat() (several times faster than strftime)"""
+    return value.isoformat(' ')[:19]
+
+class ParcelRow:
+    """One row of the parcel management table and /api/parcels/filter"""
+    __slots__ = ('id', 'tracking_id', 'barcode', 'client_name', 'sender_phone', 'destination_country',
+                 'chargeable_weight', 'weight_type', 'final_price', 'final_price_pkr', 'status',
+                 'created_at', 'created_date', 'created_time')
+
+    JSON_FIELDS = ('id', 'tracking_id', 'barcode', 'client_name', 'sender_phone', 'destination_country',
+                   'chargeable_weight', 'weight_type', 'final_price', 'final_price_pkr', 'status',
+                   'created_date', 'created_time')
+
+    def __init__(self, id, tracking_id, barcode, client_name, sender_phone, destination_country,
+                 chargeable_weight, weight_type, final_price, final_price_pkr, status, created_at):
+        self.id = id
+        self.tracking_id = tracking_id
+        self.barcode = barcode
+        self.client_name = client_name
+        self.sender_phone = sender_phone
+        self.destination_country = destination_country
+        self.chargeable_weight = float(chargeable_weight)
+        self.weight_type = weight_type
+        self.final_price = float(final_price)
+        self.final_price_pkr = float(final_price_pkr)
+        self.status = status
+        self.created_at = created_at
+        timestamp = format_timestamp(created_at)
+        self.created_date = timestamp[:10]
+        self.created_time = timestamp[11:16]
+
+    @classmethod
+    def from_rows(cls, rows):
+        """DTOs for listings.parcel_rows_query() rows, unpacked by position (named Row access is slow)"""
+        return [cls(*row) for row in rows]
+
+    def to_json(self):
+        return dict(zip(self.JSON_FIELDS, _parcel_json_values(self)))
+
+_parcel_json_values = operator.attrgetter(*ParcelRow.JSON_FIELDS)
+
+class ScannedShipment:
+    """Shipment details returned when a barcode is decoded"""
+    __slots__ = ('id', 'tracking_id', 'sender_name', 'sender_phone', 'receiver_name', 'receiver_phone',
+                 'destination', 'weight', 'status', 'created_at')
+
+    def __init__(self, shipment):
+        self.id = shipment.id
+        self.tracking_id = shipment.tracking_id
+        self.sender_name = shipment.sender_name
+        self.sender_phone = shipment.sender_phone
+        self.receiver_name = shipment.receiver_name
+        self.receiver_phone = shipment.receiver_phone
+        self.destination = shipment.destination
+        self.weight = float(shipment.chargeable_weight)
+        self.status = shipment.status
+        self.created_at = format_timestamp(shipment.created_at)
+
+    def to_json(self):
+        return {field: getattr(self, field) for field in self.__slots__}
+
+class FastJSONProvider(DefaultJSONProvider):
+    """The default provider, encoding compact output with orjson when it is installed.
+
+    Output matches the stdlib encoder's: sorted keys, and dates and other
+    non-JSON types still go through ``default`` (HTTP dates, not ISO).
+    Non-ASCII text is sent as UTF-8 rather than \\u escapes.
+    """
+
+    def dumps(self, obj, **kwargs):
+        if orjson is not None and kwargs.get('indent') is None and not kwargs.get('cls'):
+            try:
+                return orjson.dumps(obj, default=self.default, option=(
+                    orjson.OPT_SORT_KEYS | orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_PASSTHROUGH_DATACLASS
+                )).decode()
+            except TypeError:
+                pass  # e.g. integers beyond 64 bits or non-string keys; the stdlib copes
+        return super().dumps(obj, **kwargs)
@@ -0,0 +1,416 @@
+"""
+Tracking IDs, branch codes, status changes, per-branch counters and shipment maintenance
+"""
+import random
+from datetime import datetime
+
+from .barcodes import barcode_cache
+from .extensions import db
+from .models import Branch, BranchStats, ChangeSequence, DeletedShipment, Shipment, ShipmentAnalytics, ShipmentEvent
+from .rollups import add_to_daily_rollup, add_to_hourly_rollup, report_summaries
+
+def generate_tracking_id():
+    """Generate tracking ID in format: EX-MMM-DD-NNN"""
+    now = datetime.now()
+
+    # Get month abbreviation (e.g., SEP, OCT, NOV, DEC)
+    month_abbr = now.strftime('%b').upper()
+
+    # Get day of month
+    day = now.strftime('%d')
+
+    # Find the highest sequential number for today
+    today_start = datetime.combine(now.date(), datetime.min.time())
+    today_end = datetime.combine(now.date(), datetime.max.time())
+
+    # Get existing tracking IDs for today with proper pattern
+    existing_shipments = Shipment.query.filter(
+        Shipment.created_at >= today_start,
+        Shipment.created_at <= today_end,
+        Shipment.tracking_id.like(f'EX-{month_abbr}-{day}-%')
+    ).all()
+
+    # Find the highest sequential number used today
+    max_sequential = 0
+    for shipment in existing_shipments:
+        tracking_parts = shipment.tracking_id.split('-')
+        if len(tracking_parts) == 4:
+            try:
+                seq_num = int(tracking_parts[3])
+                max_sequential = max(max_sequential, seq_num)
+            except (ValueError, IndexError):
+                continue
+
+    # Generate next sequential number
+    sequential_num = max_sequential + 1
+    sequential_str = f"{sequential_num:03d}"
+
+    tracking_id = f"EX-{month_abbr}-{day}-{sequential_str}"
+
+    # Double-check that this tracking ID doesn't already exist
+    existing_count = Shipment.query.filter_by(tracking_id=tracking_id).count()
+    if existing_count > 0:
+        # If it exists, try incrementing until we find a unique one
+        while existing_count > 0:
+            sequential_num += 1
+            sequential_str = f"{sequential_num:03d}"
+            tracking_id = f"EX-{month_abbr}-{day}-{sequential_str}"
+            existing_count = Shipment.query.filter_by(tracking_id=tracking_id).count()
+
+    # Debug: Print information about the generation
+    print(f"DEBUG: Generated tracking ID: {tracking_id}")
+    print(f"DEBUG: Max sequential found: {max_sequential}")
+    print(f"DEBUG: Existing shipments today: {len(existing_shipments)}")
+
+    return tracking_id
+
+def generate_branch_code():
+    """Generate a unique branch code for customers"""
+    # Generate a 6-character branch code
+    # Format: BR + 4 random digits
+    random_digits = str(random.randint(1000, 9999))
+    branch_code = f"BR{random_digits}"
+
+    # Ensure uniqueness
+    while Branch.query.filter_by(branch_code=branch_code).count() > 0:
+        random_digits = str(random.randint(1000, 9999))
+        branch_code = f"BR{random_digits}"
+
+    return branch_code
+
+SHIPMENT_STATUSES = ['booked', 'in_transit', 'out_for_delivery', 'delivered', 'cancelled']
+
+def _hours_between(start, end):
+    """SQL expression for the hours from ``start`` to ``end``"""
+    if db.engine.dialect.name == 'sqlite':
+        return (db.func.julianday(end) - db.func.julianday(start)) * 24
+    return db.func.extract('epoch', end - start) / 3600
+
+def _owned_by(shipment_ids, branch_id=None):
+    """Shipments among ``shipment_ids``, limited to one branch's unless ``branch_id`` is None"""
+    condition = Shipment.id.in_(shipment_ids)
+    if branch_id is not None:
+        condition = db.and_(condition, Shipment.client_id == branch_id)
+    return condition
+
+def _status_count_column(status):
+    """BranchStats counter for ``status``, or None for statuses without one"""
+    return getattr(BranchStats, f'{status}_count') if status in SHIPMENT_STATUSES else None
+
+def _branch_totals(condition):
+    """(branch_id, status, count, revenue, weight) of the shipments matching ``condition``"""
+    return db.session.query(
+        Shipment.client_id, Shipment.status, db.func.count(Shipment.id),
+        db.func.coalesce(db.func.sum(Shipment.final_price), 0),
+        db.func.coalesce(db.func.sum(Shipment.chargeable_weight), 0)
+    ).filter(condition).group_by(Shipment.client_id, Shipment.status).all()
+
+def _apply_branch_totals(totals, sign):
+    """Add (sign=1) or subtract (sign=-1) _branch_totals rows to BranchStats.
+
+    Branches without a counters row yet are rebuilt from their shipments
+    instead, so call this after the shipments themselves are written.
+    """
+    missing = set()
+    for branch_id, status, count, revenue, weight in totals:
+        values = {
+            'total_shipments': BranchStats.total_shipments + sign * count,
+            'total_revenue': BranchStats.total_revenue + sign * revenue,
+            'total_weight': BranchStats.total_weight + sign * weight
+        }
+        column = _status_count_column(status or 'booked')
+        if column is not None:
+            values[column.key] = column + sign * count
+        if not BranchStats.query.filter_by(branch_id=branch_id).update(values, synchronize_session=False):
+            missing.add(branch_id)
+    if missing:
+        rebuild_branch_stats(missing)
+
+def next_change_seq():
+    """Take the next shipment change sequence number, in the caller's transaction.
+
+    The counter row stays locked until the caller commits, so numbers become
+    visible in the order they were handed out and a change feed reader
+    cannot page past one that is still uncommitted. Gaps are possible.
+    """
+    value = db.session.execute(
+        db.update(ChangeSequence).where(ChangeSequence.name == 'shipment')
+        .values(value=ChangeSequence.value + 1).returning(ChangeSequence.value)
+    ).scalar()
+    if value is None:
+        value = max(
+            db.session.query(db.func.max(Shipment.change_seq)).scalar() or 0,
+            db.session.query(db.func.max(DeletedShipment.change_seq)).scalar() or 0
+        ) + 1
+        db.session.add(ChangeSequence(name='shipment', value=value))
+        db.session.flush()
+    return value
+
+def record_booking_stats(shipment):
+    """Count a newly booked shipment in BranchStats and the report rollups, and stamp it for the change feed.
+
+    Runs in the caller's transaction.
+    """
+    shipment.change_seq = next_change_seq()
+    shipment.updated_at = datetime.utcnow()
+    db.session.flush()  # The shipment needs its id
+    _apply_branch_totals(_branch_totals(Shipment.id == shipment.id), 1)
+    add_to_daily_rollup(Shipment.id == shipment.id)
+    add_to_hourly_rollup(Shipment.id == shipment.id)
+
+def rebuild_branch_stats(branch_ids=None):
+    """Recompute BranchStats from the shipment table, for every branch or just ``branch_ids``.
+
+    One grouped INSERT ... SELECT in the caller's transaction (the caller
+    commits); branches without shipments get a row of zeros. Returns the
+    number of rows written.
+    """
+    stats = BranchStats.query
+    branches = db.select(Branch.id)
+    if branch_ids is not None:
+        branch_ids = list(branch_ids)
+        stats = stats.filter(BranchStats.branch_id.in_(branch_ids))
+        branches = branches.where(Branch.id.in_(branch_ids))
+    stats.delete(synchronize_session=False)
+
+    result = db.session.execute(db.insert(BranchStats).from_select(
+        ['branch_id', 'total_shipments', 'total_revenue', 'total_weight',
+         *[f'{status}_count' for status in SHIPMENT_STATUSES], 'updated_at'],
+        branches.add_columns(
+            db.func.count(Shipment.id),
+            db.func.coalesce(db.func.sum(Shipment.final_price), 0),
+            db.func.coalesce(db.func.sum(Shipment.chargeable_weight), 0),
+            *[db.func.coalesce(db.func.sum(db.case((Shipment.status == status, 1), else_=0)), 0)
+              for status in SHIPMENT_STATUSES],
+            db.literal(datetime.utcnow(), db.DateTime)
+        ).outerjoin(Shipment, Shipment.client_id == Branch.id).group_by(Branch.id)
+    ))
+    return result.rowcount
+
+def get_branch_stats(branch_id):
+    """The branch's BranchStats row, built on first use"""
+    stats = db.session.get(BranchStats, branch_id)
+    if stats is None:
+        rebuild_branch_stats([branch_id])
+        db.session.commit()
+        stats = db.session.get(BranchStats, branch_id)
+    return stats
+
+# Largest page the change feed hands out
+CHANGE_FEED_MAX_PAGE = 5000
+
+def shipment_changes(since=0, after_id=0, limit=500):
+    """Shipments changed or deleted after the (change_seq, id) position ``since``, ``after_id``, oldest change first.
+
+    Keyset pagination: pass the last row's change_seq and id back in to get
+    the next page. Returns lightweight rows, not Shipment objects; deleted
+    shipments come from their DeletedShipment tombstones, with ``deleted`` set.
+    """
+    limit = min(limit, CHANGE_FEED_MAX_PAGE)
+    changed = db.session.query(
+        Shipment.change_seq, Shipment.id, Shipment.tracking_id, Shipment.barcode, Shipment.client_id,
+        Shipment.destination_country_id, Shipment.document_type, Shipment.weight_type,
+        Shipment.chargeable_weight, Shipment.final_price, Shipment.final_price_pkr, Shipment.status,
+        Shipment.created_at, Shipment.updated_at, db.literal(False).label('deleted')
+    ).filter(
+        db.or_(Shipment.change_seq > since, db.and_(Shipment.change_seq == since, Shipment.id > after_id))
+    ).order_by(Shipment.change_seq, Shipment.id).limit(limit).all()
+    deleted = db.session.query(
+        DeletedShipment.change_seq, DeletedShipment.shipment_id.label('id'), DeletedShipment.tracking_id,
+        DeletedShipment.client_id, DeletedShipment.deleted_at.label('updated_at'), db.literal(True).label('deleted')
+    ).filter(
+        db.or_(DeletedShipment.change_seq > since,
+               db.and_(DeletedShipment.change_seq == since, DeletedShipment.shipment_id > after_id))
+    ).order_by(DeletedShipment.change_seq, DeletedShipment.shipment_id).limit(limit).all()
+    return sorted(changed + deleted, key=lambda row: (row.change_seq, row.id))[:limit]
+
+def change_shipment_status(shipment_ids, new_status, changed_by=None, branch_id=None):
+    """Move shipments to ``new_status``, appending a ShipmentEvent for each one that changes.
+
+    One INSERT ... SELECT writes the events and one UPDATE the statuses, in
+    the caller's transaction (the caller commits). Shipments already in
+    ``new_status``, and with ``branch_id`` other branches' shipments, are
+    left alone. BranchStats counters and report rollup cells move with
+    them, and the changed shipments share one change sequence number.
+    Returns the number of shipments changed.
+    """
+    changing = db.and_(_owned_by(shipment_ids, branch_id), Shipment.status != new_status)
+
+    # Both read the shipments' current status, so they run before the UPDATE below
+    moves = db.session.query(
+        Shipment.client_id, Shipment.status, db.func.count(Shipment.id)
+    ).filter(changing).group_by(Shipment.client_id, Shipment.status).all()
+    add_to_daily_rollup(changing, -1)
+    add_to_daily_rollup(changing, 1, status=new_status)
+
+    now = datetime.utcnow()
+    db.session.execute(db.insert(ShipmentEvent).from_select(
+        ['shipment_id', 'from_status', 'to_status', 'changed_by', 'created_at'],
+        db.select(
+            Shipment.id,
+            Shipment.status,
+            db.literal(new_status),
+            db.literal(changed_by, db.Integer),
+            db.literal(now, db.DateTime)
+        ).where(changing)
+    ))
+    changed_count = Shipment.query.filter(changing).update({
+        'status': new_status,
+        'updated_at': now,
+        'change_seq': next_change_seq()
+    }, synchronize_session=False)
+    barcode_cache.invalidate(shipment_ids)
+
+    new_column = _status_count_column(new_status)
+    for owner_id, old_status, count in moves:
+        old_column = _status_count_column(old_status)
+        values = {}
+        if old_column is not None:
+            values[old_column.key] = old_column - count
+        if new_column is not None:
+            values[new_column.key] = new_column + count
+        if values:
+            BranchStats.query.filter_by(branch_id=owner_id).update(values, synchronize_session=False)
+
+    if new_status == 'delivered' and changed_count:
+        update_delivery_analytics(shipment_ids, branch_id)
+    return changed_count
+
+def update_delivery_analytics(shipment_ids, branch_id=None):
+    """Set processing_time (booking to latest delivery, in hours) from the event history"""
+    delivered_at = db.select(db.func.max(ShipmentEvent.created_at)).where(
+        ShipmentEvent.shipment_id == ShipmentAnalytics.shipment_id,
+        ShipmentEvent.to_status == 'delivered'
+    ).scalar_subquery()
+    booked_at = db.select(Shipment.created_at).where(
+        Shipment.id == ShipmentAnalytics.shipment_id
+    ).scalar_subquery()
+
+    return ShipmentAnalytics.query.filter(
+        ShipmentAnalytics.shipment_id.in_(db.select(Shipment.id).where(_owned_by(shipment_ids, branch_id))),
+        db.exists().where(
+            ShipmentEvent.shipment_id == ShipmentAnalytics.shipment_id,
+            ShipmentEvent.to_status == 'delivered'
+        )
+    ).update({
+        'processing_time': _hours_between(booked_at, delivered_at),
+        'delivery_status': 'delivered'
+    }, synchronize_session=False)
+
+# Shipments per transaction in bulk status updates; keeps each statement under
+# SQLite's bound-parameter limit and each write lock short
+BULK_UPDATE_CHUNK_SIZE = 500
+
+def bulk_change_shipment_status(shipment_ids, new_status, changed_by=None, branch_id=None,
+                                chunk_size=BULK_UPDATE_CHUNK_SIZE, progress=None):
+    """Run change_shipment_status over any number of shipments, committing each chunk.
+
+    Returns one {'chunk', 'requested', 'updated'} dict per chunk processed.
+    If a chunk fails it is rolled back, reported with an 'error' key and
+    processing stops; earlier chunks stay committed, and rerunning the same
+    request is safe because shipments already moved are skipped.
+    """
+    shipment_ids = sorted(set(shipment_ids))
+    chunks = []
+    for offset in range(0, len(shipment_ids), chunk_size):
+        chunk = shipment_ids[offset:offset + chunk_size]
+        result = {'chunk': len(chunks) + 1, 'requested': len(chunk), 'updated': 0}
+        chunks.append(result)
+        try:
+            result['updated'] = change_shipment_status(chunk, new_status, changed_by, branch_id)
+            db.session.commit()
+        except Exception as e:
+            db.session.rollback()
+            result['error'] = str(e)
+            break
+        if progress:
+            progress(offset + len(chunk), len(shipment_ids))
+    return chunks
+
+# Rows deleted per transaction by cleanup_duplicate_tracking_ids; well under
+# SQLite's bound-parameter limit and short enough not to stall bookings
+CLEANUP_CHUNK_SIZE = 500
+
+def find_duplicate_shipments():
+    """Return (duplicate_id, tracking_id, keeper_id) for every shipment that repeats a tracking ID.
+
+    One windowed scan: the lowest id per tracking ID is kept, the rest are duplicates.
+    """
+    ranked = db.session.query(
+        Shipment.id.label('id'),
+        Shipment.tracking_id.label('tracking_id'),
+        db.func.row_number().over(partition_by=Shipment.tracking_id, order_by=Shipment.id).label('rank'),
+        db.func.min(Shipment.id).over(partition_by=Shipment.tracking_id).label('keeper_id')
+    ).subquery()
+
+    return db.session.query(
+        ranked.c.id, ranked.c.tracking_id, ranked.c.keeper_id
+    ).filter(ranked.c.rank > 1).order_by(ranked.c.id).all()
+
+def cleanup_duplicate_tracking_ids(dry_run=False, chunk_size=CLEANUP_CHUNK_SIZE, progress=None):
+    """Delete shipments that repeat another shipment's tracking ID, keeping the oldest.
+
+    Their ShipmentAnalytics and ShipmentEvent rows go with them, as do
+    analytics already orphaned by earlier cleanups. Each deleted shipment
+    leaves a DeletedShipment tombstone for the change feed. Deletes run in chunks of
+    ``chunk_size`` shipments, one short transaction each. With ``dry_run`` nothing is changed. Returns a
+    report dict; ``progress`` is called with (deleted, total) after each chunk.
+    """
+    duplicates = find_duplicate_shipments()
+    duplicate_ids = [duplicate_id for duplicate_id, _, _ in duplicates]
+
+    analytics_count = 0
+    for offset in range(0, len(duplicate_ids), chunk_size):
+        chunk = duplicate_ids[offset:offset + chunk_size]
+        analytics_count += ShipmentAnalytics.query.filter(ShipmentAnalytics.shipment_id.in_(chunk)).count()
+
+    orphaned = ShipmentAnalytics.query.filter(
+        ~db.exists().where(Shipment.id == ShipmentAnalytics.shipment_id)
+    )
+
+    report = {
+        'dry_run': dry_run,
+        'duplicate_tracking_ids': len({tracking_id for _, tracking_id, _ in duplicates}),
+        'duplicate_shipments': len(duplicates),
+        'duplicate_analytics': analytics_count,
+        'orphaned_analytics': orphaned.count(),
+        'duplicates': duplicates
+    }
+
+    print(f"Found {report['duplicate_shipments']} duplicate shipments across {report['duplicate_tracking_ids']} tracking IDs, "
+          f"{report['duplicate_analytics']} analytics rows on them and {report['orphaned_analytics']} orphaned analytics rows")
+    if dry_run:
+        return report
+
+    deleted = 0
+    for offset in range(0, len(duplicate_ids), chunk_size):
+        chunk = duplicate_ids[offset:offset + chunk_size]
+        totals = _branch_totals(Shipment.id.in_(chunk))
+        add_to_daily_rollup(Shipment.id.in_(chunk), -1)
+        add_to_hourly_rollup(Shipment.id.in_(chunk), -1)
+        ShipmentAnalytics.query.filter(ShipmentAnalytics.shipment_id.in_(chunk)).delete(synchronize_session=False)
+        ShipmentEvent.query.filter(ShipmentEvent.shipment_id.in_(chunk)).delete(synchronize_session=False)
+        db.session.execute(db.insert(DeletedShipment).from_select(
+            ['shipment_id', 'tracking_id', 'client_id', 'change_seq', 'deleted_at'],
+            db.select(
+                Shipment.id, Shipment.tracking_id, Shipment.client_id,
+                db.literal(next_change_seq(), db.BigInteger), db.literal(datetime.utcnow(), db.DateTime)
+            ).where(Shipment.id.in_(chunk))
+        ))
+        deleted += Shipment.query.filter(Shipment.id.in_(chunk)).delete(synchronize_session=False)
+        barcode_cache.invalidate(chunk)
+        _apply_branch_totals(totals, -1)
+        db.session.commit()
+        if progress:
+            progress(deleted, len(duplicate_ids))
+
+    while True:
+        orphan_ids = [analytics_id for (analytics_id,) in orphaned.with_entities(ShipmentAnalytics.id).limit(chunk_size)]
+        if not orphan_ids:
+            break
+        ShipmentAnalytics.query.filter(ShipmentAnalytics.id.in_(orphan_ids)).delete(synchronize_session=False)
+        db.session.commit()
+
+    report_summaries.invalidate()
+    print(f"Duplicate cleanup completed! Deleted {deleted} shipments.")
+    return report
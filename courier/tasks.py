@@ -0,0 +1,109 @@
+"""
+Background job handlers; imported by the job runner, not by web requests
+"""
+import csv
+import io
+from datetime import datetime
+
+from .blueprints.pdf import build_slips_pdf
+from .exports import (COLUMNAR_FORMATS, columnar_format, export_shipments_since_last, write_all_shipments_csv,
+                      write_daily_report_csv, write_filtered_parcels_csv, write_monthly_report_csv,
+                      write_shipments_columnar)
+from .extensions import db
+from .jobs import JobFailed, job_handler
+from .models import DailyRecord, MonthlyRecord, Shipment
+from .pricing import import_rate_card_csv
+from .records import update_daily_records, update_monthly_records
+from .shipments import cleanup_duplicate_tracking_ids
+
+@job_handler('export_all_shipments')
+def export_all_shipments(ctx):
+    with ctx.open_result('all_shipments.csv', 'text/csv') as output:
+        write_all_shipments_csv(output, ctx.progress)
+    return f'{ctx.done} shipments exported.'
+
+@job_handler('export_shipments_columnar')
+def export_shipments_columnar(ctx, format='parquet', incremental=False):
+    format = columnar_format(format)
+    extension, mimetype = COLUMNAR_FORMATS[format]
+    stamp = f'{datetime.utcnow():%Y%m%d-%H%M%S}'
+    filename = f'shipments_since_last_{stamp}.{extension}' if incremental else f'all_shipments_{stamp}.{extension}'
+
+    with ctx.open_result(filename, mimetype, binary=True) as output:
+        if incremental:
+            metadata = export_shipments_since_last(output, format, 'shipments_columnar', ctx.progress)
+        else:
+            metadata = write_shipments_columnar(output, format, progress=ctx.progress)
+    # Only advance the incremental cursor once the file is complete
+    db.session.commit()
+    if not metadata['rows']:
+        return 'No shipments booked since the last export.'
+    return f"{metadata['rows']} shipments exported as {format}, booked up to {metadata['until_created_at'][:19].replace('T', ' ')} UTC."
+
+@job_handler('export_filtered_parcels')
+def export_filtered_parcels(ctx, filters):
+    with ctx.open_result('filtered_parcels.csv', 'text/csv') as output:
+        write_filtered_parcels_csv(output, filters, ctx.progress)
+    return f'{ctx.done} parcels exported.'
+
+@job_handler('export_daily_report')
+def export_daily_report(ctx, date):
+    report_date = datetime.strptime(date, '%Y-%m-%d').date()
+    daily_record = DailyRecord.query.filter_by(date=report_date).first()
+    if not daily_record:
+        raise JobFailed('No data found for the selected date.')
+
+    with ctx.open_result(f'daily_report_{date}.csv', 'text/csv') as output:
+        write_daily_report_csv(output, daily_record, ctx.progress)
+    return f'Daily report for {date} is ready.'
+
+@job_handler('export_monthly_report')
+def export_monthly_report(ctx, year, month):
+    monthly_record = MonthlyRecord.query.filter_by(year=year, month=month).first()
+    if not monthly_record:
+        raise JobFailed('No data found for the selected month.')
+
+    with ctx.open_result(f'monthly_report_{year}_{month:02d}.csv', 'text/csv') as output:
+        write_monthly_report_csv(output, monthly_record, ctx.progress)
+    return f'Monthly report for {year}-{month:02d} is ready.'
+
+@job_handler('print_slips')
+def print_slips(ctx, shipment_ids):
+    shipments = Shipment.query.filter(Shipment.id.in_(shipment_ids)).order_by(Shipment.id).all()
+    if not shipments:
+        raise JobFailed('None of the selected parcels exist any more.')
+
+    ctx.progress(0, len(shipments), 'Laying out slips...')
+    with ctx.open_result(f'shipment-slips-{datetime.utcnow():%Y%m%d-%H%M%S}.pdf', 'application/pdf', binary=True) as output:
+        build_slips_pdf(shipments, output, lambda done: ctx.progress(done) if done % 25 == 0 else None)
+    return f'Slips for {len(shipments)} parcels are ready.'
+
+@job_handler('import_rate_card')
+def import_rate_card(ctx, filename, csv_text):
+    # Staged as a draft in one transaction; web workers pick it up once it is published
+    rate_card, success_count, error_count = import_rate_card_csv(io.StringIO(csv_text), filename)
+    return f'Rate card #{rate_card.id} staged! {success_count} records added, {error_count} errors. Publish it to start quoting with it.'
+
+@job_handler('cleanup_duplicates')
+def cleanup_duplicates(ctx, dry_run=False):
+    report = cleanup_duplicate_tracking_ids(dry_run=dry_run, progress=ctx.progress)
+
+    action = 'Would delete' if dry_run else 'Deleted'
+    with ctx.open_result(f'duplicate_tracking_ids{"_dry_run" if dry_run else ""}.csv', 'text/csv') as output:
+        writer = csv.writer(output)
+        writer.writerow(['Tracking ID', 'Kept Shipment ID', 'Duplicate Shipment ID', 'Action'])
+        for duplicate_id, tracking_id, keeper_id in report['duplicates']:
+            writer.writerow([tracking_id, keeper_id, duplicate_id, action])
+
+    summary = (f"{report['duplicate_shipments']} duplicate shipments across {report['duplicate_tracking_ids']} tracking IDs, "
+               f"{report['duplicate_analytics'] + report['orphaned_analytics']} analytics rows")
+    if dry_run:
+        return f'Dry run: {summary} would be deleted.'
+    return f'Duplicate tracking IDs have been cleaned up! Deleted {summary}.'
+
+@job_handler('refresh_report_records')
+def refresh_report_records(ctx):
+    update_daily_records()
+    update_monthly_records()
+    db.session.commit()
+    return 'Daily and monthly records are up to date.'
@@ -1,15 +1,17 @@
 #!/usr/bin/env python3
 """
-Database initialization script
+Database initialization script: schema updates, migrations and sample data
 """
-from main import app, db, create_tables
+from courier.migrations import run_migrations
+from main import app
 
 try:
     with app.app_context():
         print("Creating database tables...")
-        create_tables()
+        if not run_migrations():
+            exit(1)
         print("✅ Database initialized successfully!")
         print("📊 You can now run the application with: python main.py")
 except Exception as e:
     print(f"❌ Error initializing database: {e}")
-    exit(1)
\ No newline at end of file
+    exit(1)
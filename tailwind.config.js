@@ -0,0 +1,8 @@
+// Used by `flask --app main build-assets`; only classes found in these files end up in the bundle
+module.exports = {
+  content: ['./templates/**/*.html', './courier/**/*.py'],
+  theme: {
+    extend: {},
+  },
+  plugins: [],
+};